@@ -1,17 +1,30 @@
 # app/__init__.py
+from app.arranque import Arranque  # primero: marca el inicio de la importación de la app
 from flask import Flask, render_template, g, session
-from flask_login import LoginManager
-from flask_migrate import Migrate
+from flask_login import LoginManager, current_user
 from app.extensions import db
 
-def create_app():
+def create_app(config_overrides=None):
+    arranque = Arranque()
     app = Flask(__name__)
     app.config.from_object("config.Config")
+    # Ajustes puntuales (benchmarks, pruebas de carga) sin tocar config.py ni el entorno
+    if config_overrides:
+        app.config.update(config_overrides)
+    arranque.marca("config")
 
     # === Extensiones ===
+    # Perfil del motor: pool (servidores) y PRAGMA por conexión (SQLite)
+    from app.database import configurar_motor, init_database, init_replica
+    configurar_motor(app)
     db.init_app(app)
-    migrate = Migrate()
-    migrate.init_app(app, db)
+    init_database(app, db)
+    init_replica(app, db)
+    from app.shards import init_shards
+    init_shards(app, db)
+    # Flask-Migrate (alembic) solo se importa en la CLI o cuando algo lo usa
+    from app.arranque import init_migraciones
+    init_migraciones(app, db)
 
     login_manager = LoginManager()
     login_manager.login_view = "auth.login"
@@ -22,41 +35,109 @@ def create_app():
     with app.app_context():
         from app import models  # noqa: F401
 
+        # Índice full-text (FTS5); si falla, la app sigue sin búsqueda
+        from app import search
+        try:
+            search.ensure_search_index()
+        except Exception:
+            app.logger.warning("No se pudo preparar el índice de búsqueda", exc_info=True)
+    arranque.marca("extensiones_y_modelos")
+
+    # === Estáticos: manifest de precache (hash por archivo) para el service worker ===
+    from app.assets import init_assets
+    init_assets(app)
+
+    # === Plantillas: bytecode compilado en disco, compartido entre workers ===
+    from app.plantillas import init_plantillas
+    init_plantillas(app)
+
+    # === Caché de la app (LRU / SQLite / Redis), invalidado al confirmar cambios ===
+    from app.cache import init_cache
+    init_cache(app)
+
+    # === Fragmentos de plantilla en caché ({% cache %}) ===
+    from app.fragmentos import init_fragmentos
+    init_fragmentos(app)
+
+    # === Perfilado por request (opcional, muestreado) ===
+    from app.profiling import init_profiling
+    init_profiling(app)
+
+    # === Registro de consultas lentas (JSON lines con rotación) ===
+    from app.slowlog import init_slowlog
+    init_slowlog(app)
+
+    # === Métricas Prometheus (/metrics, agregadas entre workers) ===
+    from app.metricas import init_metricas
+    init_metricas(app, db)
+
+    # === Detector de N+1 (desarrollo) ===
+    from app.nplus1 import init_nplus1
+    init_nplus1(app)
+    arranque.marca("instrumentacion")
+
+    # === Arranque: tiempo hasta el primer request (log + métricas) ===
+    from app.arranque import init_arranque
+    init_arranque(app, arranque)
+
     # === Autenticación ===
     @login_manager.user_loader
     def load_user(user_id: str):
+        from app.cache import obtener_instancia
         from app.models import User
-        return User.query.get(int(user_id))
+        return obtener_instancia(User, int(user_id))
 
     # === Multi-empresa (tenant) ===
     @app.before_request
     def load_tenant():
+        from app.cache import cache_actual, obtener_instancia
         from app.models import Empresa
+        from app.shards import activar_shard
+        from app.tenancy import activar
         eid = session.get("empresa_id")
-        g.empresa = Empresa.query.get(eid) if eid else None
+        cache = cache_actual()
+        if eid and app.extensions.get("shards") and cache is not None and not cache.compartido:
+            # shard y shard_bloqueado los cambia ``shards.py mover`` en otro proceso:
+            # un caché del proceso (LRU) no vería esa invalidación
+            g.empresa = db.session.get(Empresa, eid)
+        else:
+            g.empresa = obtener_instancia(Empresa, eid) if eid else None
+        # Sesiones anteriores a guardar empresa_id: usar la del usuario
+        if g.empresa is None and current_user.is_authenticated:
+            g.empresa = current_user.empresa
+        # Desde aquí, toda consulta ORM sobre modelos TenantMixin se filtra por esta empresa
+        activar(g.empresa)
+        # ...y va al shard de la empresa, si tiene uno
+        activar_shard(g.empresa)
+
+    # === Estilos para tipos de actividad (opcional; en caché por empresa) ===
+    from app.cache import memoize
+
+    estilo_otra = {"color": "#6c757d", "fill": "#6c757d33", "icon": "bi-gear", "nombre": "Otra"}
+
+    @memoize(ttl=3600, tags=("activity_type",))
+    def estilos_actividad():
+        # Sin try: si la consulta falla, que no se guarde en caché el fallback (lo pone quien llama)
+        from app.models import ActivityType
+        styles = {
+            t.key: {
+                "color": t.color,
+                "fill": t.fill_color or f"{t.color}33",
+                "icon": t.icon,
+                "nombre": t.nombre,
+            }
+            for t in ActivityType.query.all()
+        }
+        styles.setdefault("otra", estilo_otra)
+        return styles
 
-    # === Estilos para tipos de actividad (opcional) ===
     @app.context_processor
     def inject_activity_styles():
-        styles = {}
         try:
-            # Si existe el modelo ActivityType, lo usamos; si no, fallback
-            from app.models import ActivityType  # type: ignore
-            tipos = ActivityType.query.all()
-            for t in tipos:
-                styles[t.key] = {
-                    "color": t.color,
-                    "fill": t.fill_color or f"{t.color}33",
-                    "icon": t.icon,
-                    "nombre": t.nombre,
-                }
+            styles = estilos_actividad()
         except Exception:
-            pass
-
-        styles.setdefault(
-            "otra",
-            {"color": "#6c757d", "fill": "#6c757d33", "icon": "bi-gear", "nombre": "Otra"},
-        )
+            app.logger.warning("No se pudieron cargar los estilos de actividad", exc_info=True)
+            styles = {"otra": estilo_otra}
         return dict(activity_styles=styles)
 
     # === Blueprints ===
@@ -67,6 +148,8 @@ def create_app():
     from app.routes.docs import docs_bp
     from app.routes.geo import geo_bp
     from app.routes.geo_admin import geo_admin_bp, geo_types_bp
+    from app.routes.search import search_bp
+    from app.routes.metricas import metricas_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
@@ -76,6 +159,8 @@ def create_app():
     app.register_blueprint(geo_bp)
     app.register_blueprint(geo_admin_bp)
     app.register_blueprint(geo_types_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(metricas_bp)
 
     # === Errores ===
     @app.errorhandler(404)
@@ -87,4 +172,5 @@ def create_app():
         db.session.rollback()
         return render_template("500.html"), 500
 
+    arranque.marca("blueprints")
     return app
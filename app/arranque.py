@@ -0,0 +1,258 @@
+# app/arranque.py
+"""
+Arranque en frío: tiempos de inicio, carga diferida y calentamiento.
+
+Tras cada reinicio de Passenger (``tmp/restart.txt``) o de un worker de
+gunicorn, el primer visitante paga la importación de la app, ``create_app()``
+y todo lo que Flask y SQLAlchemy dejan para el primer uso: configurar los
+mappers, compilar las plantillas, abrir la conexión, compilar el SQL de las
+consultas de cada request.
+
+* ``Arranque`` mide las fases de ``create_app()`` y, al atender el primer
+  request, registra en el log cuánto tardó el proceso en estar listo
+  (desde que se creó, vía ``/proc``) y cuánto tardó ese request.
+* ``init_migraciones`` difiere Flask-Migrate (y alembic, ~100 ms de
+  importación) fuera de la CLI de Flask: se carga recién cuando algo lee
+  ``app.extensions["migrate"]`` (``flask_migrate.upgrade`` en ``shards.py``).
+* ``calentar(app)`` hace ese trabajo de primer uso antes de aceptar tráfico;
+  lo llaman ``passenger_wsgi.py`` y ``gunicorn.conf.py``.
+
+El detalle por módulo importado lo entrega ``python arranque.py`` (corre
+``python -X importtime`` en un proceso aparte).
+
+Este módulo se importa primero en ``app/__init__.py`` y solo usa la
+biblioteca estándar al importarse, para que ``INICIO_IMPORTACION`` quede
+antes de Flask y SQLAlchemy.
+"""
+import os
+import threading
+import time
+
+INICIO_IMPORTACION = time.perf_counter()
+
+_primera_app = True
+
+
+def segundos_desde_inicio_proceso() -> float | None:
+    """Segundos desde que el sistema creó este proceso (Linux); None si no hay ``/proc``."""
+    try:
+        with open("/proc/self/stat") as f:
+            campos = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(campos[19]) / os.sysconf("SC_CLK_TCK")   # campo 22: starttime
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# ==============================
+# Tiempos de create_app() y del primer request
+# ==============================
+class Arranque:
+    """Fases de ``create_app()`` (ms desde la marca anterior) y datos del primer request."""
+
+    def __init__(self):
+        global _primera_app
+        self.inicio = self._ultima = time.perf_counter()
+        # Importación de la app: solo tiene sentido para la primera create_app() del proceso
+        self.importacion_ms = round((self.inicio - INICIO_IMPORTACION) * 1000, 1) if _primera_app else None
+        _primera_app = False
+        self.fases: dict[str, float] = {}
+        self.calentamiento_ms: float | None = None
+        self.listo_s: float | None = None          # primer request: segundos desde el inicio del proceso
+        self.primer_request_ms: float | None = None
+        self.primer_request_ruta: str | None = None
+        self._primer_request = threading.Lock()   # lo toma el primer request y no se suelta
+
+    def marca(self, fase: str):
+        ahora = time.perf_counter()
+        self.fases[fase] = round((ahora - self._ultima) * 1000, 1)
+        self._ultima = ahora
+
+    @property
+    def create_app_ms(self) -> float:
+        return round((self._ultima - self.inicio) * 1000, 1)
+
+    def resumen(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "importacion_ms": self.importacion_ms,
+            "create_app_ms": self.create_app_ms,
+            "fases": dict(self.fases),
+            "calentamiento_ms": self.calentamiento_ms,
+            "listo_s": self.listo_s,
+            "primer_request_ms": self.primer_request_ms,
+            "primer_request_ruta": self.primer_request_ruta,
+        }
+
+
+def init_arranque(app, arranque: Arranque):
+    """Registra el primer request que atiende el proceso (log + histograma ``arranque_segundos``)."""
+    from flask import g, request
+
+    app.extensions["arranque"] = arranque
+
+    @app.before_request
+    def _arranque_primer_request():
+        if arranque._primer_request.acquire(blocking=False):
+            desde_proceso = segundos_desde_inicio_proceso()
+            if desde_proceso is None:
+                desde_proceso = time.perf_counter() - INICIO_IMPORTACION
+            arranque.listo_s = round(desde_proceso, 3)
+            arranque.primer_request_ruta = request.path
+            g._arranque_t0 = time.perf_counter()
+
+    @app.teardown_request
+    def _arranque_fin_primer_request(exc):
+        inicio = g.pop("_arranque_t0", None)
+        if inicio is None:
+            return
+        arranque.primer_request_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        app.logger.info(
+            "Arranque: listo a los %.2f s del inicio del proceso (importación %s ms, create_app %s ms, "
+            "calentamiento %s ms); primer request %s en %s ms",
+            arranque.listo_s, arranque.importacion_ms, arranque.create_app_ms,
+            arranque.calentamiento_ms, arranque.primer_request_ruta, arranque.primer_request_ms,
+        )
+        from app.metricas import registro
+        registro.observar("arranque_segundos", arranque.listo_s, fase="listo")
+        registro.observar("arranque_segundos", arranque.create_app_ms / 1000, fase="create_app")
+        registro.observar("arranque_segundos", arranque.primer_request_ms / 1000, fase="primer_request")
+
+
+# ==============================
+# Flask-Migrate diferido
+# ==============================
+def _iniciar_migrate(app, db):
+    from flask_migrate import Migrate
+
+    Migrate().init_app(app, db)   # reemplaza app.extensions["migrate"]
+    return app.extensions["migrate"]
+
+
+class _MigracionesDiferidas:
+    """Ocupa ``app.extensions["migrate"]``; el primer atributo leído carga Flask-Migrate de verdad."""
+
+    def __init__(self, app, db):
+        self._app = app
+        self._db = db
+
+    def __getattr__(self, nombre):
+        return getattr(_iniciar_migrate(self._app, self._db), nombre)
+
+
+def init_migraciones(app, db):
+    """Flask-Migrate de inmediato en la CLI (``flask db ...`` necesita su grupo de comandos); diferido al servir."""
+    import click
+
+    if not app.config.get("LAZY_MIGRATE", True) or click.get_current_context(silent=True) is not None:
+        _iniciar_migrate(app, db)
+    else:
+        app.extensions["migrate"] = _MigracionesDiferidas(app, db)
+
+
+# ==============================
+# Calentamiento
+# ==============================
+def _motores(app, db) -> dict:
+    motores = {"principal": db.engine}
+    if "db_lectura" in app.extensions:
+        motores["lectura"] = app.extensions["db_lectura"]
+    for nombre, motor in app.extensions.get("shards", {}).items():
+        if hasattr(motor, "pool") and motor.pool is not db.engine.pool:
+            motores[f"shard:{nombre}"] = motor
+    return motores
+
+
+def calentar(app) -> float:
+    """Deja listo el trabajo de primer uso antes de aceptar tráfico. Devuelve los ms que tomó.
+
+    Nunca impide el arranque: cada paso que falla queda en el log y se sigue.
+    """
+    from sqlalchemy.orm import configure_mappers
+
+    from app.extensions import db
+    from app.models import Empresa, User
+    from app.plantillas import nombres as nombres_plantillas
+
+    inicio = time.perf_counter()
+    pasos = {}
+
+    def paso(nombre, fn):
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            app.logger.warning("Calentamiento: falló '%s'", nombre, exc_info=True)
+        pasos[nombre] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def plantillas():
+        # Con el caché de bytecode (app/plantillas.py) esto carga en vez de compilar
+        for nombre in nombres_plantillas(app):
+            app.jinja_env.get_template(nombre)
+
+    def conexiones():
+        for motor in _motores(app, db).values():
+            with motor.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+
+    def consultas_por_request():
+        # load_user y load_tenant: compila su SQL (caché de SQLAlchemy) sin depender de datos
+        db.session.get(Empresa, 0)
+        db.session.get(User, 0)
+        db.session.remove()
+
+    with app.app_context():
+        paso("mappers", configure_mappers)
+        paso("rutas", app.url_map.update)
+        paso("plantillas", plantillas)
+        paso("conexiones", conexiones)
+        paso("consultas", consultas_por_request)
+
+    ms = round((time.perf_counter() - inicio) * 1000, 1)
+    arranque = app.extensions.get("arranque")
+    if arranque is not None:
+        arranque.calentamiento_ms = ms
+    app.logger.info("Calentamiento en %s ms: %s", ms, ", ".join(f"{n} {t} ms" for n, t in pasos.items()))
+    return ms
+
+
+# ==============================
+# Reporte de importaciones (arranque.py)
+# ==============================
+def leer_importtime(texto: str) -> dict[str, tuple[int, int]]:
+    """Salida de ``python -X importtime`` → {módulo: (µs propios, µs acumulados)}."""
+    modulos = {}
+    for linea in texto.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        try:
+            propio, acumulado, nombre = linea.split(":", 1)[1].split("|")
+            modulos[nombre.strip()] = (int(propio), int(acumulado))
+        except ValueError:
+            continue
+    return modulos
+
+
+def combinar_importaciones(corridas: list[dict]) -> dict[str, tuple[int, int]]:
+    """Mediana por módulo entre varias corridas (un módulo ausente en alguna no se promedia con ceros)."""
+    import statistics
+
+    nombres = {n for c in corridas for n in c}
+    return {
+        n: (
+            int(statistics.median(c[n][0] for c in corridas if n in c)),
+            int(statistics.median(c[n][1] for c in corridas if n in c)),
+        )
+        for n in nombres
+    }
+
+
+def por_paquete(modulos: dict[str, tuple[int, int]]) -> list[tuple[str, int, int]]:
+    """[(paquete de primer nivel, µs propios sumados, módulos)], del más caro al más barato."""
+    paquetes = {}
+    for nombre, (propio, _) in modulos.items():
+        raiz = nombre.split(".")[0]
+        total, cuenta = paquetes.get(raiz, (0, 0))
+        paquetes[raiz] = (total + propio, cuenta + 1)
+    return sorted(((p, t, c) for p, (t, c) in paquetes.items()), key=lambda f: f[1], reverse=True)
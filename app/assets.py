@@ -0,0 +1,327 @@
+# app/assets.py
+"""
+Inventario de archivos estáticos con hash de contenido.
+
+Se calcula una vez al arrancar y alimenta el manifest de precache del
+service worker: cada entrada lleva su hash, así el SW solo descarga lo que
+cambió y desaloja lo que ya no está.
+
+Además incluye el pipeline de build (``build_assets.py``): copia cada
+archivo a ``static/dist`` con el hash en el nombre, deja versiones
+``.gz``/``.br`` de los textos y variantes WebP por ancho de las imágenes
+grandes. En runtime ``url_for('static', ...)`` resuelve al nombre con hash y
+esas respuestas salen con caché inmutable de un año.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, request, send_file
+from werkzeug.security import safe_join
+
+try:  # opcionales: sin ellos no hay .br ni WebP, el resto del build funciona igual
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+# Lo que se precachea: el "shell" de la app (texto + íconos), no fotos ni uploads
+PRECACHE_EXT = {"css", "js", "json", "svg", "ico", "woff", "woff2"}
+EXCLUIR_DIRS = {"uploads", "dist"}
+EXCLUIR_ARCHIVOS = {"sw.js"}
+
+
+def hash_archivo(path: str, largo: int = 12) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(65536), b""):
+            h.update(bloque)
+    return h.hexdigest()[:largo]
+
+
+def recorrer_estaticos(static_folder: str):
+    """Genera (ruta_relativa, ruta_absoluta) de los archivos servibles de ``static``."""
+    for raiz, dirs, archivos in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUIR_DIRS and not d.startswith("."))
+        for nombre in sorted(archivos):
+            if nombre.startswith(".") or nombre in EXCLUIR_ARCHIVOS:
+                continue
+            abs_path = os.path.join(raiz, nombre)
+            yield os.path.relpath(abs_path, static_folder).replace(os.sep, "/"), abs_path
+
+
+def _extension(nombre: str) -> str:
+    return nombre.rsplit(".", 1)[-1].lower() if "." in os.path.basename(nombre) else ""
+
+
+def construir_manifest_precache(static_folder: str, static_url_path: str = "/static",
+                                max_bytes: int = 1024 * 1024,
+                                fingerprints: dict | None = None) -> dict:
+    """
+    ``{"version": ..., "assets": [{"url": "/static/css/style.css", "hash": "..."}]}``.
+    La versión es el hash de todas las entradas: cambia si cambia cualquier archivo.
+    Con ``fingerprints`` (salida del build) las URLs apuntan a ``dist/``,
+    que es lo que realmente piden las páginas.
+    """
+    fingerprints = fingerprints or {}
+    assets = []
+    for rel, abs_path in recorrer_estaticos(static_folder):
+        if _extension(rel) not in PRECACHE_EXT or os.path.getsize(abs_path) > max_bytes:
+            continue
+        url_rel = f"{DIST_DIR}/{fingerprints[rel]}" if rel in fingerprints else rel
+        assets.append({"url": f"{static_url_path}/{url_rel}", "hash": hash_archivo(abs_path)})
+
+    version = hashlib.sha256(
+        "\n".join(f"{a['url']} {a['hash']}" for a in assets).encode()
+    ).hexdigest()[:12]
+    return {"version": version, "assets": assets}
+
+
+# ==============================
+# Build: fingerprint + precompresión + WebP
+# ==============================
+DIST_DIR = "dist"
+DIST_MANIFEST = "assets-manifest.json"
+COMPRIMIR_EXT = {"css", "js", "json", "svg", "ico", "txt", "map"}
+COMPRIMIR_MIN_BYTES = 1024
+IMAGEN_EXT = {"jpg", "jpeg", "png"}
+WEBP_MIN_BYTES = 50 * 1024
+WEBP_ANCHOS = (480, 960, 1600)
+WEBP_CALIDAD = 80
+# Deben mantener su URL: el manifest PWA identifica la app instalada
+SIN_FINGERPRINT = {"manifest.json"}
+# Archivos de cada build, para podar los de builds viejos sin borrar lo que
+# aún piden los workers que no se han reiniciado (siguen con su manifest)
+DIST_BUILDS = "builds.json"
+DIST_BUILDS_CONSERVADOS = 3
+
+CACHE_INMUTABLE = 365 * 24 * 3600
+
+
+def _nombre_con_hash(rel: str, h: str, sufijo: str = "") -> str:
+    base, punto, ext = rel.rpartition(".")
+    if not punto or "/" in ext:
+        return f"{rel}.{h}{sufijo}"
+    return f"{base}.{h}{sufijo}.{ext}"
+
+
+def _reemplazar(path: str, escribir) -> None:
+    """Escribe ``path`` vía un temporal + ``os.replace``: nadie lee un archivo a medias."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    escribir(tmp)
+    os.replace(tmp, path)
+
+
+def _precomprimir(path: str) -> list[str]:
+    """Escribe ``path.gz`` (y ``path.br`` si hay brotli) cuando realmente reducen el tamaño."""
+    with open(path, "rb") as f:
+        datos = f.read()
+    generados = []
+    variantes = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append((".br", lambda d: brotli.compress(d, quality=11)))
+    for sufijo, comprimir in variantes:
+        comprimido = comprimir(datos)
+        if len(comprimido) < len(datos):
+            def escribir(tmp, comprimido=comprimido):
+                with open(tmp, "wb") as f:
+                    f.write(comprimido)
+            _reemplazar(path + sufijo, escribir)
+            generados.append(path + sufijo)
+    return generados
+
+
+def _variantes_webp(origen: str, destino_dir: str, rel: str, h: str) -> list[dict]:
+    """Genera WebP a los anchos de ``WEBP_ANCHOS`` menores al original, más uno a ancho completo."""
+    with Image.open(origen) as img:
+        if img.mode in ("P", "LA", "PA"):
+            img = img.convert("RGBA")
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        ancho_orig, alto_orig = img.size
+        anchos = [a for a in WEBP_ANCHOS if a < ancho_orig] + [ancho_orig]
+
+        salida = []
+        for ancho in anchos:
+            alto = max(1, round(alto_orig * ancho / ancho_orig))
+            variante = img if ancho == ancho_orig else img.resize((ancho, alto), Image.LANCZOS)
+            nombre = _nombre_con_hash(rel, h, f".w{ancho}").rsplit(".", 1)[0] + ".webp"
+            _reemplazar(os.path.join(destino_dir, nombre),
+                        lambda tmp: variante.save(tmp, "WEBP", quality=WEBP_CALIDAD, method=6))
+            salida.append({"ancho": ancho, "archivo": nombre})
+    return salida
+
+
+def _archivos_dist(destino: str) -> set[str]:
+    return {
+        os.path.relpath(os.path.join(raiz, n), destino).replace(os.sep, "/")
+        for raiz, _, archivos in os.walk(destino) for n in archivos
+    } - {DIST_MANIFEST, DIST_BUILDS}
+
+
+def _escribir_json(path: str, datos) -> None:
+    def escribir(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=1, sort_keys=True)
+    _reemplazar(path, escribir)
+
+
+def construir_dist(static_folder: str, conservar: int = DIST_BUILDS_CONSERVADOS) -> dict:
+    """
+    Genera ``static/dist`` y su manifest:
+    ``{"archivos": {"css/style.css": "css/style.<hash>.css"}, "webp": {"fondo6.jpg": [{"ancho", "archivo"}]}}``.
+    Las rutas son relativas a ``dist/``.
+
+    No vacía el directorio: los workers que siguen con el manifest anterior
+    piden las URLs viejas hasta reiniciarse. Se conservan los archivos de los
+    últimos ``conservar`` builds (``builds.json``) y se borra el resto.
+    """
+    destino = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(destino, exist_ok=True)
+    ruta_builds = os.path.join(destino, DIST_BUILDS)
+    if os.path.exists(ruta_builds):
+        with open(ruta_builds, encoding="utf-8") as f:
+            builds = json.load(f)
+    else:
+        # dist/ de antes de llevar el historial: cuenta como un build anterior
+        previos = sorted(_archivos_dist(destino))
+        builds = [previos] if previos else []
+
+    manifest = {"archivos": {}, "webp": {}}
+    for rel, abs_path in recorrer_estaticos(static_folder):
+        if rel in SIN_FINGERPRINT:
+            continue
+        h = hash_archivo(abs_path, 10)
+        hashed = _nombre_con_hash(rel, h)
+        destino_path = os.path.join(destino, hashed)
+        os.makedirs(os.path.dirname(destino_path), exist_ok=True)
+        _reemplazar(destino_path, lambda tmp: shutil.copyfile(abs_path, tmp))
+        manifest["archivos"][rel] = hashed
+
+        ext = _extension(rel)
+        tam = os.path.getsize(abs_path)
+        if ext in COMPRIMIR_EXT and tam >= COMPRIMIR_MIN_BYTES:
+            _precomprimir(destino_path)
+        if Image is not None and ext in IMAGEN_EXT and tam >= WEBP_MIN_BYTES:
+            manifest["webp"][rel] = _variantes_webp(abs_path, destino, rel, h)
+
+    este_build = set()
+    for hashed in manifest["archivos"].values():
+        este_build.update(n for n in (hashed, hashed + ".gz", hashed + ".br")
+                          if os.path.exists(os.path.join(destino, n)))
+    este_build.update(v["archivo"] for variantes in manifest["webp"].values() for v in variantes)
+    builds = (builds + [sorted(este_build)])[-max(conservar, 1):]
+
+    _escribir_json(os.path.join(destino, DIST_MANIFEST), manifest)
+    _escribir_json(ruta_builds, builds)
+    vigentes = set().union(*map(set, builds))
+    for viejo in _archivos_dist(destino) - vigentes:
+        os.remove(os.path.join(destino, viejo))
+    return manifest
+
+
+def cargar_manifest_dist(static_folder: str) -> dict | None:
+    path = os.path.join(static_folder, DIST_DIR, DIST_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ==============================
+# Runtime: url_for, helpers de plantilla y entrega
+# ==============================
+def _dist() -> dict:
+    return current_app.extensions["assets_dist"]
+
+
+def _url_fingerprint(endpoint, values):
+    """``url_for('static', filename='css/style.css')`` → ``/static/dist/css/style.<hash>.css``."""
+    if endpoint != "static":
+        return
+    hashed = _dist()["archivos"].get(values.get("filename"))
+    if hashed:
+        values["filename"] = f"{DIST_DIR}/{hashed}"
+
+
+def _url_dist(archivo: str) -> str:
+    return f"{current_app.static_url_path}/{DIST_DIR}/{archivo}"
+
+
+def static_srcset(filename: str) -> str:
+    """``srcset`` WebP de una imagen (vacío si el build no generó variantes)."""
+    return ", ".join(
+        f"{_url_dist(v['archivo'])} {v['ancho']}w" for v in _dist()["webp"].get(filename, [])
+    )
+
+
+def static_webp(filename: str, ancho: int | None = None) -> str | None:
+    """URL de la variante WebP más grande que no supera ``ancho`` (o la mayor)."""
+    variantes = _dist()["webp"].get(filename) or []
+    if ancho:
+        variantes = [v for v in variantes if v["ancho"] <= ancho] or variantes[:1]
+    return _url_dist(variantes[-1]["archivo"]) if variantes else None
+
+
+def _enviar_precomprimido(static_folder: str, filename: str):
+    """Entrega ``.br``/``.gz`` según ``Accept-Encoding`` si el build los dejó junto al archivo."""
+    path = safe_join(static_folder, filename)
+    if path is None:
+        return None
+    for encoding, sufijo in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in request.accept_encodings and os.path.isfile(path + sufijo):
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            resp = send_file(path + sufijo, mimetype=mimetype, conditional=True)
+            resp.headers["Content-Encoding"] = encoding
+            return resp
+    return None
+
+
+def _vista_static(original, static_folder):
+    def static(filename):
+        if not filename.startswith(DIST_DIR + "/"):
+            return original(filename=filename)
+        resp = _enviar_precomprimido(static_folder, filename) or original(filename=filename)
+        if resp.status_code in (200, 206, 304):
+            # El nombre lleva el hash: el contenido de esa URL nunca cambia
+            resp.cache_control.no_cache = None
+            resp.cache_control.public = True
+            resp.cache_control.max_age = CACHE_INMUTABLE
+            resp.cache_control.immutable = True
+        if _extension(filename) in COMPRIMIR_EXT:
+            resp.vary.add("Accept-Encoding")
+        return resp
+    return static
+
+
+def init_assets(app):
+    """
+    Prepara los estáticos al arrancar: carga el manifest del build (si existe)
+    para resolver nombres con hash y calcula el manifest de precache del SW.
+    """
+    dist = None
+    if app.config.get("STATIC_FINGERPRINT", True):
+        dist = cargar_manifest_dist(app.static_folder)
+    app.extensions["assets_dist"] = dist or {"archivos": {}, "webp": {}}
+
+    if dist:
+        app.url_defaults(_url_fingerprint)
+    if "static" in app.view_functions:
+        app.view_functions["static"] = _vista_static(app.view_functions["static"], app.static_folder)
+    app.jinja_env.globals.update(static_srcset=static_srcset, static_webp=static_webp)
+
+    manifest = construir_manifest_precache(
+        app.static_folder,
+        app.static_url_path,
+        app.config.get("PRECACHE_MAX_BYTES", 1024 * 1024),
+        app.extensions["assets_dist"]["archivos"],
+    )
+    app.extensions["precache_manifest"] = manifest
+    return manifest
@@ -0,0 +1,340 @@
+# app/benchmark.py
+"""
+Benchmarks de los endpoints más usados, con seguimiento de regresiones.
+
+Levanta ``create_app()`` contra una BD SQLite generada con ``app.datagen``
+(se cachea por semilla y tamaño), inicia sesión como admin y como técnico
+y mide cada endpoint con el cliente de pruebas de Flask: percentiles de
+latencia y cantidad de consultas SQL por request. Los resultados se guardan
+en JSON; ``comparar`` los contrasta con una línea base y marca regresiones.
+
+El cliente de pruebas mide solo el tiempo del lado del servidor (sin red ni
+servidor WSGI); para concurrencia está ``carga.py``.
+
+Por defecto se mide sin caché de la app ni de fragmentos: el calentamiento
+los llenaría y se estarían midiendo aciertos. ``con_cache=True`` es un modo
+aparte (queda anotado en ``meta``) que usa un archivo de caché propio junto
+al dataset, vaciado al arrancar; nunca toca ``instance/cache/app.db``.
+"""
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.profiling import _percentil
+
+TOLERANCIA_POR_DEFECTO = 0.20   # +20% en p50/p95 se considera regresión
+MINIMO_MS = 2.0                 # diferencias menores a esto son ruido
+
+
+# ==============================
+# Dataset y app
+# ==============================
+def _firma_esquema() -> str:
+    from app import models  # noqa: F401  (registra las tablas)
+    from app.extensions import db
+
+    return ";".join(
+        f"{t.name}:{','.join(c.name for c in t.c)}:{','.join(sorted(i.name for i in t.indexes))}"
+        for t in db.metadata.sorted_tables
+    )
+
+
+def ruta_dataset(directorio: str, parametros: dict) -> str:
+    """Un archivo por parámetros y esquema: si cambian los modelos, se regenera."""
+    firma = json.dumps(parametros, sort_keys=True) + _firma_esquema()
+    clave = hashlib.sha1(firma.encode()).hexdigest()[:10]
+    return os.path.join(directorio, f"bench-{clave}.db")
+
+
+def ruta_cache(db_path: str) -> str:
+    """Caché desechable del modo ``con_cache``: uno por dataset, al lado del archivo."""
+    return os.path.splitext(os.path.abspath(db_path))[0] + "-cache.db"
+
+
+def _config_cache(db_path: str, con_cache: bool) -> dict:
+    if not con_cache:
+        return {"CACHE_BACKEND": "", "FRAGMENT_CACHE": False}
+    ruta = ruta_cache(db_path)
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    return {"CACHE_BACKEND": "sqlite", "CACHE_PATH": ruta, "FRAGMENT_CACHE": True}
+
+
+def crear_app_benchmark(db_path: str, regenerar: bool = False, parametros: dict | None = None,
+                        con_cache: bool = False, **config):
+    """App apuntando a ``db_path``; genera el dataset si no existe (o si ``regenerar``).
+
+    Sin caché salvo ``con_cache`` (ver el docstring del módulo).
+    """
+    from app import create_app, search
+    from app.datagen import generar_datos
+    from app.extensions import db
+
+    if regenerar and os.path.exists(db_path):
+        os.remove(db_path)
+    nuevo = not os.path.exists(db_path)
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(db_path)}",
+        "WTF_CSRF_ENABLED": False,
+        **_config_cache(db_path, con_cache),
+        **config,
+    })
+    app.config["BENCH_CON_CACHE"] = con_cache
+    if nuevo:
+        with app.app_context():
+            db.create_all()
+            generar_datos(**(parametros or {}))
+            if search.ensure_search_index(backfill=False):
+                search.reindexar_todo()
+    return app
+
+
+def elegir_sujetos(app) -> dict:
+    """Admin, técnico y huerto visibles para ambos (el huerto es de un técnico creado por el admin)."""
+    from app.extensions import db
+    from app.models import User, Huerto
+
+    with app.app_context():
+        admin = db.session.scalars(
+            db.select(User).where(User.role == "admin").order_by(User.id)
+        ).first()
+        if admin is None:
+            raise RuntimeError("El dataset no tiene administradores")
+        tecnico = db.session.scalars(
+            db.select(User).where(User.role == "tecnico", User.created_by == admin.id).order_by(User.id)
+        ).first()
+        huerto = db.session.scalars(
+            db.select(Huerto).where(Huerto.responsable_id == tecnico.id).order_by(Huerto.id)
+        ).first() if tecnico else None
+        if huerto is None:
+            raise RuntimeError("El dataset no tiene técnicos con huertos asignados")
+        return {"admin": (admin.id, admin.empresa_id), "tecnico": (tecnico.id, tecnico.empresa_id),
+                "huerto_id": huerto.id}
+
+
+def cliente_con_sesion(app, usuario_id: int, empresa_id: int):
+    """Cliente de pruebas con la sesión de Flask-Login ya iniciada (sin pasar por el hash)."""
+    cliente = app.test_client()
+    with cliente.session_transaction() as s:
+        s["_user_id"] = str(usuario_id)
+        s["_fresh"] = True
+        s["empresa_id"] = empresa_id
+    return cliente
+
+
+# ==============================
+# Escenarios
+# ==============================
+# nombre -> (rol, url); ``{huerto}`` se reemplaza por el huerto elegido
+ESCENARIOS = {
+    "admin_dashboard": ("admin", "/admin/dashboard"),
+    "bitacora_huerto": ("admin", "/admin/huerto/{huerto}/bitacora"),
+    "vista_global_huerto": ("admin", "/admin/huerto/{huerto}/vista-global"),
+    "geo_api_huertos": ("admin", "/geo/api/huertos"),
+    "geo_api_parcelas": ("admin", "/geo/api/parcelas"),
+    "geo_api_actividades": ("admin", "/geo/api/actividades"),
+    "docs_list": ("tecnico", "/docs/list"),
+    "tecnico_dashboard": ("tecnico", "/tecnico/tecnico/dashboard"),
+    "tecnico_bitacora_huerto": ("tecnico", "/tecnico/huerto/{huerto}/bitacora"),
+}
+
+
+class _ContadorSQL:
+    def __init__(self, engine):
+        self.engine = engine
+        self.n = 0
+
+    def _contar(self, *args, **kwargs):
+        self.n += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._contar)
+
+
+def medir(cliente, engine, url: str, repeticiones: int, calentamiento: int = 3) -> dict:
+    for _ in range(calentamiento):
+        cliente.get(url)
+
+    tiempos, consultas, estados = [], [], set()
+    for _ in range(repeticiones):
+        with _ContadorSQL(engine) as contador:
+            inicio = time.perf_counter()
+            resp = cliente.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        resp.close()
+        consultas.append(contador.n)
+        estados.add(resp.status_code)
+
+    return {
+        "url": url,
+        "repeticiones": repeticiones,
+        "estados": sorted(estados),
+        "p50_ms": round(_percentil(tiempos, 0.50), 3),
+        "p95_ms": round(_percentil(tiempos, 0.95), 3),
+        "p99_ms": round(_percentil(tiempos, 0.99), 3),
+        "prom_ms": round(sum(tiempos) / len(tiempos), 3),
+        "min_ms": round(min(tiempos), 3),
+        "max_ms": round(max(tiempos), 3),
+        "consultas": max(consultas),
+    }
+
+
+def ejecutar(app, repeticiones: int = 30, solo: list[str] | None = None, progreso=None) -> dict:
+    from app.extensions import db
+
+    sujetos = elegir_sujetos(app)
+    clientes = {rol: cliente_con_sesion(app, *sujetos[rol]) for rol in ("admin", "tecnico")}
+    with app.app_context():
+        engine = db.engine
+
+    resultados = {}
+    for nombre, (rol, plantilla) in ESCENARIOS.items():
+        if solo and nombre not in solo:
+            continue
+        url = plantilla.format(huerto=sujetos["huerto_id"])
+        resultados[nombre] = medir(clientes[rol], engine, url, repeticiones)
+        if progreso:
+            progreso(nombre, resultados[nombre])
+
+    return {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "maquina": platform.node(),
+            "repeticiones": repeticiones,
+            "cache": bool(app.config.get("BENCH_CON_CACHE")),
+        },
+        "endpoints": resultados,
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ==============================
+# Comparación con línea base
+# ==============================
+def comparar(actual: dict, base: dict, tolerancia: float = TOLERANCIA_POR_DEFECTO,
+             minimo_ms: float = MINIMO_MS) -> list[dict]:
+    """
+    Una fila por endpoint presente en ambos. ``regresion`` es True si subió la
+    cantidad de consultas, si aparece un estado HTTP nuevo, o si p50/p95 empeoran
+    más que ``tolerancia`` (relativa) y más que ``minimo_ms`` (absoluta).
+    """
+    filas = []
+    for nombre, a in actual["endpoints"].items():
+        b = base.get("endpoints", {}).get(nombre)
+        if b is None:
+            continue
+        motivos = []
+        if a["consultas"] > b["consultas"]:
+            motivos.append(f"consultas {b['consultas']} → {a['consultas']}")
+        if set(a["estados"]) - set(b["estados"]):
+            motivos.append(f"estados {b['estados']} → {a['estados']}")
+        for clave in ("p50_ms", "p95_ms"):
+            delta = a[clave] - b[clave]
+            if delta > minimo_ms and delta > b[clave] * tolerancia:
+                motivos.append(f"{clave[:3]} +{delta / b[clave] * 100 if b[clave] else 0:.0f}%")
+        filas.append({
+            "endpoint": nombre,
+            "p50_base": b["p50_ms"], "p50": a["p50_ms"],
+            "p95_base": b["p95_ms"], "p95": a["p95_ms"],
+            "consultas_base": b["consultas"], "consultas": a["consultas"],
+            "regresion": bool(motivos), "motivos": motivos,
+        })
+    return filas
+
+
+# ==============================
+# Escrituras concurrentes (perfiles de SQLite)
+# ==============================
+def preparar_copia_sqlite(origen: str, destino: str, perfil: str):
+    """Copia la BD (API backup, incluye el WAL) dejando el journal_mode que usaría ``perfil``."""
+    import sqlite3
+    from app.database import PERFILES_SQLITE
+
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(destino + sufijo):
+            os.remove(destino + sufijo)
+    with sqlite3.connect(origen) as src, sqlite3.connect(destino) as dst:
+        src.backup(dst)
+    conn = sqlite3.connect(destino)
+    conn.execute(f"PRAGMA journal_mode={PERFILES_SQLITE[perfil].get('journal_mode', 'DELETE')}")
+    conn.close()
+
+
+def _escritor(args):
+    """Proceso que imita a un worker: lee la bitácora y registra una actividad, N veces."""
+    db_path, perfil, escrituras = args
+    from sqlalchemy.exc import OperationalError
+    from app import create_app
+    from app.extensions import db
+    from app.models import ActividadHuerto, Huerto
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}", "DB_PROFILE": perfil,
+                      "CACHE_BACKEND": "", "FRAGMENT_CACHE": False})
+    ok = bloqueos = 0
+    latencias = []
+    with app.app_context():
+        huerto_ids = db.session.scalars(db.select(Huerto.id).order_by(Huerto.id).limit(50)).all()
+        db.session.rollback()
+        inicio = time.time()
+        for i in range(escrituras):
+            hid = huerto_ids[(os.getpid() + i) % len(huerto_ids)]
+            t0 = time.perf_counter()
+            try:
+                db.session.scalars(
+                    db.select(ActividadHuerto).filter_by(huerto_id=hid)
+                    .order_by(ActividadHuerto.fecha.desc()).limit(20)
+                ).all()
+                db.session.add(ActividadHuerto(huerto_id=hid, tipo="riego", descripcion="bench escrituras",
+                                               responsable="bench", fotos=""))
+                db.session.commit()
+                ok += 1
+            except OperationalError:
+                db.session.rollback()
+                bloqueos += 1
+            latencias.append((time.perf_counter() - t0) * 1000)
+        fin = time.time()
+    return {"ok": ok, "bloqueos": bloqueos, "inicio": inicio, "fin": fin, "latencias": latencias}
+
+
+def medir_escrituras(origen: str, perfil: str, procesos: int, escrituras: int, directorio: str) -> dict:
+    """Lanza ``procesos`` escritores simultáneos sobre una copia fresca de ``origen``."""
+    import multiprocessing
+
+    destino = os.path.join(directorio, f"escrituras-{perfil}.db")
+    preparar_copia_sqlite(origen, destino, perfil)
+    with multiprocessing.get_context("spawn").Pool(procesos) as pool:
+        partes = pool.map(_escritor, [(os.path.abspath(destino), perfil, escrituras)] * procesos)
+
+    duracion = max(p["fin"] for p in partes) - min(p["inicio"] for p in partes)
+    latencias = [ms for p in partes for ms in p["latencias"]]
+    ok = sum(p["ok"] for p in partes)
+    return {
+        "perfil": perfil,
+        "procesos": procesos,
+        "escrituras_ok": ok,
+        "bloqueos": sum(p["bloqueos"] for p in partes),
+        "escrituras_por_s": round(ok / duracion, 1) if duracion else 0.0,
+        "p50_ms": round(_percentil(latencias, 0.50), 2),
+        "p99_ms": round(_percentil(latencias, 0.99), 2),
+    }
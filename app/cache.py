@@ -0,0 +1,670 @@
+# app/cache.py
+"""
+Caché de la app: backends clave → valor con TTL, versiones por tag y
+``memoize``.
+
+Backends (``CACHE_BACKEND``):
+
+* ``"lru"`` → ``CacheLRU``: en memoria del proceso, acotado por cantidad de
+  entradas. Es lo más rápido, pero cada worker de gunicorn tiene el suyo:
+  una invalidación en un worker no la ven los demás (con ``DB_SHARDS``,
+  ``load_tenant`` no lee la empresa de este caché).
+* ``"sqlite"`` → ``CacheSQLite`` (por defecto): un archivo SQLite (WAL)
+  compartido por todos los workers de la máquina. Una lectura cuesta decenas
+  de microsegundos.
+* ``"redis"`` → ``CacheRedis``: cliente mínimo del protocolo de Redis (sirve
+  con Redis, Valkey, KeyDB...), para varias máquinas. ``verificar_cache.py``
+  lo prueba contra un servidor falso local.
+* ``""``: sin caché; ``memoize`` y ``{% cache %}`` calculan siempre.
+
+Interfaz común de los backends: ``get``, ``get_many``, ``set``, ``add``
+(solo si la clave no existe), ``delete``, ``incr`` (contador entero, atómico
+también entre procesos) y ``clear``. ``get`` devuelve ``None`` si la clave no
+existe o expiró, así que ``None`` no se puede guardar como valor.
+
+Sobre el backend, ``Cache`` agrega:
+
+* un espacio de claves por BD principal (hash de su URL): dos datasets que
+  compartan el archivo de caché (benchmarks, ``generar_datos --reset``) no
+  se pisan.
+* versiones por tag y empresa (``v:<empresa>:<tag>``): las claves incluyen
+  la versión de sus tags, e invalidar es incrementarla. Los tags son nombres
+  de tabla (``"huertos"``) o filas (``"huerto:<id>"``, de la empresa). Al
+  confirmar una transacción que crea, modifica o borra filas se
+  incrementan solas (hooks de sesión, en ``after_commit`` para que nadie
+  guarde datos aún sin confirmar). Los ``query.update()`` masivos y el SQL
+  directo no pasan por la sesión: ``anotar()`` o el TTL.
+* ``obtener_instancia`` no sabe la empresa antes de cargar la fila: su tag
+  lleva la BD de donde sale (``user:<id>@<bd>``, con ``<bd>`` el shard
+  activo o ``principal``), porque los ids se repiten entre shards.
+* protección contra estampida: si falta una clave, solo un proceso la
+  calcula (candado con ``add``) y el resto espera su resultado.
+
+``memoize`` y ``obtener_instancia`` son lo que usan las vistas.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import random
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import unquote, urlsplit
+
+from flask import current_app, has_app_context, has_request_context
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.database import SesionEnrutada, _es_directorio
+
+log = logging.getLogger(__name__)
+
+PROBABILIDAD_PURGA = 0.005     # en cada set, fracción de veces que se borran las entradas expiradas
+SIN_EMPRESA = "*"
+TAGS_FILA = {"huertos": "huerto", "users": "user", "empresas": "empresa"}   # tablas con tag por fila
+SIN_CACHE = {"password"}       # columnas que obtener_instancia no guarda: se leen de la BD al usarlas
+BD_PRINCIPAL = "principal"
+PENDIENTES = "_cache_pendientes"
+AVISO_CADA_SEGUNDOS = 60       # con el backend caído, un warning por minuto y no uno por operación
+
+
+# ==============================
+# Backends
+# ==============================
+class CacheLRU:
+    """Caché en memoria del proceso, con TTL y desalojo del menos usado. Thread-safe.
+
+    Guarda los objetos tal cual (sin copiar): quien los recibe no debe
+    modificarlos.
+    """
+
+    def __init__(self, max_entradas: int = 2000):
+        self.max_entradas = max_entradas
+        self._datos: OrderedDict = OrderedDict()    # clave -> (valor, expira | None)
+        self._lock = threading.Lock()
+
+    def _vigente(self, clave, ahora):
+        par = self._datos.get(clave)
+        if par is None:
+            return None
+        if par[1] is not None and par[1] <= ahora:
+            del self._datos[clave]
+            return None
+        self._datos.move_to_end(clave)
+        return par[0]
+
+    def _guardar(self, clave, valor, ttl):
+        self._datos[clave] = (valor, time.monotonic() + ttl if ttl else None)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def get(self, clave: str):
+        with self._lock:
+            return self._vigente(clave, time.monotonic())
+
+    def get_many(self, claves) -> dict:
+        ahora = time.monotonic()
+        with self._lock:
+            return {c: v for c in claves if (v := self._vigente(c, ahora)) is not None}
+
+    def set(self, clave: str, valor, ttl: float | None = None):
+        with self._lock:
+            self._guardar(clave, valor, ttl)
+
+    def add(self, clave: str, valor, ttl: float | None = None) -> bool:
+        with self._lock:
+            if self._vigente(clave, time.monotonic()) is not None:
+                return False
+            self._guardar(clave, valor, ttl)
+            return True
+
+    def delete(self, clave: str):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def incr(self, clave: str, delta: int = 1) -> int:
+        with self._lock:
+            valor = (self._vigente(clave, time.monotonic()) or 0) + delta
+            self._guardar(clave, valor, None)
+            return valor
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheSQLite:
+    """Caché en un archivo SQLite compartido entre procesos.
+
+    Los valores se guardan con ``pickle``, salvo los contadores de ``incr``,
+    que quedan como enteros de SQLite para poder sumarlos en la misma
+    sentencia. Una conexión por hilo (y por proceso, por si hubo fork).
+    """
+
+    def __init__(self, ruta: str, timeout: float = 5.0):
+        self.ruta = ruta
+        self.timeout = timeout
+        self._local = threading.local()
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        self._conexion().execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL)"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.ruta, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _cargar(valor):
+        return pickle.loads(valor) if isinstance(valor, bytes) else valor
+
+    def get(self, clave: str):
+        fila = self._conexion().execute(
+            "SELECT valor FROM cache WHERE clave = ? AND (expira IS NULL OR expira > ?)",
+            (clave, time.time()),
+        ).fetchone()
+        return None if fila is None else self._cargar(fila[0])
+
+    def get_many(self, claves) -> dict:
+        claves = list(claves)
+        if not claves:
+            return {}
+        marcas = ",".join("?" * len(claves))
+        filas = self._conexion().execute(
+            f"SELECT clave, valor FROM cache WHERE clave IN ({marcas}) AND (expira IS NULL OR expira > ?)",
+            (*claves, time.time()),
+        ).fetchall()
+        return {c: self._cargar(v) for c, v in filas}
+
+    def set(self, clave: str, valor, ttl: float | None = None):
+        conn = self._conexion()
+        ahora = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)",
+            (clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), ahora + ttl if ttl else None),
+        )
+        if random.random() < PROBABILIDAD_PURGA:
+            conn.execute("DELETE FROM cache WHERE expira IS NOT NULL AND expira <= ?", (ahora,))
+
+    def add(self, clave: str, valor, ttl: float | None = None) -> bool:
+        ahora = time.time()
+        # reemplaza la fila solo si expiró; rowcount = 0 si ya había una vigente
+        cursor = self._conexion().execute(
+            "INSERT INTO cache (clave, valor, expira) VALUES (?, ?, ?) "
+            "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor, expira = excluded.expira "
+            "WHERE cache.expira IS NOT NULL AND cache.expira <= ?",
+            (clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), ahora + ttl if ttl else None, ahora),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, clave: str):
+        self._conexion().execute("DELETE FROM cache WHERE clave = ?", (clave,))
+
+    def incr(self, clave: str, delta: int = 1) -> int:
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO cache (clave, valor, expira) VALUES (?, ?, NULL) "
+                "ON CONFLICT (clave) DO UPDATE SET valor = valor + excluded.valor, expira = NULL",
+                (clave, delta),
+            )
+            valor = conn.execute("SELECT valor FROM cache WHERE clave = ?", (clave,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return valor
+
+    def clear(self):
+        self._conexion().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._conexion().execute(
+            "SELECT COUNT(*) FROM cache WHERE expira IS NULL OR expira > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+class ErrorRedis(Exception):
+    """Respuesta de error del servidor (``-ERR ...``)."""
+
+
+class CacheRedis:
+    """Cliente mínimo de Redis (protocolo RESP2) para ``redis://[:clave@]host:puerto/base``.
+
+    Valores con ``pickle``; los contadores de ``incr`` quedan como enteros de
+    Redis (``INCRBY``). Una conexión por hilo y proceso. Si el servidor no
+    responde, las operaciones fallan de inmediato durante ``reintento``
+    segundos en vez de esperar el timeout en cada request. ``clear`` hace
+    ``FLUSHDB``: usar una base dedicada.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", timeout: float = 1.0, reintento: float = 5.0):
+        partes = urlsplit(url)
+        if partes.scheme != "redis":
+            raise ValueError(f"URL de Redis inválida: {url!r}")
+        self.host = partes.hostname or "localhost"
+        self.port = partes.port or 6379
+        self.base = int(partes.path.lstrip("/") or 0)
+        self.clave = unquote(partes.password) if partes.password else None
+        self.timeout = timeout
+        self.reintento = reintento
+        self._caido_hasta = 0.0
+        self._local = threading.local()
+
+    # --- protocolo ---
+    @staticmethod
+    def _codificar(args) -> bytes:
+        partes = [b"*%d\r\n" % len(args)]
+        for a in args:
+            if not isinstance(a, bytes):
+                a = str(a).encode()
+            partes.append(b"$%d\r\n%s\r\n" % (len(a), a))
+        return b"".join(partes)
+
+    def _leer(self, archivo):
+        linea = archivo.readline()
+        if not linea.endswith(b"\r\n"):
+            raise ConnectionError("Redis cerró la conexión")
+        tipo, resto = linea[:1], linea[1:-2]
+        if tipo == b"+":
+            return resto.decode()
+        if tipo == b"-":
+            raise ErrorRedis(resto.decode())
+        if tipo == b":":
+            return int(resto)
+        if tipo == b"$":
+            n = int(resto)
+            return None if n < 0 else archivo.read(n + 2)[:-2]
+        if tipo == b"*":
+            n = int(resto)
+            return None if n < 0 else [self._leer(archivo) for _ in range(n)]
+        raise ConnectionError(f"Respuesta de Redis inválida: {linea[:40]!r}")
+
+    def _conectar(self):
+        if time.monotonic() < self._caido_hasta:
+            raise ConnectionError(f"Redis {self.host}:{self.port} no disponible")
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            self._caido_hasta = time.monotonic() + self.reintento
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock, self._local.archivo, self._local.pid = sock, sock.makefile("rb"), os.getpid()
+        if self.clave:
+            self._enviar("AUTH", self.clave)
+        if self.base:
+            self._enviar("SELECT", self.base)
+
+    def _cerrar(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def _enviar(self, *args):
+        self._local.sock.sendall(self._codificar(args))
+        return self._leer(self._local.archivo)
+
+    def comando(self, *args):
+        """Ejecuta un comando; reconecta una vez si la conexión se cayó."""
+        for intento in (1, 2):
+            if getattr(self._local, "sock", None) is None or self._local.pid != os.getpid():
+                self._conectar()
+            try:
+                return self._enviar(*args)
+            except OSError:
+                self._cerrar()
+                if intento == 2:
+                    raise
+
+    # --- interfaz de caché ---
+    @staticmethod
+    def _cargar(datos):
+        if datos is None:
+            return None
+        # pickle (protocolo 2+) empieza con 0x80; lo demás son contadores de INCRBY
+        return pickle.loads(datos) if datos[:1] == b"\x80" else int(datos)
+
+    @staticmethod
+    def _milisegundos(ttl) -> int:
+        return max(1, int(ttl * 1000))
+
+    def get(self, clave: str):
+        return self._cargar(self.comando("GET", clave))
+
+    def get_many(self, claves) -> dict:
+        claves = list(claves)
+        if not claves:
+            return {}
+        valores = self.comando("MGET", *claves)
+        return {c: self._cargar(v) for c, v in zip(claves, valores) if v is not None}
+
+    def set(self, clave: str, valor, ttl: float | None = None):
+        args = ["SET", clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL)]
+        if ttl:
+            args += ["PX", self._milisegundos(ttl)]
+        self.comando(*args)
+
+    def add(self, clave: str, valor, ttl: float | None = None) -> bool:
+        args = ["SET", clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), "NX"]
+        if ttl:
+            args += ["PX", self._milisegundos(ttl)]
+        return self.comando(*args) == "OK"
+
+    def delete(self, clave: str):
+        self.comando("DEL", clave)
+
+    def incr(self, clave: str, delta: int = 1) -> int:
+        return self.comando("INCRBY", clave, delta)
+
+    def clear(self):
+        self.comando("FLUSHDB")
+
+    def __len__(self):
+        return self.comando("DBSIZE")
+
+
+def crear_backend(app):
+    """Backend según ``CACHE_BACKEND``; ``None`` si está vacío."""
+    tipo = app.config.get("CACHE_BACKEND", "sqlite")
+    if not tipo:
+        return None
+    if tipo == "lru":
+        return CacheLRU(app.config.get("CACHE_MAX_ENTRADAS", 5000))
+    if tipo == "sqlite":
+        return CacheSQLite(app.config.get("CACHE_PATH") or os.path.join(app.instance_path, "cache", "app.db"))
+    if tipo == "redis":
+        return CacheRedis(app.config.get("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"CACHE_BACKEND desconocido: {tipo!r} (sqlite | lru | redis | vacío)")
+
+
+# ==============================
+# Versiones por tag y cálculo protegido
+# ==============================
+def clave_version(empresa_id, tag: str) -> str:
+    return f"v:{SIN_EMPRESA if empresa_id is None else empresa_id}:{tag}"
+
+
+def tag_fila(tabla: str, ident, bd: str | None = None) -> str:
+    """``huerto:<id>``; con ``bd``, ``huerto:<id>@<bd>`` (ver ``bd_actual``)."""
+    tag = f"{TAGS_FILA.get(tabla, tabla)}:{ident}"
+    return f"{tag}@{bd}" if bd else tag
+
+
+def huella(texto: str) -> str:
+    return hashlib.sha1(texto.encode()).hexdigest()[:10]
+
+
+def bd_actual(mapper=None) -> str:
+    """BD a la que va ``mapper`` ahora: el shard activo (su huella) o ``principal``."""
+    from flask import g
+
+    motor = g.get("_shard_motor") if has_app_context() else None
+    if motor is None or _es_directorio(mapper):
+        return BD_PRINCIPAL
+    esquema = (motor.get_execution_options().get("schema_translate_map") or {}).get(None)
+    return huella(f"{motor.url.render_as_string(hide_password=True)}|{esquema}")
+
+
+class Cache:
+    def __init__(self, backend, ttl: float = 300, espera: float = 2.0, espacio: str = ""):
+        self.backend = backend
+        self.ttl = ttl
+        self.espera = espera
+        self.espacio = f"{espacio}:" if espacio else ""
+        self._ultimo_aviso = 0.0
+
+    @property
+    def compartido(self) -> bool:
+        """False si cada proceso tiene el suyo (LRU): otro proceso no ve sus invalidaciones."""
+        return not isinstance(self.backend, CacheLRU)
+
+    def versiones(self, tags, empresa_id) -> str:
+        """``"tag=propia.comun,..."``: versión de cada tag en la empresa y en todas (``*``)."""
+        if not tags:
+            return ""
+        claves = {t: (self.espacio + clave_version(empresa_id, t), self.espacio + clave_version(None, t))
+                  for t in tags}
+        actuales = self.backend.get_many([c for par in claves.values() for c in par])
+        return ",".join(f"{t}={actuales.get(propia, 0)}.{actuales.get(comun, 0)}"
+                        for t, (propia, comun) in claves.items())
+
+    def invalidar(self, *tags, empresa_id=None):
+        """Sube la versión de ``tags`` en la empresa (``None``: en todas)."""
+        for tag in tags:
+            self.backend.incr(self.espacio + clave_version(empresa_id, tag))
+
+    def _intentar(self, operacion, *args, defecto=None):
+        try:
+            return operacion(*args)
+        except Exception:
+            ahora = time.monotonic()
+            if ahora - self._ultimo_aviso >= AVISO_CADA_SEGUNDOS:
+                self._ultimo_aviso = ahora
+                log.warning("Caché no disponible (%s)", type(self.backend).__name__, exc_info=True)
+            return defecto
+
+    def obtener(self, clave: str, calcular, ttl: float | None = None):
+        """Valor guardado en ``clave`` o ``calcular()``; devuelve ``(valor, acierto)``.
+
+        Si falta la clave, solo quien toma el candado ``lock:<clave>`` calcula;
+        los demás esperan hasta ``espera`` segundos a que aparezca y, si no,
+        calculan ellos. Si el backend falla se calcula sin caché.
+        """
+        clave = self.espacio + clave
+        valor = self._intentar(self.backend.get, clave)
+        if valor is not None:
+            return valor, True
+        candado = f"lock:{clave}"
+        tomado = self._intentar(self.backend.add, candado, os.getpid(), self.espera * 2, defecto=True)
+        if not tomado:
+            limite = time.monotonic() + self.espera
+            pausa = 0.005
+            while time.monotonic() < limite:
+                time.sleep(pausa)
+                pausa = min(pausa * 2, 0.1)
+                valor = self._intentar(self.backend.get, clave)
+                if valor is not None:
+                    return valor, True
+        try:
+            valor = calcular()
+            self._intentar(self.backend.set, clave, valor, ttl or self.ttl)
+        finally:
+            if tomado:
+                self._intentar(self.backend.delete, candado)
+        return valor, False
+
+
+def cache_actual() -> Cache | None:
+    return current_app.extensions.get("cache") if has_app_context() else None
+
+
+def empresa_y_usuario():
+    """Empresa activa y usuario del request (``None`` fuera de un request)."""
+    if not has_request_context():
+        return None, None
+    from flask import g
+    from flask_login import current_user
+    from app.tenancy import empresa_actual_id
+
+    empresa_id = empresa_actual_id()
+    if empresa_id is None and g.get("empresa") is not None:
+        empresa_id = g.empresa.id
+    usuario = current_user.get_id() if current_user.is_authenticated else None
+    return empresa_id, usuario
+
+
+# ==============================
+# memoize e instancias
+# ==============================
+def memoize(ttl: float | None = None, tags=(), por_usuario: bool = False):
+    """Guarda el resultado de la función en el caché de la app.
+
+    La clave incluye la empresa activa (y el usuario con ``por_usuario``),
+    los argumentos y la versión de cada tag en ``tags``. Sin caché
+    configurado, o fuera de una app, llama a la función directo. El
+    resultado debe poder serializarse con pickle (nada de instancias ORM:
+    para eso ``obtener_instancia``). ``funcion.sin_cache`` es la original.
+    """
+    def decorador(fn):
+        nombre = f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def envoltura(*args, **kwargs):
+            cache = cache_actual()
+            if cache is None:
+                return fn(*args, **kwargs)
+            if por_usuario:
+                empresa_id, usuario = empresa_y_usuario()
+            else:
+                from app.tenancy import empresa_actual_id
+                empresa_id, usuario = empresa_actual_id(), None
+            argumentos = repr((args, sorted(kwargs.items()))) if args or kwargs else ""
+            if len(argumentos) > 100:
+                argumentos = hashlib.sha1(argumentos.encode()).hexdigest()
+            try:
+                clave = f"m:{nombre}:e{empresa_id}:u{usuario}:{argumentos}:{cache.versiones(tags, empresa_id)}"
+            except Exception:
+                log.warning("Caché no disponible para %s", nombre, exc_info=True)
+                return fn(*args, **kwargs)
+            # en una tupla, para poder guardar también None
+            (valor,), acierto = cache.obtener(clave, lambda: (fn(*args, **kwargs),), ttl)
+            from app.metricas import registrar_cache
+            registrar_cache("memoize", acierto)
+            return valor
+
+        envoltura.sin_cache = fn
+        return envoltura
+    return decorador
+
+
+def obtener_instancia(modelo, ident, ttl: float | None = None):
+    """``db.session.get(modelo, ident)`` desde el caché (usuario y empresa de cada request).
+
+    Guarda los valores de las columnas (no la instancia: arrastraría las
+    opciones de carga de la sesión) salvo ``SIN_CACHE``, y arma una instancia
+    ya persistida que se adjunta con ``merge(load=False)``, sin SELECT; las
+    columnas de ``SIN_CACHE`` quedan expiradas y se leen de la BD si se usan.
+    Se invalida con el tag de la fila en su BD (``user:<id>@<bd>``) al
+    confirmar cambios en ella.
+    """
+    from app.extensions import db
+
+    cache = cache_actual()
+    if cache is None:
+        return db.session.get(modelo, ident)
+    mapper = sa_inspect(modelo)
+    tag = tag_fila(mapper.local_table.name, ident, bd_actual(mapper))
+    try:
+        clave = f"obj:{tag}:{cache.versiones([tag], None)}"
+    except Exception:
+        log.warning("Caché no disponible para %s", tag, exc_info=True)
+        return db.session.get(modelo, ident)
+
+    def cargar():
+        obj = db.session.get(modelo, ident)
+        if obj is None:
+            return (None,)
+        return ({a.key: getattr(obj, a.key) for a in mapper.column_attrs if a.key not in SIN_CACHE},)
+
+    (columnas,), acierto = cache.obtener(clave, cargar, ttl)
+    from app.metricas import registrar_cache
+    registrar_cache("identidades", acierto)
+    if columnas is None:
+        return None
+    obj = mapper.class_manager.new_instance()
+    for nombre, valor in columnas.items():
+        set_committed_value(obj, nombre, valor)
+    make_transient_to_detached(obj)
+    obj = db.session.merge(obj, load=False)
+    faltantes = [a.key for a in mapper.column_attrs if a.key in SIN_CACHE and a.key in sa_inspect(obj).unloaded]
+    if faltantes:
+        db.session.expire(obj, faltantes)
+    return obj
+
+
+# ==============================
+# Invalidación por eventos del modelo
+# ==============================
+def anotar(sesion, empresa_id, tag: str):
+    """Invalida ``tag`` cuando ``sesion`` confirme (para INSERT masivos o SQL directo)."""
+    sesion.info.setdefault(PENDIENTES, set()).add((empresa_id, tag))
+
+
+def _anotar_cambios(sesion, contexto):
+    if not has_app_context() or "cache" not in current_app.extensions:
+        return
+    for obj in (*sesion.new, *sesion.dirty, *sesion.deleted):
+        mapper = sa_inspect(obj).mapper
+        tabla = mapper.local_table.name
+        empresa_id = getattr(obj, "empresa_id", None)
+        anotar(sesion, empresa_id, tabla)
+        if tabla in TAGS_FILA and obj.id:
+            anotar(sesion, None, tag_fila(tabla, obj.id, bd_actual(mapper)))     # obtener_instancia
+            anotar(sesion, empresa_id, tag_fila(tabla, obj.id))                  # memoize / {% cache %}
+        huerto_id = getattr(obj, "huerto_id", None)
+        if huerto_id:
+            anotar(sesion, empresa_id, tag_fila("huertos", huerto_id))
+
+
+def _incrementar_versiones(sesion):
+    pendientes = sesion.info.pop(PENDIENTES, None)
+    if not pendientes:
+        return
+    cache = cache_actual()
+    if cache is None:
+        return
+    try:
+        for empresa_id, tag in pendientes:
+            cache.invalidar(tag, empresa_id=empresa_id)
+    except Exception:
+        log.warning("No se pudo invalidar el caché", exc_info=True)
+
+
+def _descartar_cambios(sesion):
+    sesion.info.pop(PENDIENTES, None)
+
+
+_hooks_registrados = False
+
+
+def init_cache(app):
+    """Crea el caché según ``CACHE_BACKEND`` y registra los hooks de invalidación."""
+    backend = crear_backend(app)
+    if backend is None:
+        return False
+    app.extensions["cache"] = Cache(
+        backend,
+        ttl=app.config.get("CACHE_TTL", 300),
+        espera=app.config.get("CACHE_ESPERA_SEGUNDOS", 2.0),
+        espacio=huella(str(app.config.get("SQLALCHEMY_DATABASE_URI"))),
+    )
+
+    global _hooks_registrados
+    if not _hooks_registrados:
+        event.listen(SesionEnrutada, "after_flush", _anotar_cambios)
+        event.listen(SesionEnrutada, "after_commit", _incrementar_versiones)
+        event.listen(SesionEnrutada, "after_rollback", _descartar_cambios)
+        _hooks_registrados = True
+    return True
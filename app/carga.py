@@ -0,0 +1,399 @@
+# app/carga.py
+"""
+Pruebas de carga concurrentes contra un servidor WSGI real en localhost.
+
+Levanta la app en un subproceso (gunicorn con N workers sync; si gunicorn no
+está instalado, el servidor de werkzeug con N procesos como aproximación) y
+la recorre con usuarios virtuales en hilos, al estilo de Locust:
+
+* técnicos: login, dashboard, bitácora, registrar actividad con descuento de
+  stock, listar y subir documentos, y a veces dejar abierto el SSE
+  ``/docs/stream`` (cada conexión SSE ocupa un worker sync);
+* administradores: login, dashboard, vista global, bitácora y APIs geo.
+
+Reporta throughput, tasa de error y latencias p50/p95/p99 por endpoint y por
+cantidad de workers. Usa el dataset de ``app.benchmark`` (SQLite).
+"""
+import http.cookiejar
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import date
+
+from app.profiling import _percentil
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT_REQUEST = 30.0
+PDF_FALSO = b"%PDF-1.4\n" + b"0" * 48 * 1024 + b"\n%%EOF\n"   # ~48 KB
+
+
+# ==============================
+# Servidor (subproceso)
+# ==============================
+def app_servidor():
+    """Fábrica para el subproceso: la BD y carpeta de subidas vienen del entorno."""
+    from app import create_app
+
+    return create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.environ['CARGA_DB']}",
+        "UPLOAD_FOLDER": os.environ["CARGA_UPLOADS"],
+        "WTF_CSRF_ENABLED": False,
+    })
+
+
+def servir_werkzeug(puerto: int, workers: int):
+    """Alternativa sin gunicorn: un proceso por request, hasta ``workers`` a la vez."""
+    from werkzeug.serving import run_simple
+
+    run_simple("127.0.0.1", puerto, app_servidor(), threaded=False, processes=workers,
+               use_reloader=False, use_debugger=False)
+
+
+def hay_gunicorn() -> bool:
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Servidor:
+    """Context manager que levanta la app con ``workers`` workers y espera a que acepte conexiones."""
+
+    def __init__(self, db_path: str, workers: int, uploads: str, servidor: str = "auto"):
+        self.workers = workers
+        self.puerto = _puerto_libre()
+        self.tipo = ("gunicorn" if hay_gunicorn() else "werkzeug") if servidor == "auto" else servidor
+        self.env = {
+            **os.environ,
+            "CARGA_DB": os.path.abspath(db_path),
+            "CARGA_UPLOADS": os.path.abspath(uploads),
+            "PYTHONPATH": RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        }
+        self.proceso = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}"
+
+    def __enter__(self):
+        if self.tipo == "gunicorn":
+            cmd = [sys.executable, "-m", "gunicorn", "-w", str(self.workers), "-k", "sync",
+                   "-b", f"127.0.0.1:{self.puerto}", "--timeout", "120", "--log-level", "warning",
+                   "app.carga:app_servidor()"]
+        else:
+            cmd = [sys.executable, "-c",
+                   f"from app.carga import servir_werkzeug; servir_werkzeug({self.puerto}, {self.workers})"]
+        self.proceso = subprocess.Popen(cmd, cwd=RAIZ, env=self.env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                raise RuntimeError(f"El servidor {self.tipo} terminó al arrancar (código {self.proceso.returncode})")
+            try:
+                socket.create_connection(("127.0.0.1", self.puerto), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"El servidor {self.tipo} no respondió en 30s")
+
+    def __exit__(self, *exc):
+        if self.proceso and self.proceso.poll() is None:
+            self.proceso.terminate()
+            try:
+                self.proceso.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+                self.proceso.wait()
+
+
+# ==============================
+# Cliente HTTP y métricas
+# ==============================
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None   # cada redirección se mide como su propio request
+
+
+class SesionHTTP:
+    def __init__(self, base_url: str, timeout: float = TIMEOUT_REQUEST):
+        self.base = base_url
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _SinRedirecciones,
+        )
+
+    def abrir(self, metodo: str, ruta: str, datos: dict | None = None, archivos: dict | None = None):
+        """Devuelve la respuesta abierta (también para 3xx/4xx/5xx, vía HTTPError)."""
+        cuerpo, headers = None, {}
+        if archivos:
+            cuerpo, tipo = _multipart(datos or {}, archivos)
+            headers["Content-Type"] = tipo
+        elif datos is not None:
+            cuerpo = urllib.parse.urlencode(datos).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        req = urllib.request.Request(self.base + ruta, data=cuerpo, headers=headers, method=metodo)
+        try:
+            return self.opener.open(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            return e
+
+
+def _multipart(campos: dict, archivos: dict):
+    limite = uuid.uuid4().hex
+    partes = []
+    for k, v in campos.items():
+        partes.append(f'--{limite}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode())
+    for k, (nombre, contenido, mimetype) in archivos.items():
+        partes.append(
+            f'--{limite}\r\nContent-Disposition: form-data; name="{k}"; filename="{nombre}"\r\n'
+            f"Content-Type: {mimetype}\r\n\r\n".encode() + contenido + b"\r\n"
+        )
+    partes.append(f"--{limite}--\r\n".encode())
+    return b"".join(partes), f"multipart/form-data; boundary={limite}"
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiempos = defaultdict(list)
+        self._errores = defaultdict(int)
+        self._estados = defaultdict(lambda: defaultdict(int))
+
+    def registrar(self, endpoint: str, ms: float, ok: bool, estado):
+        with self._lock:
+            self._tiempos[endpoint].append(ms)
+            self._estados[endpoint][str(estado)] += 1
+            if not ok:
+                self._errores[endpoint] += 1
+
+    def resumen(self, duracion_s: float) -> dict:
+        with self._lock:
+            filas = {}
+            for endpoint, tiempos in sorted(self._tiempos.items()):
+                n = len(tiempos)
+                filas[endpoint] = {
+                    "requests": n,
+                    "rps": round(n / duracion_s, 2),
+                    "errores": self._errores[endpoint],
+                    "tasa_error": round(self._errores[endpoint] / n, 4),
+                    "p50_ms": round(_percentil(tiempos, 0.50), 1),
+                    "p95_ms": round(_percentil(tiempos, 0.95), 1),
+                    "p99_ms": round(_percentil(tiempos, 0.99), 1),
+                    "max_ms": round(max(tiempos), 1),
+                    "estados": dict(self._estados[endpoint]),
+                }
+            total = sum(f["requests"] for f in filas.values())
+            errores = sum(f["errores"] for f in filas.values())
+            todos = [t for ts in self._tiempos.values() for t in ts]
+        return {
+            "total": {
+                "requests": total, "rps": round(total / duracion_s, 2), "errores": errores,
+                "tasa_error": round(errores / total, 4) if total else 0.0,
+                "p95_ms": round(_percentil(todos, 0.95), 1),
+                "p99_ms": round(_percentil(todos, 0.99), 1),
+            },
+            "endpoints": filas,
+        }
+
+
+# ==============================
+# Usuarios virtuales
+# ==============================
+class UsuarioVirtual(threading.Thread):
+    def __init__(self, base_url, empresa_slug, email, metricas, hasta, pensar_s, opciones, rnd):
+        super().__init__(daemon=True)
+        self.http = SesionHTTP(base_url)
+        self.empresa_slug = empresa_slug
+        self.email = email
+        self.metricas = metricas
+        self.hasta = hasta
+        self.pensar_s = pensar_s
+        self.op = opciones
+        self.rnd = rnd
+
+    def paso(self, endpoint, metodo, ruta, esperado=(200,), datos=None, archivos=None):
+        inicio = time.perf_counter()
+        estado = "excepción"
+        try:
+            resp = self.http.abrir(metodo, ruta, datos, archivos)
+            with resp:
+                resp.read()
+            estado = resp.status if hasattr(resp, "status") else resp.code
+        except (OSError, ValueError) as e:   # timeouts, conexión rechazada/reseteada
+            estado = type(e).__name__
+        ms = (time.perf_counter() - inicio) * 1000
+        ok = estado in esperado
+        self.metricas.registrar(endpoint, ms, ok, estado)
+        return ok
+
+    def pensar(self):
+        if self.pensar_s:
+            time.sleep(self.rnd.uniform(0.5, 1.5) * self.pensar_s)
+
+    def login(self) -> bool:
+        return self.paso("login", "POST", "/login", esperado=(302,), datos={
+            "empresa": self.empresa_slug, "email": self.email, "password": self.op["clave"],
+        })
+
+    def run(self):
+        if not self.login():
+            return
+        while time.monotonic() < self.hasta:
+            for accion in self.recorrido():
+                if time.monotonic() >= self.hasta:
+                    return
+                accion()
+                self.pensar()
+
+    def recorrido(self):
+        raise NotImplementedError
+
+
+class TecnicoVirtual(UsuarioVirtual):
+    def __init__(self, *args, huerto_id, quimico_id, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.huerto_id = huerto_id
+        self.quimico_id = quimico_id
+
+    def recorrido(self):
+        h = self.huerto_id
+        pasos = [
+            lambda: self.paso("tecnico_dashboard", "GET", "/tecnico/tecnico/dashboard"),
+            lambda: self.paso("tecnico_bitacora", "GET", f"/tecnico/huerto/{h}/bitacora"),
+            lambda: self.paso("registrar_actividad_form", "GET", f"/tecnico/huerto/{h}/registrar_actividad"),
+            self.registrar_actividad,
+            lambda: self.paso("docs_list", "GET", "/docs/list"),
+        ]
+        if self.rnd.random() < self.op["prob_subida"]:
+            pasos.append(self.subir_documento)
+        if self.rnd.random() < self.op["prob_sse"]:
+            pasos.append(self.escuchar_sse)
+        return pasos
+
+    def registrar_actividad(self):
+        # 302 = guardada; 200 = el formulario se volvió a mostrar con error
+        self.paso("registrar_actividad", "POST", f"/tecnico/huerto/{self.huerto_id}/registrar_actividad",
+                  esperado=(302,), datos={
+                      "fecha": date.today().isoformat(), "tipo": "fertilizacion",
+                      "descripcion": "Aplicación (prueba de carga)",
+                      "quimico_id": self.quimico_id or 0, "cantidad_aplicada": "0.01",
+                  })
+
+    def subir_documento(self):
+        self.paso("docs_subir", "POST", "/docs/admin", esperado=(302,),
+                  datos={"titulo": "Informe de carga", "categoria": "carga", "huerto_id": self.huerto_id},
+                  archivos={"archivo": ("informe.pdf", PDF_FALSO, "application/pdf")})
+
+    def escuchar_sse(self):
+        """Latencia hasta el primer evento; luego mantiene la conexión abierta ``sse_segundos``."""
+        inicio = time.perf_counter()
+        estado = "excepción"
+        try:
+            resp = self.http.abrir("GET", "/docs/stream")
+            with resp:
+                estado = resp.status if hasattr(resp, "status") else resp.code
+                if estado == 200:
+                    primera = resp.readline()
+                    if not primera.startswith(b"data:"):
+                        estado = "sin_evento"
+                    self.metricas.registrar("docs_stream", (time.perf_counter() - inicio) * 1000,
+                                            estado == 200, estado)
+                    fin = min(self.hasta, time.monotonic() + self.op["sse_segundos"])
+                    time.sleep(max(0.0, fin - time.monotonic()))
+                    return
+        except (OSError, ValueError) as e:
+            estado = type(e).__name__
+        self.metricas.registrar("docs_stream", (time.perf_counter() - inicio) * 1000, False, estado)
+
+
+class AdminVirtual(UsuarioVirtual):
+    def __init__(self, *args, huerto_id, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.huerto_id = huerto_id
+
+    def recorrido(self):
+        h = self.huerto_id
+        return [
+            lambda: self.paso("admin_dashboard", "GET", "/admin/dashboard"),
+            lambda: self.paso("vista_global_huerto", "GET", f"/admin/huerto/{h}/vista-global"),
+            lambda: self.paso("bitacora_huerto", "GET", f"/admin/huerto/{h}/bitacora"),
+            lambda: self.paso("geo_api_huertos", "GET", "/geo/api/huertos"),
+            lambda: self.paso("geo_api_actividades", "GET", "/geo/api/actividades"),
+        ]
+
+
+# ==============================
+# Escenario
+# ==============================
+def cuentas_de_prueba(app) -> dict:
+    """Técnicos (con su huerto y un químico con stock) y admins (con un huerto visible) del dataset."""
+    from app.extensions import db
+    from app.models import Empresa, User, Huerto, Bodega, Quimico
+
+    with app.app_context():
+        slugs = dict(db.session.execute(db.select(Empresa.id, Empresa.slug)).all())
+        tecnicos, admins = [], []
+        for u in db.session.scalars(db.select(User).where(User.role == "tecnico").order_by(User.id)):
+            huerto = db.session.scalars(
+                db.select(Huerto).where(Huerto.responsable_id == u.id).order_by(Huerto.id)
+            ).first()
+            if huerto is None:
+                continue
+            quimico_id = db.session.scalar(
+                db.select(Quimico.id).join(Bodega).where(Bodega.huerto_id == huerto.id)
+                .order_by(Quimico.cantidad_litros.desc())
+            )
+            tecnicos.append({"slug": slugs[u.empresa_id], "email": u.email,
+                             "huerto_id": huerto.id, "quimico_id": quimico_id, "admin_id": u.created_by})
+        for u in db.session.scalars(db.select(User).where(User.role == "admin").order_by(User.id)):
+            propio = next((t for t in tecnicos if t["admin_id"] == u.id), None)
+            if propio:
+                admins.append({"slug": slugs[u.empresa_id], "email": u.email, "huerto_id": propio["huerto_id"]})
+    if not tecnicos or not admins:
+        raise RuntimeError("El dataset no tiene técnicos con huertos o admins con técnicos")
+    return {"tecnicos": tecnicos, "admins": admins}
+
+
+def correr(base_url: str, cuentas: dict, n_tecnicos: int, n_admins: int, duracion_s: float,
+           opciones: dict, semilla: int = 0) -> dict:
+    metricas = Metricas()
+    hasta = time.monotonic() + duracion_s
+    rnd = random.Random(semilla)
+    usuarios = []
+    for i in range(n_tecnicos):
+        t = cuentas["tecnicos"][i % len(cuentas["tecnicos"])]
+        usuarios.append(TecnicoVirtual(
+            base_url, t["slug"], t["email"], metricas, hasta, opciones["pensar_s"], opciones,
+            random.Random(rnd.random()), huerto_id=t["huerto_id"], quimico_id=t["quimico_id"],
+        ))
+    for i in range(n_admins):
+        a = cuentas["admins"][i % len(cuentas["admins"])]
+        usuarios.append(AdminVirtual(
+            base_url, a["slug"], a["email"], metricas, hasta, opciones["pensar_s"], opciones,
+            random.Random(rnd.random()), huerto_id=a["huerto_id"],
+        ))
+
+    inicio = time.monotonic()
+    for u in usuarios:
+        u.start()
+        time.sleep(opciones.get("rampa_s", 0) / max(1, len(usuarios)))
+    for u in usuarios:
+        u.join(max(0.0, hasta - time.monotonic()) + TIMEOUT_REQUEST + opciones["sse_segundos"])
+    return metricas.resumen(time.monotonic() - inicio)
@@ -0,0 +1,215 @@
+# app/database.py
+"""
+Perfiles del motor de base de datos.
+
+SQLite: los PRAGMA por conexión (WAL, ``synchronous``, ``busy_timeout``,
+caché, mmap, claves foráneas) se aplican con el evento ``connect`` del motor,
+así valen para cada conexión del pool y de cada worker. WAL deja que lectores
+y un escritor trabajen a la vez y ``busy_timeout`` hace esperar al escritor en
+vez de fallar con "database is locked".
+
+PostgreSQL (u otro servidor): solo ajustes de pool.
+
+El perfil se elige con ``DB_PROFILE`` (ver ``PERFILES_SQLITE``). Al final,
+el enrutamiento opcional de vistas de solo lectura a una réplica.
+"""
+import os
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session as _SesionFlask
+from sqlalchemy import create_engine, event, inspect as sa_inspect
+from sqlalchemy.engine import make_url
+
+PERFIL_POR_DEFECTO = "produccion"
+
+# Orden importa: journal_mode antes que synchronous
+PERFILES_SQLITE = {
+    "produccion": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",        # seguro con WAL; solo se arriesga el último commit ante un corte de luz
+        "busy_timeout": 5000,           # ms
+        "cache_size": -64000,           # negativo = KiB (64 MB por conexión)
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    "desarrollo": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,
+        "foreign_keys": "ON",
+    },
+    # Tests / datos desechables: sin fsync
+    "pruebas": {
+        "synchronous": "OFF",
+        "journal_mode": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    # Valores por defecto de SQLite (para comparar)
+    "ninguno": {},
+}
+
+
+def pragmas_del_perfil(perfil: str, busy_timeout_ms: int | None = None) -> dict:
+    if perfil not in PERFILES_SQLITE:
+        raise ValueError(f"DB_PROFILE desconocido: {perfil!r} (opciones: {', '.join(PERFILES_SQLITE)})")
+    pragmas = dict(PERFILES_SQLITE[perfil])
+    if busy_timeout_ms is not None and "busy_timeout" in pragmas:
+        pragmas["busy_timeout"] = busy_timeout_ms
+    return pragmas
+
+
+def opciones_motor(config) -> dict:
+    """``SQLALCHEMY_ENGINE_OPTIONS`` según el motor de ``SQLALCHEMY_DATABASE_URI``."""
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+
+
+def aplicar_pragmas(dbapi_conn, pragmas: dict):
+    cursor = dbapi_conn.cursor()
+    try:
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+    finally:
+        cursor.close()
+
+
+def configurar_motor(app):
+    """Antes de ``db.init_app``: completa ``SQLALCHEMY_ENGINE_OPTIONS`` (lo explícito en config gana)."""
+    opciones = opciones_motor(app.config)
+    opciones.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = opciones
+
+
+def registrar_pragmas(engine, pragmas: dict):
+    """Aplica ``pragmas`` a cada conexión nueva de ``engine`` (solo SQLite)."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _al_conectar(dbapi_conn, connection_record):
+        aplicar_pragmas(dbapi_conn, pragmas)
+
+
+def init_database(app, db):
+    """Después de ``db.init_app``: registra los PRAGMA del perfil en cada motor SQLite."""
+    pragmas = pragmas_del_perfil(
+        app.config.get("DB_PROFILE", PERFIL_POR_DEFECTO), app.config.get("SQLITE_BUSY_TIMEOUT_MS"),
+    )
+    with app.app_context():
+        motores = list(db.engines.values())
+    for engine in motores:
+        registrar_pragmas(engine, pragmas)
+        # Si el pool ya abrió conexiones (no debería), que se rehagan con los PRAGMA
+        engine.dispose()
+    app.extensions["db_profile"] = pragmas
+
+
+# ==============================
+# Réplica de lectura
+# ==============================
+# Las vistas marcadas con ``@solo_lectura`` (o los blueprints registrados con
+# ``blueprint_solo_lectura``) leen, en requests GET/HEAD, desde un motor
+# aparte: ``DB_READ_URL`` (réplica) o, con SQLite, una segunda conexión al
+# mismo archivo abierta ``mode=ro`` + ``query_only``. Flush, DML y FOR UPDATE
+# siempre van al primario. Tras una escritura, las lecturas de ese usuario
+# siguen yendo al primario ``DB_READ_RYW_SEGUNDOS`` (read-your-writes).
+
+_CLAVE_ESCRITURA = "_bd_escritura"
+_blueprints_lectura: set[str] = set()
+
+
+def solo_lectura(vista):
+    """Marca una vista para leer desde la réplica (solo aplica a GET/HEAD)."""
+    vista._solo_lectura = True
+    return vista
+
+
+def blueprint_solo_lectura(bp):
+    """Todas las vistas GET del blueprint leen desde la réplica."""
+    _blueprints_lectura.add(bp.name)
+    return bp
+
+
+class SesionEnrutada(_SesionFlask):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Empresa con shard propio (app/shards.py): todo menos el directorio de empresas va a su motor.
+        # Lo fija ``activar_shard`` en un request o ``shards.enlazar`` en scripts (g vive en el app context)
+        shard = g.get("_shard_motor") if bind is None and has_app_context() else None
+        if shard is not None and not _es_directorio(mapper):
+            return shard
+        if bind is None and not self._flushing and _leer_de_replica(clause):
+            motor = current_app.extensions.get("db_lectura")
+            if motor is not None:
+                return motor
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _es_directorio(mapper) -> bool:
+    if mapper is None:
+        return False
+    tabla = getattr(sa_inspect(mapper), "local_table", None)
+    return tabla is not None and tabla.name == "empresas"
+
+
+def _leer_de_replica(clause) -> bool:
+    if not has_request_context() or not g.get("_bd_lectura") or g.get("_bd_escribio"):
+        return False
+    if clause is not None and (getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None)):
+        return False
+    return True
+
+
+@event.listens_for(SesionEnrutada, "after_flush")
+def _marcar_escritura(sesion, contexto):
+    if has_request_context() and "db_lectura" in current_app.extensions:
+        g._bd_escribio = True
+        flask_session[_CLAVE_ESCRITURA] = time.time()
+
+
+def _url_sqlite_solo_lectura(engine) -> str | None:
+    ruta = engine.url.database
+    if not ruta or ruta == ":memory:" or ruta.startswith("file:"):
+        return None
+    return f"sqlite:///file:{os.path.abspath(ruta)}?mode=ro&uri=true"
+
+
+def init_replica(app, db):
+    """Crea el motor de lectura si está configurado y el enrutamiento por request."""
+    url = app.config.get("DB_READ_URL")
+    with app.app_context():
+        primario = db.engine
+    pragmas_ro = {}
+    if not url and app.config.get("DB_READ_SQLITE_RO") and primario.dialect.name == "sqlite":
+        url = _url_sqlite_solo_lectura(primario)
+        pragmas_ro = {k: v for k, v in app.extensions.get("db_profile", {}).items()
+                      if k in ("busy_timeout", "cache_size", "mmap_size", "temp_store")}
+        pragmas_ro["query_only"] = "ON"
+    if not url:
+        return False
+
+    motor = create_engine(url, **(opciones_motor({**app.config, "SQLALCHEMY_DATABASE_URI": url})))
+    registrar_pragmas(motor, pragmas_ro)
+    app.extensions["db_lectura"] = motor
+    ventana = app.config.get("DB_READ_RYW_SEGUNDOS", 5)
+
+    @app.before_request
+    def _elegir_motor():
+        if request.method not in ("GET", "HEAD"):
+            return
+        vista = app.view_functions.get(request.endpoint)
+        if not (getattr(vista, "_solo_lectura", False) or request.blueprint in _blueprints_lectura):
+            return
+        if time.time() - flask_session.get(_CLAVE_ESCRITURA, 0) < ventana:
+            return   # escribió hace poco: leer del primario para ver sus propios cambios
+        g._bd_lectura = True
+
+    return True
@@ -0,0 +1,293 @@
+# app/datagen.py
+"""
+Generador de datos sintéticos multi-empresa (pruebas de carga y benchmarks).
+
+Produce empresas con administradores, técnicos, huertos, bodegas, químicos,
+actividades por temporada (con egresos de stock), recomendaciones, parcelas
+con polígono y recorridos GPS. Las distribuciones imitan producción: pocos
+técnicos con muchos huertos, superficies log-normales, riego mucho más
+frecuente que cosecha, temporada sep–abr.
+
+Todo sale de un ``random.Random(semilla)``: la misma semilla y parámetros
+generan exactamente los mismos datos. Se inserta con ``insertar_bulk``
+(INSERT por lotes), así funciona igual en SQLite y PostgreSQL. Los hijos se
+enlazan a sus padres con ``zip(filas, ids)``: depende de que ``insertar_bulk``
+devuelva los ids en el orden de las filas (RETURNING con
+``sort_by_parameter_order``), y ``_insertar`` comprueba que haya uno por fila.
+"""
+import json
+import math
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.importers import insertar_bulk
+from app.models import (
+    Empresa, User, Huerto, Bodega, Quimico, ActividadHuerto, MovimientoInventario,
+    Recomendacion, Parcela, ActividadCampo, ActivityType, tecnico_bodega,
+)
+
+CLAVE_DEMO = "demo123"
+
+PARAMETROS_POR_DEFECTO = {
+    "empresas": 2,
+    "admins": 2,                  # por empresa
+    "tecnicos": 8,                # por empresa
+    "huertos": 12,                # promedio por técnico (distribución sesgada)
+    "bodegas": 1,                 # por huerto
+    "quimicos": 10,               # por bodega
+    "actividades": 40,            # promedio por huerto y temporada
+    "temporadas": 2,
+    "recomendaciones": 4,         # promedio por huerto
+    "parcelas": 3,                # por huerto
+    "recorridos": 2,              # actividades de campo con ruta GPS por parcela
+    "semilla": 42,
+    "ultima_temporada": 2025,     # año en que termina la última temporada (abril)
+}
+
+PERFILES = {
+    "chico": {"empresas": 1, "tecnicos": 3, "huertos": 5, "actividades": 15, "temporadas": 1},
+    "mediano": {},
+    "grande": {"empresas": 5, "admins": 3, "tecnicos": 25, "huertos": 30, "actividades": 60,
+               "temporadas": 3},
+}
+
+# (valor, peso)
+CULTIVOS = [("Arándanos", 30), ("Frambuesa", 25), ("Espárragos", 12), ("Mora Híbrida", 8),
+            ("Cerezo", 10), ("Manzano", 8), ("Avellano", 7)]
+TIPOS_ACTIVIDAD = [("riego", 40), ("fertilizacion", 18), ("control_plagas", 15), ("poda", 12),
+                   ("cosecha", 8), ("otra", 7)]
+TIPOS_QUIMICO = [("fungicida", 30), ("insecticida", 25), ("herbicida", 15), ("fertilizante", 30)]
+PLAGAS = ["Botrytis", "Pulgón", "Arañita roja", "Drosophila suzukii", "Trips", "Oídio"]
+LOCALIDADES = ["Camelia Norte", "Porvenir Norte", "Porvenir Sur", "Remulcao", "El Maitén",
+               "Las Camelias", "Coihueco", "San Nicolás"]
+CATEGORIAS_RECOMENDACION = ["riego", "nutrición", "sanidad", "cosecha", "general"]
+
+# Centro aproximado de la zona de operación (Ñuble)
+LAT_CENTRO, LNG_CENTRO = -36.60, -72.10
+
+ACTIVITY_TYPES = [
+    dict(key="riego", nombre="Riego", color="#0dcaf0", fill_color="#0dcaf033", icon="bi-water"),
+    dict(key="poda", nombre="Poda", color="#6f42c1", fill_color="#6f42c133", icon="bi-scissors"),
+    dict(key="fertilizacion", nombre="Fertilización", color="#198754", fill_color="#19875433", icon="bi-droplet-half"),
+    dict(key="cosecha", nombre="Cosecha", color="#fd7e14", fill_color="#fd7e1433", icon="bi-basket"),
+    dict(key="control_plagas", nombre="Control de Plagas", color="#dc3545", fill_color="#dc354533", icon="bi-bug"),
+    dict(key="otra", nombre="Otra", color="#6c757d", fill_color="#6c757d33", icon="bi-gear"),
+]
+
+
+class GeneradorDatos:
+    def __init__(self, **parametros):
+        desconocidos = set(parametros) - set(PARAMETROS_POR_DEFECTO)
+        if desconocidos:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+        self.p = {**PARAMETROS_POR_DEFECTO, **parametros}
+        self.rnd = random.Random(self.p["semilla"])
+        self.conteos: dict[str, int] = {}
+        # Un solo hash para todos: scrypt por usuario haría lenta la generación
+        self.hash_demo = generate_password_hash(CLAVE_DEMO)
+
+    # ---------- distribuciones ----------
+    def _elegir(self, opciones):
+        valores, pesos = zip(*opciones)
+        return self.rnd.choices(valores, weights=pesos, k=1)[0]
+
+    def _cantidad(self, media: float) -> int:
+        """Entero ≥ 1 con cola larga (log-normal) y media aproximada ``media``."""
+        if media <= 0:
+            return 0
+        sigma = 0.6
+        return max(1, round(self.rnd.lognormvariate(math.log(media) - sigma ** 2 / 2, sigma)))
+
+    def _fecha_en_temporada(self, anio_fin: int) -> date:
+        inicio = date(anio_fin - 1, 9, 1)
+        return inicio + timedelta(days=self.rnd.randrange((date(anio_fin, 4, 30) - inicio).days + 1))
+
+    def _punto(self, lat, lng, radio):
+        return lat + self.rnd.uniform(-radio, radio), lng + self.rnd.uniform(-radio, radio)
+
+    def _insertar(self, modelo, filas):
+        ids = insertar_bulk(modelo, filas)
+        if len(ids) != len(filas):
+            raise RuntimeError(f"{modelo.__tablename__}: {len(ids)} ids para {len(filas)} filas")
+        self.conteos[modelo.__tablename__] = self.conteos.get(modelo.__tablename__, 0) + len(ids)
+        return ids
+
+    # ---------- entidades ----------
+    def generar(self) -> dict:
+        for e in range(1, self.p["empresas"] + 1):
+            self._empresa(e)
+            db.session.commit()
+        return self.conteos
+
+    def _empresa(self, n: int):
+        p = self.p
+        slug = f"demo-{self.p['semilla']}-{n:03d}"
+        if db.session.scalar(db.select(Empresa.id).where(Empresa.slug == slug)):
+            raise ValueError(f"La empresa {slug!r} ya existe; usa otra semilla o --reset")
+        empresa_id = self._insertar(Empresa, [{"nombre": f"Agrícola Demo {n}", "slug": slug}])[0]
+        self._insertar(ActivityType, [dict(t, empresa_id=empresa_id) for t in ACTIVITY_TYPES])
+
+        admin_ids = self._insertar(User, [
+            {"name": f"Admin {j} ({slug})", "email": f"admin{j}@{slug}.example.com", "password": self.hash_demo,
+             "role": "admin", "empresa_id": empresa_id}
+            for j in range(1, p["admins"] + 1)
+        ])
+        tecnicos = [
+            {"name": f"Técnico {j} ({slug})", "email": f"tecnico{j}@{slug}.example.com",
+             "password": self.hash_demo, "role": "tecnico", "empresa_id": empresa_id,
+             "created_by": admin_ids[(j - 1) % len(admin_ids)],
+             "telefono": f"9{self.rnd.randrange(10**7, 10**8)}"}
+            for j in range(1, p["tecnicos"] + 1)
+        ]
+        tecnico_ids = self._insertar(User, tecnicos)
+
+        huertos = []
+        for tid in tecnico_ids:
+            for _ in range(self._cantidad(p["huertos"])):
+                lat, lng = self._punto(LAT_CENTRO, LNG_CENTRO, 0.25)
+                cultivo = self._elegir(CULTIVOS)
+                localidad = self.rnd.choice(LOCALIDADES)
+                huertos.append({
+                    "nombre": f"{cultivo} - Lote {len(huertos) + 1}. {localidad}",
+                    "tipo_cultivo": cultivo,
+                    "superficie_ha": round(self.rnd.lognormvariate(0.2, 0.7), 2),
+                    "ubicacion": f"PC {self.rnd.randrange(1, 120)}. {localidad}",
+                    "localidad": localidad, "comuna": "Chillán", "region": "Ñuble",
+                    "propietario": f"Productor {len(huertos) + 1}",
+                    "responsable_id": tid, "empresa_id": empresa_id,
+                    "center_lat": lat, "center_lng": lng,
+                })
+        huerto_ids = self._insertar(Huerto, huertos)
+
+        bodegas = [
+            {"nombre": f"Bodega {h['nombre'][:60]} #{k + 1}", "ubicacion": h["ubicacion"],
+             "huerto_id": hid, "responsable_id": h["responsable_id"], "empresa_id": empresa_id}
+            for h, hid in zip(huertos, huerto_ids) for k in range(p["bodegas"])
+        ]
+        bodega_ids = self._insertar(Bodega, bodegas)
+        # Las bodegas también quedan asignadas al técnico por la tabla M2M
+        db.session.execute(tecnico_bodega.insert(), [
+            {"tecnico_id": b["responsable_id"], "bodega_id": bid} for b, bid in zip(bodegas, bodega_ids)
+        ])
+
+        quimicos = []
+        for bid in bodega_ids:
+            for k in range(p["quimicos"]):
+                tipo = self._elegir(TIPOS_QUIMICO)
+                quimicos.append({
+                    "nombre": f"{tipo.capitalize()} {chr(65 + k % 26)}{k // 26 or ''}",
+                    "tipo": tipo, "cantidad_litros": round(self.rnd.uniform(20, 400), 1),
+                    "fecha_ingreso": self._fecha_en_temporada(p["ultima_temporada"] - p["temporadas"] + 1),
+                    "bodega_id": bid, "empresa_id": empresa_id,
+                })
+        quimico_ids = self._insertar(Quimico, quimicos)
+        quimicos_por_bodega = {}
+        for q, qid in zip(quimicos, quimico_ids):
+            quimicos_por_bodega.setdefault(q["bodega_id"], []).append(qid)
+        bodega_de_huerto = {b["huerto_id"]: bid for b, bid in zip(bodegas, bodega_ids)}
+
+        tecnico_nombre = {tid: t["name"] for t, tid in zip(tecnicos, tecnico_ids)}
+        self._actividades(empresa_id, huertos, huerto_ids, bodega_de_huerto, quimicos_por_bodega,
+                          tecnico_nombre)
+        self._recomendaciones(empresa_id, huertos, huerto_ids, admin_ids, tecnicos, tecnico_ids)
+        self._parcelas_y_recorridos(empresa_id, huertos, huerto_ids)
+
+    def _actividades(self, empresa_id, huertos, huerto_ids, bodega_de_huerto, quimicos_por_bodega,
+                     tecnico_nombre):
+        p = self.p
+        actividades = []
+        for h, hid in zip(huertos, huerto_ids):
+            quimicos = quimicos_por_bodega.get(bodega_de_huerto.get(hid), [])
+            for t in range(p["temporadas"]):
+                anio_fin = p["ultima_temporada"] - t
+                for _ in range(self._cantidad(p["actividades"])):
+                    tipo = self._elegir(TIPOS_ACTIVIDAD)
+                    fila = {
+                        "huerto_id": hid, "empresa_id": empresa_id,
+                        "fecha": self._fecha_en_temporada(anio_fin), "tipo": tipo,
+                        "descripcion": f"{tipo.replace('_', ' ').capitalize()} en {h['tipo_cultivo'].lower()}",
+                        "responsable": tecnico_nombre[h["responsable_id"]],
+                        "observaciones": None, "fotos": "",
+                    }
+                    if tipo == "control_plagas":
+                        fila["plaga"] = self.rnd.choice(PLAGAS)
+                        fila["nivel_infestacion"] = self._elegir([("bajo", 5), ("medio", 3), ("alto", 1)])
+                    if tipo in ("control_plagas", "fertilizacion") and quimicos:
+                        fila["quimico_id"] = self.rnd.choice(quimicos)
+                        fila["cantidad_aplicada"] = round(self.rnd.uniform(0.5, 8), 2)
+                        fila["dosis"] = f"{self.rnd.choice([0.5, 1, 1.5, 2])} L/ha"
+                    actividades.append(fila)
+        # Orden cronológico, como se registrarían
+        actividades.sort(key=lambda a: (a["fecha"], a["huerto_id"]))
+        actividad_ids = self._insertar(ActividadHuerto, actividades)
+
+        tecnico_id = {nombre: tid for tid, nombre in tecnico_nombre.items()}
+        self._insertar(MovimientoInventario, [
+            {"quimico_id": a["quimico_id"], "tipo": "egreso", "cantidad": a["cantidad_aplicada"],
+             "fecha": datetime.combine(a["fecha"], datetime.min.time()) + timedelta(hours=9),
+             "usuario_id": tecnico_id[a["responsable"]], "referencia_actividad_id": aid,
+             "empresa_id": empresa_id}
+            for a, aid in zip(actividades, actividad_ids) if a.get("quimico_id")
+        ])
+
+    def _recomendaciones(self, empresa_id, huertos, huerto_ids, admin_ids, tecnicos, tecnico_ids):
+        p = self.p
+        creador = {tid: t["created_by"] for t, tid in zip(tecnicos, tecnico_ids)}
+        filas = []
+        for h, hid in zip(huertos, huerto_ids):
+            for _ in range(self.rnd.randrange(0, 2 * p["recomendaciones"] + 1)):
+                dia = self._fecha_en_temporada(p["ultima_temporada"] - self.rnd.randrange(p["temporadas"]))
+                categoria = self.rnd.choice(CATEGORIAS_RECOMENDACION)
+                filas.append({
+                    "contenido": f"Revisar {categoria} en {h['tipo_cultivo'].lower()}: "
+                                 f"ajustar según monitoreo de {self.rnd.choice(PLAGAS).lower()}.",
+                    "fecha": datetime.combine(dia, datetime.min.time()) + timedelta(hours=self.rnd.randrange(8, 19)),
+                    "categoria": categoria,
+                    "estado": self._elegir([("pendiente", 3), ("completada", 6), ("en_proceso", 1)]),
+                    "tecnico_id": h["responsable_id"], "autor_id": creador[h["responsable_id"]],
+                    "huerto_id": hid, "empresa_id": empresa_id,
+                })
+        self._insertar(Recomendacion, filas)
+
+    def _parcelas_y_recorridos(self, empresa_id, huertos, huerto_ids):
+        p = self.p
+        parcelas = []
+        for h, hid in zip(huertos, huerto_ids):
+            for k in range(p["parcelas"]):
+                lat, lng = self._punto(h["center_lat"], h["center_lng"], 0.004)
+                d = 0.0008 * math.sqrt(max(h["superficie_ha"], 0.1))
+                anillo = [[lng - d, lat - d], [lng + d, lat - d], [lng + d, lat + d], [lng - d, lat + d], [lng - d, lat - d]]
+                parcelas.append({
+                    "nombre": f"Sector {k + 1}", "huerto_id": hid, "empresa_id": empresa_id,
+                    "geom_geojson": json.dumps({"type": "Polygon", "coordinates": [anillo]}),
+                    "_centro": (lat, lng, d),
+                })
+        centros = [pa.pop("_centro") for pa in parcelas]
+        parcela_ids = self._insertar(Parcela, parcelas)
+
+        recorridos = []
+        for pa, pid, (lat, lng, d) in zip(parcelas, parcela_ids, centros):
+            for _ in range(p["recorridos"]):
+                puntos, plat, plng = [], lat, lng
+                for _ in range(self.rnd.randrange(8, 40)):
+                    plat = min(lat + d, max(lat - d, plat + self.rnd.uniform(-d / 5, d / 5)))
+                    plng = min(lng + d, max(lng - d, plng + self.rnd.uniform(-d / 5, d / 5)))
+                    puntos.append([round(plng, 6), round(plat, 6)])
+                dia = self._fecha_en_temporada(p["ultima_temporada"] - self.rnd.randrange(p["temporadas"]))
+                recorridos.append({
+                    "huerto_id": pa["huerto_id"], "parcela_id": pid, "empresa_id": empresa_id,
+                    "tipo": self._elegir(TIPOS_ACTIVIDAD), "descripcion": "Recorrido de monitoreo",
+                    "lat": puntos[0][1], "lng": puntos[0][0],
+                    "ruta_geojson": json.dumps({"type": "LineString", "coordinates": puntos}),
+                    "fecha": datetime.combine(dia, datetime.min.time()) + timedelta(hours=self.rnd.randrange(7, 18)),
+                    "duracion_min": self.rnd.randrange(10, 180),
+                })
+        self._insertar(ActividadCampo, recorridos)
+
+
+def generar_datos(**parametros) -> dict:
+    """Genera el dataset y devuelve ``{tabla: filas_insertadas}``. Hace commit por empresa."""
+    return GeneradorDatos(**parametros).generar()
@@ -1,4 +1,9 @@
 # app/extensions.py
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from app.database import SesionEnrutada
+from app.tenancy import ConsultaTenant
+
+# La sesión enruta las vistas de solo lectura a la réplica (si hay una configurada)
+# y filtra por empresa (app/tenancy.py)
+db = SQLAlchemy(query_class=ConsultaTenant, session_options={"class_": SesionEnrutada})
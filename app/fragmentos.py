@@ -0,0 +1,140 @@
+# app/fragmentos.py
+"""
+Caché de fragmentos de plantilla: ``{% cache nombre, ttl, dependencias... %}``.
+
+    {% cache "admin_bodegas", 600, "bodegas", "huertos", "users" %}
+      ... HTML caro de armar ...
+    {% endcache %}
+
+La clave de cada fragmento combina su nombre, una firma del contenido de las
+plantillas (tras un deploy que cambia plantillas no se sirve HTML viejo), la
+empresa y el usuario del request (el panel de un admin muestra solo lo suyo)
+y la versión de cada dependencia. Las dependencias son tags del caché de la
+app (``app/cache.py``): nombres de tabla (``"bodegas"``) o ``"huerto:<id>"``,
+que suben de versión al confirmar cambios en esas filas.
+
+Usa el backend de ``CACHE_BACKEND``; ``FRAGMENT_CACHE = 0`` (o no tener
+caché) deja el bloque renderizándose siempre.
+
+Para que un acierto ahorre también las consultas, la vista pasa los datos
+del fragmento con ``perezoso(fn)``: la consulta corre solo si el bloque se
+renderiza.
+"""
+import hashlib
+import os
+
+from flask import current_app, has_app_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from app.cache import empresa_y_usuario
+
+
+# ==============================
+# Datos diferidos para la vista
+# ==============================
+class Perezoso:
+    """Valor que se calcula al primer uso (iterar, ``len``, ``bool``, atributo o índice)."""
+
+    __slots__ = ("_fn", "_valor", "_listo")
+
+    def __init__(self, fn):
+        self._fn = fn
+        self._listo = False
+        self._valor = None
+
+    def valor(self):
+        if not self._listo:
+            self._valor = self._fn()
+            self._listo = True
+        return self._valor
+
+    def __iter__(self):
+        return iter(self.valor())
+
+    def __len__(self):
+        return len(self.valor())
+
+    def __bool__(self):
+        return bool(self.valor())
+
+    def __getitem__(self, clave):
+        return self.valor()[clave]
+
+    def __getattr__(self, nombre):
+        return getattr(self.valor(), nombre)
+
+
+def perezoso(fn) -> Perezoso:
+    return Perezoso(fn)
+
+
+# ==============================
+# Claves
+# ==============================
+def firma_plantillas(app) -> str:
+    """Hash corto del contenido de todas las plantillas de la app."""
+    h = hashlib.sha1()
+    carpeta = os.path.join(app.root_path, app.template_folder)
+    for raiz, _, archivos in sorted(os.walk(carpeta)):
+        for nombre in sorted(archivos):
+            ruta = os.path.join(raiz, nombre)
+            h.update(os.path.relpath(ruta, carpeta).encode())
+            with open(ruta, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()[:10]
+
+
+class Fragmentos:
+    def __init__(self, cache, firma: str):
+        self.cache = cache
+        self.firma = firma
+
+    def clave(self, nombre: str, dependencias) -> str:
+        empresa_id, usuario = empresa_y_usuario()
+        return f"frag:{self.firma}:{nombre}:e{empresa_id}:u{usuario}:{self.cache.versiones(dependencias, empresa_id)}"
+
+
+# ==============================
+# Extensión Jinja
+# ==============================
+class FragmentosExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        if len(args) < 2:
+            parser.fail("{% cache %} necesita al menos nombre y ttl", lineno)
+        cuerpo = parser.parse_statements(("name:endcache",), drop_needle=True)
+        llamada = self.call_method("_fragmento", [nodes.List(args)])
+        return nodes.CallBlock(llamada, [], [], cuerpo).set_lineno(lineno)
+
+    def _fragmento(self, args, caller):
+        fragmentos = current_app.extensions.get("fragmentos") if has_app_context() else None
+        if fragmentos is None:
+            return caller()
+        nombre, ttl, *dependencias = args
+        try:
+            clave = fragmentos.clave(nombre, dependencias)
+        except Exception:
+            current_app.logger.warning("Caché de fragmentos no disponible", exc_info=True)
+            return caller()
+
+        html, acierto = fragmentos.cache.obtener(clave, lambda: str(caller()), ttl)
+        from app.metricas import registrar_cache
+        registrar_cache("fragmentos", acierto)
+        return Markup(html)
+
+
+def init_fragmentos(app):
+    """Registra ``{% cache %}`` (siempre) y, si hay caché de la app, lo usa para los fragmentos."""
+    app.jinja_env.add_extension(FragmentosExtension)
+    cache = app.extensions.get("cache")
+    if not app.config.get("FRAGMENT_CACHE", True) or cache is None:
+        return False
+    app.extensions["fragmentos"] = Fragmentos(cache, firma_plantillas(app))
+    return True
@@ -0,0 +1,87 @@
+# app/importers/__init__.py
+"""
+Importadores masivos (Excel de preparación, CSV de clientes).
+
+Todos siguen el mismo esquema: se lee la fuente una vez, se precargan las
+claves naturales existentes en sets y se insertan solo las filas nuevas con
+un INSERT por lote, en vez de un ``filter_by(...).first()`` + ``add`` por fila.
+"""
+import math
+
+from sqlalchemy import insert
+
+from app.cache import anotar
+from app.extensions import db
+from app.models import Cambio, MODELOS_SINCRONIZADOS
+from app.shards import verificar_enlace
+
+LOTE_INSERT = 1000
+
+
+class ResultadoImport:
+    """Conteo de una etapa (hoja, archivo): creados, omitidos y errores por línea."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.creados = 0
+        self.omitidos = 0
+        self.errores: list[tuple[int, str]] = []
+
+    def error(self, linea: int, mensaje: str):
+        self.errores.append((linea, mensaje))
+
+    def resumen(self) -> str:
+        return (f"{self.nombre}: {self.creados} creados, {self.omitidos} omitidos, "
+                f"{len(self.errores)} con error")
+
+    def __repr__(self):
+        return f"<ResultadoImport {self.resumen()}>"
+
+
+def texto(valor) -> str | None:
+    """Normaliza una celda: ``None``/NaN/vacío → ``None``; el resto, string sin espacios."""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # teléfonos/RUT que Excel guarda como número
+    s = str(valor).strip()
+    return s or None
+
+
+def numero(valor) -> float | None:
+    s = texto(valor)
+    if s is None:
+        return None
+    return float(s.replace(",", "."))
+
+
+def insertar_bulk(modelo, filas: list[dict]) -> list[int]:
+    """
+    INSERT por lotes (executemany) devolviendo los ids, en el mismo orden que
+    ``filas`` (``ids[i]`` es el de ``filas[i]``). Los INSERT masivos no
+    disparan los eventos de mapper ni de flush, así que el registro de cambios
+    para la sincronización delta se escribe aquí mismo, y las tablas se anotan
+    para invalidar el caché de la app al confirmar. Con shards, la sesión debe
+    estar enlazada al de la empresa de las filas (``shards.enlazar``).
+    """
+    verificar_enlace({f.get("empresa_id") for f in filas})
+    ids = []
+    for i in range(0, len(filas), LOTE_INSERT):
+        lote = filas[i:i + LOTE_INSERT]
+        # con executemany, RETURNING no garantiza el orden de las filas salvo que se pida:
+        # los ids se cruzan con ``filas`` (aquí y en quien llama), así que tiene que coincidir
+        ids.extend(db.session.scalars(
+            insert(modelo).returning(modelo.id, sort_by_parameter_order=True), lote
+        ).all())
+
+    for empresa_id in {f.get("empresa_id") for f in filas}:
+        anotar(db.session, empresa_id, modelo.__tablename__)
+
+    if modelo in MODELOS_SINCRONIZADOS and ids:
+        cambios = [
+            {"empresa_id": f["empresa_id"], "entidad": modelo.__tablename__,
+             "entidad_id": id_, "op": "upsert"}
+            for f, id_ in zip(filas, ids)
+        ]
+        db.session.execute(insert(Cambio), cambios)
+    return ids
@@ -0,0 +1,270 @@
+# app/importers/clientes_csv.py
+"""
+Importador de los CSV de productores por técnico (``<nombre_tecnico>_clientes.csv``).
+
+Columnas: ``Nombre, Telefono, Correo, Contraseña, Cultivos_Ubicacion_Superficie``.
+La última empaqueta varios cultivos separados por ``|``::
+
+    Frambuesa (0.4 ha) - PC 30 LT B-2 PP Las Camelias | Arándanos (1.07 ha) - Lote D-1. Camelia Norte
+
+Cada productor se crea como usuario (rol ``productor``) y cada cultivo como un
+``Huerto`` a cargo del técnico cuyo nombre da el archivo. El archivo se lee en
+streaming y se carga por lotes; un directorio completo se procesa en
+paralelo (lectura + hash de contraseñas en procesos, escritura en serie).
+"""
+import csv
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.extensions import db
+from app.importers import ResultadoImport, texto, insertar_bulk
+from app.importers.usuarios import provisionar_usuarios, _hashear_lote
+from app.models import User, Huerto
+
+COLUMNAS = ("Nombre", "Telefono", "Correo", "Contraseña", "Cultivos_Ubicacion_Superficie")
+SUFIJO_ARCHIVO = "_clientes.csv"
+ROL_PRODUCTOR = "productor"
+LOTE_FILAS = 500
+
+_RE_CULTIVO = re.compile(r"^(?P<cultivo>.+?)\s*\(\s*(?P<ha>[\d.,]+)\s*ha\s*\)\s*(?:-\s*(?P<ubicacion>.*))?$")
+
+
+class LineaInvalida(ValueError):
+    """Línea del CSV que no se puede importar; se informa y se sigue con la siguiente."""
+
+
+# ==============================
+# Parseo
+# ==============================
+def _normalizar(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "")
+    return " ".join("".join(c for c in s if not unicodedata.combining(c)).lower().split())
+
+
+def parsear_cultivos(valor: str) -> list[dict]:
+    """``"Frambuesa (0.4 ha) - Lote D-1. Camelia Norte | ..."`` → ``[{"cultivo", "superficie_ha", "ubicacion", "localidad"}]``."""
+    cultivos = []
+    for entrada in (valor or "").split("|"):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        m = _RE_CULTIVO.match(entrada)
+        if not m:
+            raise LineaInvalida(f"Cultivo con formato inválido: {entrada!r}")
+        ubicacion = (m.group("ubicacion") or "").strip() or None
+        localidad = None
+        if ubicacion and ". " in ubicacion:
+            localidad = ubicacion.rsplit(". ", 1)[1].strip() or None
+        cultivos.append({
+            "cultivo": m.group("cultivo").strip(),
+            "superficie_ha": float(m.group("ha").replace(",", ".")),
+            "ubicacion": ubicacion,
+            "localidad": localidad,
+        })
+    if not cultivos:
+        raise LineaInvalida("Sin cultivos")
+    return cultivos
+
+
+def leer_clientes(path: str):
+    """Genera ``(linea, cliente, error)`` fila a fila, sin cargar el archivo entero."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        lector = csv.DictReader(f)
+        faltantes = [c for c in COLUMNAS if c not in (lector.fieldnames or [])]
+        if faltantes:
+            yield 1, None, f"Faltan columnas: {', '.join(faltantes)}"
+            return
+        for linea, fila in enumerate(lector, start=2):
+            try:
+                email = (texto(fila["Correo"]) or "").lower()
+                if not email or not texto(fila["Nombre"]):
+                    raise LineaInvalida("Faltan nombre o correo")
+                cliente = {
+                    "linea": linea,
+                    "name": texto(fila["Nombre"]),
+                    "email": email,
+                    "telefono": texto(fila["Telefono"]),
+                    "password": texto(fila["Contraseña"]),
+                    "cultivos": parsear_cultivos(fila["Cultivos_Ubicacion_Superficie"]),
+                }
+            except LineaInvalida as e:
+                yield linea, None, str(e)
+                continue
+            yield linea, cliente, None
+
+
+def nombre_tecnico_archivo(path: str) -> str:
+    """``manuel_vergara_clientes.csv`` → ``"manuel vergara"``."""
+    base = os.path.basename(path)
+    if base.endswith(SUFIJO_ARCHIVO):
+        base = base[: -len(SUFIJO_ARCHIVO)]
+    return _normalizar(base.replace("_", " "))
+
+
+def buscar_tecnico(empresa_id: int, nombre: str) -> User | None:
+    """
+    Usuario de la empresa cuyo nombre contiene todas las palabras de ``nombre``
+    (como prefijo, sin tildes: "marco alegria" encuentra "Marcos Alegría").
+    Se prefiere el rol técnico.
+    """
+    buscadas = _normalizar(nombre).split()
+    candidatos = []
+    for u in User.query.filter(User.empresa_id == empresa_id, User.role != ROL_PRODUCTOR):
+        palabras = _normalizar(u.name).split()
+        if buscadas and all(any(p.startswith(b) for p in palabras) for b in buscadas):
+            candidatos.append(u)
+    candidatos.sort(key=lambda u: (u.role != "tecnico", u.id))
+    return candidatos[0] if candidatos else None
+
+
+# ==============================
+# Carga
+# ==============================
+def _clave_huerto(propietario, cultivo, ubicacion):
+    return (_normalizar(propietario or ""), _normalizar(cultivo or ""), _normalizar(ubicacion or ""))
+
+
+def _cargar_lote(clientes, empresa_id, tecnico, huertos_existentes, res_usuarios, res_huertos,
+                 procesos=None):
+    provisionar_usuarios(
+        clientes, empresa_id, created_by=tecnico.id, rol_por_defecto=ROL_PRODUCTOR,
+        procesos=procesos, res=res_usuarios,
+    )
+    nuevos = []
+    for c in clientes:
+        for cu in c["cultivos"]:
+            clave = _clave_huerto(c["name"], cu["cultivo"], cu["ubicacion"])
+            if clave in huertos_existentes:
+                res_huertos.omitidos += 1
+                continue
+            huertos_existentes.add(clave)
+            nombre = f"{cu['cultivo']} - {cu['ubicacion']}" if cu["ubicacion"] else cu["cultivo"]
+            nuevos.append({
+                "nombre": nombre[:120],
+                "tipo_cultivo": cu["cultivo"],
+                "superficie_ha": cu["superficie_ha"],
+                "ubicacion": (cu["ubicacion"] or "")[:200] or None,
+                "localidad": cu["localidad"],
+                "propietario": c["name"][:120],
+                "telefono": (c.get("telefono") or "")[:20] or None,
+                "responsable_id": tecnico.id,
+                "empresa_id": empresa_id,
+            })
+    insertar_bulk(Huerto, nuevos)
+    res_huertos.creados += len(nuevos)
+
+
+def _huertos_existentes(empresa_id) -> set:
+    filas = db.session.execute(
+        db.select(Huerto.propietario, Huerto.tipo_cultivo, Huerto.ubicacion)
+        .where(Huerto.empresa_id == empresa_id)
+    )
+    return {_clave_huerto(*f) for f in filas}
+
+
+def _resultados(path):
+    nombre = os.path.basename(path)
+    return ResultadoImport(f"{nombre} · productores"), ResultadoImport(f"{nombre} · huertos")
+
+
+def _cerrar_lote(dry_run):
+    if dry_run:
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def importar_archivo(path: str, empresa_id: int, *, tecnico: User | None = None,
+                     dry_run: bool = False, lote: int = LOTE_FILAS,
+                     procesos: int | None = None) -> list[ResultadoImport]:
+    """
+    Importa un CSV en lotes de ``lote`` productores (un commit por lote).
+    Devuelve ``[productores, huertos]`` con los conteos y errores por línea.
+    """
+    res_usuarios, res_huertos = _resultados(path)
+    tecnico = tecnico or buscar_tecnico(empresa_id, nombre_tecnico_archivo(path))
+    if not tecnico:
+        res_usuarios.error(0, f"No hay técnico que coincida con {nombre_tecnico_archivo(path)!r}")
+        return [res_usuarios, res_huertos]
+
+    existentes = _huertos_existentes(empresa_id)
+    try:
+        pendientes = []
+        for linea, cliente, error in leer_clientes(path):
+            if error:
+                res_usuarios.error(linea, error)
+                continue
+            pendientes.append(cliente)
+            if len(pendientes) >= lote:
+                _cargar_lote(pendientes, empresa_id, tecnico, existentes, res_usuarios, res_huertos, procesos)
+                _cerrar_lote(dry_run)
+                pendientes = []
+        if pendientes:
+            _cargar_lote(pendientes, empresa_id, tecnico, existentes, res_usuarios, res_huertos, procesos)
+            _cerrar_lote(dry_run)
+    finally:
+        if dry_run:
+            db.session.rollback()
+    return [res_usuarios, res_huertos]
+
+
+def _preparar_archivo(path: str, emails_existentes: set) -> tuple[str, list, list]:
+    """En un proceso aparte: parsea el archivo y hashea las contraseñas de los productores nuevos."""
+    clientes, errores = [], []
+    for linea, cliente, error in leer_clientes(path):
+        if error:
+            errores.append((linea, error))
+            continue
+        clientes.append(cliente)
+    nuevos = [c for c in clientes if c["email"] not in emails_existentes and c["password"]]
+    for c, h in zip(nuevos, _hashear_lote([c["password"] for c in nuevos])):
+        c["password_hash"] = h
+    return path, clientes, errores
+
+
+def importar_directorio(directorio: str, empresa_id: int, *, workers: int | None = None,
+                        dry_run: bool = False) -> list[ResultadoImport]:
+    """
+    Importa todos los ``*_clientes.csv`` de ``directorio``. Los archivos se
+    parsean y hashean en paralelo; la escritura (SQLite admite un solo
+    escritor) se hace en este proceso a medida que cada archivo termina.
+    """
+    archivos = sorted(
+        os.path.join(directorio, n) for n in os.listdir(directorio) if n.endswith(SUFIJO_ARCHIVO)
+    )
+    if not archivos:
+        return []
+
+    tecnicos = {p: buscar_tecnico(empresa_id, nombre_tecnico_archivo(p)) for p in archivos}
+    emails = set(db.session.scalars(db.select(User.email).where(User.empresa_id == empresa_id)))
+    existentes = _huertos_existentes(empresa_id)
+
+    resultados = {}
+    workers = min(workers or os.cpu_count() or 1, len(archivos))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuros = [
+                pool.submit(_preparar_archivo, p, emails) for p in archivos if tecnicos[p]
+            ]
+            for p in archivos:
+                if not tecnicos[p]:
+                    res_u, res_h = _resultados(p)
+                    res_u.error(0, f"No hay técnico que coincida con {nombre_tecnico_archivo(p)!r}")
+                    resultados[p] = [res_u, res_h]
+
+            for futuro in as_completed(futuros):
+                path, clientes, errores = futuro.result()
+                res_u, res_h = _resultados(path)
+                for linea, error in errores:
+                    res_u.error(linea, error)
+                for i in range(0, len(clientes), LOTE_FILAS):
+                    _cargar_lote(clientes[i:i + LOTE_FILAS], empresa_id, tecnicos[path],
+                                 existentes, res_u, res_h)
+                    _cerrar_lote(dry_run)
+                resultados[path] = [res_u, res_h]
+    finally:
+        if dry_run:
+            db.session.rollback()
+    return [r for p in archivos for r in resultados[p]]
@@ -0,0 +1,217 @@
+# app/importers/excel.py
+"""
+Carga del Excel de preparación (``PREPARACION AGRODESK.xlsx``).
+
+Hojas reconocidas (en este orden): Empresas, ActivityTypes, Administradores,
+Técnicos, Huertos y Bodegas. Cada hoja se lee una sola vez, las claves
+naturales ya existentes (slug, email, key, nombre) se precargan en sets y las
+filas nuevas se insertan en bloque. Todo corre en una transacción: con
+``dry_run`` se informa lo que se haría y se deshace.
+"""
+from app.extensions import db
+from app.importers import ResultadoImport, texto, numero, insertar_bulk
+from app.importers.usuarios import provisionar_usuarios
+from app.models import User, Empresa, Huerto, Bodega, ActivityType
+from app.shards import enlazar
+
+EMPRESA_POR_DEFECTO = "consultora-chs"
+
+
+def leer_hojas(path: str) -> dict[str, list[dict]]:
+    """Lee todas las hojas de una pasada: ``{hoja: [fila, ...]}``."""
+    import pandas as pd  # solo lo necesitan los importadores de Excel
+
+    hojas = pd.read_excel(path, sheet_name=None, dtype=object)
+    return {
+        nombre.strip(): [
+            {str(k).strip(): texto(v) for k, v in fila.items()}
+            for fila in df.to_dict("records")
+        ]
+        for nombre, df in hojas.items()
+    }
+
+
+def _lineas(filas):
+    # Línea 1 del Excel es el encabezado
+    return enumerate(filas, start=2)
+
+
+# ==============================
+# Hojas
+# ==============================
+def _importar_empresas(filas, res: ResultadoImport):
+    existentes = set(db.session.scalars(db.select(Empresa.slug)))
+    nuevas = []
+    for linea, f in _lineas(filas):
+        slug = (f.get("slug") or "").lower()
+        if not slug or not f.get("nombre"):
+            res.error(linea, "Faltan nombre o slug")
+            continue
+        if slug in existentes:
+            res.omitidos += 1
+            continue
+        existentes.add(slug)
+        nuevas.append({"nombre": f["nombre"], "slug": slug})
+    insertar_bulk(Empresa, nuevas)
+    res.creados += len(nuevas)
+
+
+def _importar_activity_types(filas, empresa, res: ResultadoImport):
+    existentes = set(db.session.scalars(
+        db.select(ActivityType.key).where(ActivityType.empresa_id == empresa.id)
+    ))
+    nuevos = []
+    for linea, f in _lineas(filas):
+        key = f.get("key")
+        if not key or not f.get("nombre"):
+            res.error(linea, "Faltan key o nombre")
+            continue
+        if key in existentes:
+            res.omitidos += 1
+            continue
+        existentes.add(key)
+        nuevos.append({
+            "key": key, "nombre": f["nombre"], "empresa_id": empresa.id,
+            "color": f.get("color") or "#0d6efd", "fill_color": f.get("fill_color"),
+            "icon": f.get("icon") or "bi-gear",
+        })
+    insertar_bulk(ActivityType, nuevos)
+    res.creados += len(nuevos)
+
+
+def _importar_usuarios(filas, empresa, res: ResultadoImport, rol_por_defecto, created_by=None):
+    usuarios = [dict(f, linea=linea) for linea, f in _lineas(filas)]
+    provisionar_usuarios(usuarios, empresa.id, created_by=created_by,
+                         rol_por_defecto=rol_por_defecto, res=res)
+
+
+def _importar_huertos(filas, empresa, res: ResultadoImport):
+    existentes = set(db.session.scalars(
+        db.select(Huerto.nombre).where(Huerto.empresa_id == empresa.id)
+    ))
+    responsables = dict(db.session.execute(
+        db.select(User.email, User.id).where(User.empresa_id == empresa.id)
+    ).all())
+    nuevos = []
+    for linea, f in _lineas(filas):
+        nombre = f.get("nombre")
+        if not nombre:
+            res.error(linea, "Falta nombre")
+            continue
+        if nombre in existentes:
+            res.omitidos += 1
+            continue
+        try:
+            superficie = numero(f.get("superficie_ha")) or 0.0
+        except ValueError:
+            res.error(linea, f"Superficie inválida: {f.get('superficie_ha')!r}")
+            continue
+        email = (f.get("responsable_email") or "").lower()
+        if email and email not in responsables:
+            res.error(linea, f"Responsable inexistente: {email}")
+            continue
+        existentes.add(nombre)
+        nuevos.append({
+            "nombre": nombre, "tipo_cultivo": f.get("tipo_cultivo"),
+            "superficie_ha": superficie, "ubicacion": f.get("ubicacion"),
+            "responsable_id": responsables.get(email), "empresa_id": empresa.id,
+        })
+    insertar_bulk(Huerto, nuevos)
+    res.creados += len(nuevos)
+
+
+def _importar_bodegas(filas, empresa, res: ResultadoImport):
+    existentes = set(db.session.scalars(
+        db.select(Bodega.nombre).where(Bodega.empresa_id == empresa.id)
+    ))
+    huertos = dict(db.session.execute(
+        db.select(Huerto.nombre, Huerto.id).where(Huerto.empresa_id == empresa.id)
+    ).all())
+    responsables = dict(db.session.execute(
+        db.select(User.email, User.id).where(User.empresa_id == empresa.id)
+    ).all())
+    nuevas = []
+    for linea, f in _lineas(filas):
+        nombre = f.get("nombre")
+        if not nombre:
+            res.error(linea, "Falta nombre")
+            continue
+        if nombre in existentes:
+            res.omitidos += 1
+            continue
+        huerto_id = huertos.get(f.get("huerto_nombre"))
+        if not huerto_id:
+            res.error(linea, f"Huerto inexistente: {f.get('huerto_nombre')!r}")
+            continue
+        existentes.add(nombre)
+        nuevas.append({
+            "nombre": nombre, "ubicacion": f.get("ubicacion"), "huerto_id": huerto_id,
+            "responsable_id": responsables.get((f.get("responsable_email") or "").lower()),
+            "empresa_id": empresa.id,
+        })
+    insertar_bulk(Bodega, nuevas)
+    res.creados += len(nuevas)
+
+
+# ==============================
+# Pipeline
+# ==============================
+def importar_excel(path: str, empresa_slug: str = EMPRESA_POR_DEFECTO,
+                   dry_run: bool = False) -> list[ResultadoImport]:
+    """
+    Importa el Excel completo y devuelve un ``ResultadoImport`` por hoja.
+    Las filas con error se informan y se saltan; el resto se confirma en un
+    único commit (o se deshace con ``dry_run``).
+    """
+    hojas = leer_hojas(path)
+    resultados = []
+
+    def etapa(hoja):
+        filas = hojas.get(hoja)
+        if filas is None:
+            return None, None
+        res = ResultadoImport(hoja)
+        resultados.append(res)
+        return filas, res
+
+    try:
+        filas, res = etapa("Empresas")
+        if filas is not None:
+            _importar_empresas(filas, res)
+
+        empresa = Empresa.query.filter_by(slug=empresa_slug).first()
+        if not empresa:
+            raise ValueError(f"No existe la empresa {empresa_slug!r}")
+
+        with enlazar(empresa):
+            filas, res = etapa("ActivityTypes")
+            if filas is not None:
+                _importar_activity_types(filas, empresa, res)
+
+            filas, res = etapa("Administradores")
+            if filas is not None:
+                _importar_usuarios(filas, empresa, res, "admin")
+
+            creador_id = db.session.scalar(
+                db.select(User.id).filter_by(role="admin", empresa_id=empresa.id).limit(1)
+            )
+            filas, res = etapa("Técnicos")
+            if filas is not None:
+                _importar_usuarios(filas, empresa, res, "tecnico", created_by=creador_id)
+
+            filas, res = etapa("Huertos")
+            if filas is not None:
+                _importar_huertos(filas, empresa, res)
+
+            filas, res = etapa("Bodegas")
+            if filas is not None:
+                _importar_bodegas(filas, empresa, res)
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return resultados
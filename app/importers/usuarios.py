@@ -0,0 +1,81 @@
+# app/importers/usuarios.py
+"""
+Alta masiva de usuarios.
+
+``generate_password_hash`` (scrypt) es deliberadamente caro y usa un solo
+núcleo: con miles de productores se hashea en un pool de procesos, por
+lotes, y luego se inserta todo en bloque. Es idempotente: los emails que ya
+existen en la empresa (o que se repiten en la entrada) se omiten.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.importers import ResultadoImport, texto, insertar_bulk
+from app.models import User
+
+TAM_LOTE_HASH = 50
+# Con pocas claves levantar procesos cuesta más que hashear en serie
+MIN_CLAVES_POOL = 2 * TAM_LOTE_HASH
+
+
+def _hashear_lote(claves: list[str]) -> list[str]:
+    return [generate_password_hash(c) for c in claves]
+
+
+def hashear_claves(claves: list[str], procesos: int | None = None,
+                   tam_lote: int = TAM_LOTE_HASH) -> list[str]:
+    """Hashes en el mismo orden que ``claves``; usa varios procesos si vale la pena."""
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(claves) < MIN_CLAVES_POOL:
+        return _hashear_lote(claves)
+
+    lotes = [claves[i:i + tam_lote] for i in range(0, len(claves), tam_lote)]
+    with ProcessPoolExecutor(max_workers=min(procesos, len(lotes))) as pool:
+        # map conserva el orden de los lotes
+        return [h for lote in pool.map(_hashear_lote, lotes) for h in lote]
+
+
+def provisionar_usuarios(usuarios: list[dict], empresa_id: int, *, created_by: int | None = None,
+                         rol_por_defecto: str = "tecnico", procesos: int | None = None,
+                         res: ResultadoImport | None = None) -> ResultadoImport:
+    """
+    Crea los usuarios que falten. Cada dict lleva ``name``, ``email``,
+    ``password`` (o ``password_hash`` ya calculado) y opcionalmente ``role``,
+    ``telefono`` y ``linea`` (para informar errores). No hace commit: lo
+    decide quien llama.
+    """
+    res = res or ResultadoImport("Usuarios")
+    existentes = set(db.session.scalars(
+        db.select(User.email).where(User.empresa_id == empresa_id)
+    ))
+
+    nuevos, pendientes, claves = [], [], []
+    for i, u in enumerate(usuarios, start=1):
+        linea = u.get("linea", i)
+        email = (texto(u.get("email")) or "").lower()
+        nombre, clave = texto(u.get("name")), texto(u.get("password"))
+        if not email or not nombre or not (clave or u.get("password_hash")):
+            res.error(linea, "Faltan nombre, email o contraseña")
+            continue
+        if email in existentes:
+            res.omitidos += 1
+            continue
+        existentes.add(email)
+        nuevo = {
+            "name": nombre, "email": email, "role": texto(u.get("role")) or rol_por_defecto,
+            "telefono": texto(u.get("telefono")), "empresa_id": empresa_id,
+            "created_by": u.get("created_by", created_by), "password": u.get("password_hash"),
+        }
+        if not nuevo["password"]:
+            pendientes.append(nuevo)
+            claves.append(clave)
+        nuevos.append(nuevo)
+
+    for u, h in zip(pendientes, hashear_claves(claves, procesos)):
+        u["password"] = h
+    insertar_bulk(User, nuevos)
+    res.creados += len(nuevos)
+    return res
@@ -0,0 +1,416 @@
+# app/metricas.py
+"""
+Métricas en formato de texto de Prometheus (``GET /metrics``).
+
+Se activa con ``METRICS_TOKEN``: el endpoint exige ``Authorization: Bearer
+<token>`` (o ``?token=``) y sin token configurado no se registra ningún hook.
+
+Qué se mide:
+
+* requests por endpoint, blueprint, método y estado (contador e histograma
+  de latencia),
+* tiempo de cada sentencia SQL por operación (histograma),
+* uso del pool de conexiones de cada motor,
+* aciertos y fallos de caché (``registrar_cache``; el caché de SQL
+  compilado de SQLAlchemy se mide solo),
+* bytes subidos (requests multipart) y conexiones SSE abiertas,
+* negocio: actividades registradas y egresos de stock (con litros),
+* arranque de cada proceso (``app/arranque.py``).
+
+Varios workers de gunicorn: cada proceso acumula en memoria y vuelca su
+estado a ``METRICS_DIR/<pid>.json`` cada ``METRICS_FLUSH_SEGUNDOS``. El
+worker que atiende ``/metrics`` suma los archivos de todos: contadores e
+histogramas de todos los procesos (los de workers muertos se consolidan en
+``_muertos.json`` para que no retrocedan), gauges solo de procesos vivos.
+"""
+import atexit
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, default as _default
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin consolidación de workers muertos
+    fcntl = None
+
+PREFIJO = "agrodesk_"
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SQL = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BUCKETS_ARRANQUE = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ARCHIVO_MUERTOS = "_muertos.json"
+
+log = logging.getLogger(__name__)
+
+# nombre -> (tipo, ayuda, buckets)
+DEFINICIONES = {
+    "http_requests_total": ("counter", "Requests atendidos", None),
+    "http_duracion_segundos": ("histogram", "Latencia de requests", BUCKETS_HTTP),
+    "sql_duracion_segundos": ("histogram", "Duración de sentencias SQL (cursor.execute)", BUCKETS_SQL),
+    "db_pool_conexiones": ("gauge", "Conexiones del pool por estado", None),
+    "cache_operaciones_total": ("counter", "Lecturas de caché por resultado (acierto/fallo)", None),
+    "subidas_bytes_total": ("counter", "Bytes recibidos en requests multipart", None),
+    "subidas_total": ("counter", "Requests multipart (subidas de archivos)", None),
+    "sse_conexiones_activas": ("gauge", "Conexiones SSE abiertas", None),
+    "actividades_registradas_total": ("counter", "Actividades registradas", None),
+    "egresos_stock_total": ("counter", "Movimientos de egreso de stock", None),
+    "egresos_stock_litros_total": ("counter", "Litros descontados por egresos de stock", None),
+    "arranque_segundos": ("histogram", "Arranque de cada proceso por fase (ver app/arranque.py)", BUCKETS_ARRANQUE),
+}
+
+
+# ==============================
+# Registro en memoria (por proceso)
+# ==============================
+class Registro:
+    """Valores por (métrica, etiquetas). Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores: dict[tuple, float] = {}
+        self.gauges: dict[tuple, float] = {}
+        self.histogramas: dict[tuple, list] = {}   # [cuenta por bucket..., suma, cuenta]
+
+    @staticmethod
+    def _clave(nombre, etiquetas):
+        return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+    def inc(self, nombre: str, valor: float = 1, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def fijar(self, nombre: str, valor: float, **etiquetas):
+        with self._lock:
+            self.gauges[self._clave(nombre, etiquetas)] = valor
+
+    def sumar(self, nombre: str, delta: float, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            self.gauges[clave] = self.gauges.get(clave, 0) + delta
+
+    def observar(self, nombre: str, valor: float, **etiquetas):
+        buckets = DEFINICIONES[nombre][2]
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            h = self.histogramas.get(clave)
+            if h is None:
+                h = self.histogramas[clave] = [0] * len(buckets) + [0.0, 0]
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    h[i] += 1
+                    break
+            h[-2] += valor
+            h[-1] += 1
+
+    def exportar(self) -> dict:
+        with self._lock:
+            return {
+                "contadores": [[n, list(e), v] for (n, e), v in self.contadores.items()],
+                "gauges": [[n, list(e), v] for (n, e), v in self.gauges.items()],
+                "histogramas": [[n, list(e), list(h)] for (n, e), h in self.histogramas.items()],
+            }
+
+
+registro = Registro()
+
+
+def _sumar_en(destino: dict, datos: dict, con_gauges: bool):
+    for n, e, v in datos.get("contadores", []):
+        clave = ("c", n, tuple(map(tuple, e)))
+        destino[clave] = destino.get(clave, 0) + v
+    for n, e, h in datos.get("histogramas", []):
+        clave = ("h", n, tuple(map(tuple, e)))
+        actual = destino.get(clave)
+        destino[clave] = list(h) if actual is None else [a + b for a, b in zip(actual, h)]
+    if con_gauges:
+        for n, e, v in datos.get("gauges", []):
+            clave = ("g", n, tuple(map(tuple, e)))
+            destino[clave] = destino.get(clave, 0) + v
+
+
+def _a_datos(sumados: dict) -> dict:
+    datos = {"contadores": [], "gauges": [], "histogramas": []}
+    nombres = {"c": "contadores", "g": "gauges", "h": "histogramas"}
+    for (tipo, n, e), v in sumados.items():
+        datos[nombres[tipo]].append([n, [list(par) for par in e], v])
+    return datos
+
+
+# ==============================
+# Multiproceso (archivos por pid)
+# ==============================
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escribir_json(ruta: str, datos: dict):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    os.replace(temporal, ruta)
+
+
+def _leer_json(ruta: str) -> dict:
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Volcado:
+    def __init__(self, directorio: str | None, intervalo: float):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self._ultimo = 0.0
+
+    def volcar(self, forzar: bool = False):
+        if not self.directorio:
+            return
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo < self.intervalo:
+            return
+        self._ultimo = ahora
+        _recolectar_pools()
+        try:
+            _escribir_json(os.path.join(self.directorio, f"{os.getpid()}.json"), registro.exportar())
+        except OSError:
+            log.warning("No se pudieron volcar las métricas", exc_info=True)
+
+    def _consolidar_muertos(self, muertos: list[str]):
+        """Suma los archivos de workers terminados a ``_muertos.json`` (solo contadores e histogramas)."""
+        if not muertos or fcntl is None:
+            return
+        with open(os.path.join(self.directorio, ".lock"), "w") as candado:
+            fcntl.flock(candado, fcntl.LOCK_EX)
+            ruta = os.path.join(self.directorio, ARCHIVO_MUERTOS)
+            sumados = {}
+            _sumar_en(sumados, _leer_json(ruta), con_gauges=False)
+            for archivo in muertos:
+                if os.path.exists(archivo):   # otro worker pudo consolidarlo primero
+                    _sumar_en(sumados, _leer_json(archivo), con_gauges=False)
+                    os.remove(archivo)
+            _escribir_json(ruta, _a_datos(sumados))
+
+    def agregado(self) -> dict:
+        """Suma de todos los procesos (o solo este, sin ``METRICS_DIR``)."""
+        _recolectar_pools()
+        sumados = {}
+        if not self.directorio:
+            _sumar_en(sumados, registro.exportar(), con_gauges=True)
+            return sumados
+        self.volcar(forzar=True)
+        muertos = []
+        for archivo in os.listdir(self.directorio):
+            nombre, _, ext = archivo.partition(".")
+            if ext == "json" and nombre.isdigit() and not _proceso_vivo(int(nombre)):
+                muertos.append(os.path.join(self.directorio, archivo))
+        self._consolidar_muertos(muertos)
+        for archivo in os.listdir(self.directorio):
+            nombre, _, ext = archivo.partition(".")
+            if ext != "json":
+                continue
+            datos = _leer_json(os.path.join(self.directorio, archivo))
+            _sumar_en(sumados, datos, con_gauges=nombre.isdigit())
+        return sumados
+
+
+# ==============================
+# Exposición en formato texto
+# ==============================
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(pares, extra: tuple = ()) -> str:
+    todas = list(pares) + list(extra)
+    if not todas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(str(v))}"' for k, v in todas) + "}"
+
+
+def _numero(v) -> str:
+    return repr(float(v)) if isinstance(v, float) and not float(v).is_integer() else str(int(v))
+
+
+def exposicion(sumados: dict) -> str:
+    por_nombre = {}
+    for (tipo, n, e), v in sumados.items():
+        por_nombre.setdefault(n, []).append((e, v))
+
+    lineas = []
+    for nombre, (tipo, ayuda, buckets) in DEFINICIONES.items():
+        series = sorted(por_nombre.get(nombre, []))
+        if not series:
+            continue
+        completo = PREFIJO + nombre
+        lineas.append(f"# HELP {completo} {ayuda}")
+        lineas.append(f"# TYPE {completo} {tipo}")
+        for e, v in series:
+            if tipo != "histogram":
+                lineas.append(f"{completo}{_etiquetas(e)} {_numero(v)}")
+                continue
+            acumulado = 0
+            for limite, cuenta in zip(buckets, v):
+                acumulado += cuenta
+                lineas.append(f"{completo}_bucket{_etiquetas(e, (('le', repr(limite)),))} {acumulado}")
+            lineas.append(f"{completo}_bucket{_etiquetas(e, (('le', '+Inf'),))} {int(v[-1])}")
+            lineas.append(f"{completo}_sum{_etiquetas(e)} {repr(float(v[-2]))}")
+            lineas.append(f"{completo}_count{_etiquetas(e)} {int(v[-1])}")
+    return "\n".join(lineas) + "\n"
+
+
+def token_valido(token_configurado: str) -> bool:
+    encabezado = request.headers.get("Authorization", "")
+    recibido = encabezado[7:] if encabezado.startswith("Bearer ") else request.args.get("token", "")
+    return bool(recibido) and hmac.compare_digest(recibido.encode(), token_configurado.encode())
+
+
+# ==============================
+# API para el resto de la app
+# ==============================
+def registrar_cache(cache: str, acierto: bool):
+    registro.inc("cache_operaciones_total", cache=cache, resultado="acierto" if acierto else "fallo")
+
+
+@contextmanager
+def conexion_sse(canal: str):
+    """Cuenta la conexión SSE mientras el generador está vivo (sale al desconectarse el cliente)."""
+    # El stream corre después de after_request: se vuelca aquí o el worker (ocupado con el SSE) no lo haría
+    registro.sumar("sse_conexiones_activas", 1, canal=canal)
+    if _volcado is not None:
+        _volcado.volcar(forzar=True)
+    try:
+        yield
+    finally:
+        registro.sumar("sse_conexiones_activas", -1, canal=canal)
+        if _volcado is not None:
+            _volcado.volcar(forzar=True)
+
+
+# ==============================
+# Hooks
+# ==============================
+_motores: dict[str, object] = {}
+_volcado: Volcado | None = None
+
+
+def _recolectar_pools():
+    for nombre, motor in list(_motores.items()):
+        pool = motor.pool
+        for estado, metodo in (("en_uso", "checkedout"), ("disponibles", "checkedin"), ("overflow", "overflow")):
+            if hasattr(pool, metodo):
+                registro.fijar("db_pool_conexiones", max(getattr(pool, metodo)(), 0), motor=nombre, estado=estado)
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metricas_t0 = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_metricas_t0", None)
+    if inicio is None:
+        return
+    operacion = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTRO"
+    if operacion not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        operacion = "OTRO"
+    registro.observar("sql_duracion_segundos", time.perf_counter() - inicio, operacion=operacion)
+    acierto = getattr(context, "cache_hit", None)
+    if acierto is _default.CACHE_HIT or acierto is _default.CACHE_MISS:
+        registrar_cache("sql_compilado", acierto is _default.CACHE_HIT)
+
+
+def _actividad_insertada(origen):
+    def _hook(mapper, connection, target):
+        registro.inc("actividades_registradas_total", origen=origen, tipo=getattr(target, "tipo", None) or "sin_tipo")
+    return _hook
+
+
+def _movimiento_insertado(mapper, connection, target):
+    if target.tipo == "egreso":
+        registro.inc("egresos_stock_total")
+        registro.inc("egresos_stock_litros_total", target.cantidad or 0)
+
+
+_hooks_registrados = False
+
+
+def _registrar_hooks():
+    global _hooks_registrados
+    if _hooks_registrados:
+        return
+    from app.models import ActividadCampo, ActividadHuerto, MovimientoInventario
+
+    event.listen(Engine, "before_cursor_execute", _antes_de_consulta)
+    event.listen(Engine, "after_cursor_execute", _despues_de_consulta)
+    event.listen(ActividadHuerto, "after_insert", _actividad_insertada("bitacora"))
+    event.listen(ActividadCampo, "after_insert", _actividad_insertada("geo"))
+    event.listen(MovimientoInventario, "after_insert", _movimiento_insertado)
+    _hooks_registrados = True
+
+
+def init_metricas(app, db):
+    """Activa las métricas si hay ``METRICS_TOKEN``; sin token no se registra ningún hook."""
+    if not app.config.get("METRICS_TOKEN"):
+        return False
+    _registrar_hooks()
+
+    with app.app_context():
+        _motores["principal"] = db.engine
+    if "db_lectura" in app.extensions:
+        _motores["lectura"] = app.extensions["db_lectura"]
+    for nombre, motor in app.extensions.get("shards", {}).items():
+        if hasattr(motor, "pool") and motor.pool is not _motores["principal"].pool:
+            _motores[f"shard:{nombre}"] = motor
+
+    directorio = app.config.get("METRICS_DIR")
+    if directorio is None:
+        directorio = os.path.join(app.instance_path, "metrics")
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    global _volcado
+    volcado = _volcado = Volcado(directorio or None, app.config.get("METRICS_FLUSH_SEGUNDOS", 5))
+    app.extensions["metricas"] = volcado
+    if directorio:
+        atexit.register(volcado.volcar, True)
+
+    @app.before_request
+    def _metricas_inicio():
+        g._metricas_t0 = time.perf_counter()
+
+    @app.after_request
+    def _metricas_fin(response):
+        inicio = g.pop("_metricas_t0", None)
+        if inicio is None:
+            return response
+        endpoint = request.url_rule.endpoint if request.url_rule else "<sin ruta>"
+        if endpoint == "static":
+            return response
+        etiquetas = {
+            "endpoint": endpoint, "blueprint": request.blueprint or "",
+            "metodo": request.method, "estado": response.status_code,
+        }
+        registro.inc("http_requests_total", **etiquetas)
+        registro.observar("http_duracion_segundos", time.perf_counter() - inicio, **etiquetas)
+        if request.mimetype == "multipart/form-data" and request.content_length:
+            registro.inc("subidas_total", endpoint=endpoint)
+            registro.inc("subidas_bytes_total", request.content_length, endpoint=endpoint)
+        volcado.volcar()
+        return response
+
+    return True
@@ -2,7 +2,7 @@
 from datetime import datetime, date
 from flask_login import UserMixin
 from app.extensions import db
-from sqlalchemy import Float, Text, Boolean, UniqueConstraint, select, event
+from sqlalchemy import Float, Text, Boolean, UniqueConstraint, select, event, inspect, literal
 from sqlalchemy.orm import relationship, declarative_mixin, declared_attr
 
 # ==============================
@@ -14,6 +14,9 @@ class Empresa(db.Model):
     nombre = db.Column(db.String(120), nullable=False)
     slug = db.Column(db.String(80), nullable=False, unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Shard donde viven sus datos (None = BD principal) y bloqueo de escrituras durante un traslado
+    shard = db.Column(db.String(50))
+    shard_bloqueado = db.Column(Boolean, nullable=False, default=False, server_default=db.false())
 
     def __repr__(self):
         return f"<Empresa {self.id} {self.nombre!r}>"
@@ -56,6 +59,8 @@ class User(db.Model, UserMixin, TenantMixin):
 
     __table_args__ = (
         UniqueConstraint("empresa_id", "email", name="uq_user_email_empresa"),
+        # técnicos de un admin ordenados por nombre (dashboard)
+        db.Index("ix_users_empresa_id_role_created_by_name", "empresa_id", "role", "created_by", "name"),
     )
 
     creador = db.relationship("User", remote_side=[id], backref="tecnicos_creados")
@@ -113,6 +118,12 @@ class Huerto(db.Model, TenantMixin):
     parcelas = db.relationship("Parcela", back_populates="huerto", cascade="all, delete-orphan", lazy=True)
     actividades_geo = db.relationship("ActividadCampo", back_populates="huerto", cascade="all, delete-orphan", lazy=True)
 
+    __table_args__ = (
+        db.Index("ix_huertos_empresa_id_nombre", "empresa_id", "nombre"),
+        db.Index("ix_huertos_empresa_id_responsable_id_nombre", "empresa_id", "responsable_id", "nombre"),
+        db.Index("ix_huertos_responsable_id", "responsable_id"),
+    )
+
     def __repr__(self):
         return f"<Huerto {self.id} {self.nombre!r}>"
 
@@ -141,6 +152,12 @@ class Bodega(db.Model, TenantMixin):
         lazy="dynamic",
     )
 
+    __table_args__ = (
+        db.Index("ix_bodegas_empresa_id_nombre", "empresa_id", "nombre"),
+        db.Index("ix_bodegas_empresa_id_responsable_id_nombre", "empresa_id", "responsable_id", "nombre"),
+        db.Index("ix_bodegas_huerto_id", "huerto_id"),
+    )
+
     def __repr__(self):
         return f"<Bodega {self.id} {self.nombre!r}>"
 
@@ -157,7 +174,7 @@ class Quimico(db.Model, TenantMixin):
     cantidad_litros = db.Column(db.Float)
     fecha_ingreso = db.Column(db.Date)
 
-    bodega_id = db.Column(db.Integer, db.ForeignKey("bodegas.id"), nullable=False)
+    bodega_id = db.Column(db.Integer, db.ForeignKey("bodegas.id"), nullable=False, index=True)
 
     def __repr__(self):
         return f"<Quimico {self.id} {self.nombre!r}>"
@@ -169,7 +186,7 @@ class ActividadHuerto(db.Model, TenantMixin):
     __tablename__ = "actividad_huerto"
 
     id = db.Column(db.Integer, primary_key=True)
-    huerto_id = db.Column(db.Integer, db.ForeignKey("huertos.id"), nullable=False, index=True)
+    huerto_id = db.Column(db.Integer, db.ForeignKey("huertos.id"), nullable=False)
 
     fecha = db.Column(db.Date, nullable=False, default=date.today)
     tipo = db.Column(db.String(50))
@@ -191,6 +208,10 @@ class ActividadHuerto(db.Model, TenantMixin):
 
     huerto = db.relationship("Huerto", back_populates="actividades_huerto")
 
+    __table_args__ = (
+        db.Index("ix_actividad_huerto_huerto_id_fecha", "huerto_id", "fecha"),
+    )
+
     @property
     def anio(self):
         return self.fecha.year if self.fecha else None
@@ -216,6 +237,10 @@ class MovimientoInventario(db.Model, TenantMixin):
     usuario = db.relationship("User")
     actividad_referencia = db.relationship("ActividadHuerto")
 
+    __table_args__ = (
+        db.Index("ix_movimientos_inventario_quimico_id_fecha", "quimico_id", "fecha"),
+    )
+
     def __repr__(self):
         return f"<MovimientoInventario {self.tipo} {self.cantidad} del químico {self.quimico_id}>"
 
@@ -232,14 +257,19 @@ class Recomendacion(db.Model, TenantMixin):
     estado = db.Column(db.String(20), default="pendiente")
     adjunto = db.Column(db.String(200))
 
-    tecnico_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    tecnico_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     autor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
-    huerto_id = db.Column(db.Integer, db.ForeignKey("huertos.id"), index=True)
+    huerto_id = db.Column(db.Integer, db.ForeignKey("huertos.id"))
 
     tecnico = db.relationship("User", foreign_keys=[tecnico_id], backref="recomendaciones_asignadas")
     autor = db.relationship("User", foreign_keys=[autor_id], backref="recomendaciones_creadas")
     huerto = db.relationship("Huerto", backref="recomendaciones")
 
+    __table_args__ = (
+        db.Index("ix_recomendacion_huerto_id_fecha", "huerto_id", "fecha"),
+        db.Index("ix_recomendacion_tecnico_id_fecha", "tecnico_id", "fecha"),
+    )
+
     def __repr__(self):
         return f"<Recomendacion {self.id}>"
 
@@ -310,6 +340,12 @@ class Parcela(db.Model, TenantMixin):
     geom_geojson = db.Column(Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_parcelas_empresa_id_huerto_id_nombre", "empresa_id", "huerto_id", "nombre"),
+        db.Index("ix_parcelas_empresa_id_nombre", "empresa_id", "nombre"),
+        db.Index("ix_parcelas_huerto_id", "huerto_id"),
+    )
+
     def __repr__(self):
         return f"<Parcela {self.id} {self.nombre!r}>"
 
@@ -331,6 +367,11 @@ class ActividadCampo(db.Model, TenantMixin):
     fecha = db.Column(db.DateTime, default=datetime.utcnow)
     duracion_min = db.Column(db.Integer, default=0)
 
+    __table_args__ = (
+        db.Index("ix_actividades_campo_huerto_id_fecha", "huerto_id", "fecha"),
+        db.Index("ix_actividades_campo_empresa_id_fecha", "empresa_id", "fecha"),
+    )
+
     def __repr__(self):
         return f"<ActividadCampo {self.id} {self.tipo!r}>"
 
@@ -353,6 +394,11 @@ class Documento(db.Model, TenantMixin):
     subido_por_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     subido_por = db.relationship("User")
 
+    __table_args__ = (
+        db.Index("ix_documentos_empresa_id_huerto_id_created_at", "empresa_id", "huerto_id", "created_at"),
+        db.Index("ix_documentos_empresa_id_created_at", "empresa_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Documento {self.id} {self.titulo!r}>"
 
@@ -377,6 +423,55 @@ class ActivityType(db.Model, TenantMixin):
     def __repr__(self):
         return f"<ActivityType {self.id} {self.key!r}>"
 
+# ==============================
+# SINCRONIZACIÓN OFFLINE (idempotencia)
+# ==============================
+class SyncMutacion(db.Model, TenantMixin):
+    """Registro de cada mutación offline ya aplicada, por client_id."""
+    __tablename__ = "sync_mutaciones"
+
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.String(64), nullable=False)
+    entidad = db.Column(db.String(40), nullable=False)
+    server_id = db.Column(db.Integer)
+    usuario_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("empresa_id", "client_id", name="uq_sync_mutacion_empresa_client"),
+    )
+
+    def __repr__(self):
+        return f"<SyncMutacion {self.client_id!r} {self.entidad} -> {self.server_id}>"
+
+# ==============================
+# REGISTRO DE CAMBIOS (sincronización delta)
+# ==============================
+class Cambio(db.Model):
+    """
+    Una fila por alta/modificación/baja en las tablas sincronizables.
+    ``id`` es la secuencia de cambios: AUTOINCREMENT garantiza que nunca se
+    reutiliza, así que filtrada por empresa es monótona por tenant. Sirve de
+    cursor solo en SQLite (un escritor: orden de id = orden de commit); ver
+    ``sync.cambios_desde``.
+    """
+    __tablename__ = "cambios"
+
+    id = db.Column(db.Integer, primary_key=True)
+    empresa_id = db.Column(db.Integer, db.ForeignKey("empresas.id"), nullable=False)
+    entidad = db.Column(db.String(40), nullable=False)
+    entidad_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # "upsert" | "delete"
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_cambios_empresa_id_id", "empresa_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<Cambio {self.id} {self.op} {self.entidad}:{self.entidad_id}>"
+
 # ==============================
 # Hook: completar empresa_id en ActividadHuerto
 # ==============================
@@ -394,3 +489,82 @@ def completar_empresa_id_actividad(mapper, connection, target):
         ).scalar_one_or_none()
         if empresa_id:
             target.empresa_id = empresa_id
+
+
+# ==============================
+# Hook: registrar cambios para sincronización delta
+# ==============================
+MODELOS_SINCRONIZADOS = (Huerto, Bodega, Quimico, ActividadHuerto, Recomendacion)
+
+
+def _registrar_cambio(op):
+    def _hook(mapper, connection, target):
+        empresa_id = getattr(target, "empresa_id", None)
+        if not empresa_id:
+            return
+        connection.execute(
+            Cambio.__table__.insert().values(
+                empresa_id=empresa_id,
+                entidad=mapper.local_table.name,
+                entidad_id=target.id,
+                op=op,
+                fecha=datetime.utcnow(),
+            )
+        )
+    return _hook
+
+
+for _modelo in MODELOS_SINCRONIZADOS:
+    event.listen(_modelo, "after_insert", _registrar_cambio("upsert"))
+    event.listen(_modelo, "after_update", _registrar_cambio("upsert"))
+    event.listen(_modelo, "after_delete", _registrar_cambio("delete"))
+
+
+# ==============================
+# Hook: cambios de visibilidad para técnicos (sincronización delta)
+# ==============================
+# Un técnico ve las actividades de los huertos que tiene a cargo y los químicos
+# de sus bodegas (responsable o asignado). Si cambia el padre, también cambia
+# qué hijos ve: se registra un "upsert" por cada hijo y cambios_desde decide,
+# técnico por técnico, si le llega como alta (nuevo responsable) o como baja
+# (el anterior).
+def _registrar_hijos(connection, hijo, fk: str, padre_ids):
+    if not padre_ids:
+        return
+    t = hijo.__table__
+    connection.execute(
+        Cambio.__table__.insert().from_select(
+            ["empresa_id", "entidad", "entidad_id", "op", "fecha"],
+            select(t.c.empresa_id, literal(t.name), t.c.id, literal("upsert"),
+                   literal(datetime.utcnow(), db.DateTime))
+            .where(t.c[fk].in_(list(padre_ids)), t.c.empresa_id.isnot(None)),
+        )
+    )
+
+
+def _cambio(target, *atributos) -> bool:
+    estado = inspect(target)
+    return any(estado.attrs[a].history.has_changes() for a in atributos)
+
+
+@event.listens_for(Huerto, "after_update")
+def _huerto_reasignado(mapper, connection, target):
+    if _cambio(target, "responsable_id"):
+        _registrar_hijos(connection, ActividadHuerto, "huerto_id", [target.id])
+
+
+@event.listens_for(Bodega, "after_update")
+def _bodega_reasignada(mapper, connection, target):
+    if _cambio(target, "responsable_id", "tecnicos_asignados"):
+        _registrar_hijos(connection, Quimico, "bodega_id", [target.id])
+
+
+@event.listens_for(User, "after_update")
+def _bodegas_del_tecnico(mapper, connection, target):
+    """Asignación hecha del lado del técnico (``user.bodegas_asignadas.append(b)``)."""
+    historia = inspect(target).attrs.bodegas_asignadas.history
+    ids = {b.id for b in (*historia.added, *historia.deleted) if b.id}
+    if ids:
+        _registrar_hijos(connection, Bodega, "id", ids)
+        _registrar_hijos(connection, Quimico, "bodega_id", ids)
+
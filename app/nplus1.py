@@ -0,0 +1,191 @@
+# app/nplus1.py
+"""
+Detector de consultas N+1 para desarrollo y tests.
+
+Cuenta, dentro de un bloque vigilado (un request o un test):
+
+* las cargas perezosas por relación (``Bodega.quimicos`` cargada una vez por
+  cada bodega de un loop), vía el evento ``do_orm_execute`` de la sesión;
+* las instancias cargadas por modelo (evento ``load``), como contexto;
+* las sentencias repetidas con la misma forma (``fingerprint_sql``).
+
+Si alguna pasa el umbral se emite un ``warning`` o se lanza ``NPlusOneError``.
+
+En la app se activa con ``NPLUS1_DETECT = "warn" | "raise"``. En tests::
+
+    pytest_plugins = ["app.nplus1"]        # en conftest.py
+
+    def test_vista(client, nplus1):        # falla si el request hace N+1
+        client.get("/admin/huerto/1/vista-global")
+"""
+import sys
+import warnings
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.profiling import fingerprint_sql
+
+UMBRAL_POR_DEFECTO = 5
+
+_activo: ContextVar["DetectorNMasUno | None"] = ContextVar("nplus1_detector", default=None)
+
+
+class NPlusOneError(AssertionError):
+    """Se superó el umbral de cargas perezosas o consultas repetidas."""
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class DetectorNMasUno:
+    def __init__(self, umbral: int = UMBRAL_POR_DEFECTO, modo: str = "raise", nombre: str = ""):
+        self.umbral = umbral
+        self.modo = modo
+        self.nombre = nombre
+        self.cargas_perezosas: Counter = Counter()   # "Bodega.quimicos" -> n
+        self.instancias: Counter = Counter()         # "Quimico" -> n
+        self.sentencias: Counter = Counter()         # fingerprint -> n
+
+    # ---------- registro ----------
+    def registrar_carga_perezosa(self, ruta: str):
+        self.cargas_perezosas[ruta] += 1
+
+    def registrar_instancia(self, modelo: str):
+        self.instancias[modelo] += 1
+
+    def registrar_sentencia(self, sql: str):
+        self.sentencias[fingerprint_sql(sql)] += 1
+
+    # ---------- verificación ----------
+    def problemas(self) -> list[str]:
+        salida = [
+            f"carga perezosa {ruta} ×{n}"
+            for ruta, n in self.cargas_perezosas.most_common() if n > self.umbral
+        ]
+        salida += [
+            f"sentencia repetida ×{n}: {sql[:200]}"
+            for sql, n in self.sentencias.most_common() if n > self.umbral
+        ]
+        return salida
+
+    def verificar(self):
+        problemas = self.problemas()
+        if not problemas:
+            return
+        mensaje = f"Posible N+1{' en ' + self.nombre if self.nombre else ''}:\n  " + "\n  ".join(problemas)
+        if self.modo == "raise":
+            raise NPlusOneError(mensaje)
+        warnings.warn(mensaje, NPlusOneWarning, stacklevel=3)
+
+
+# ==============================
+# Hooks (se registran una sola vez; sin detector activo no hacen nada)
+# ==============================
+def _al_ejecutar_orm(orm_execute_state):
+    detector = _activo.get()
+    if detector is None or orm_execute_state.lazy_loaded_from is None:
+        return
+    ruta = orm_execute_state.loader_strategy_path
+    if ruta is not None and len(ruta) >= 2:
+        entidad, relacion = ruta[-2], ruta[-1]
+        clave = f"{getattr(entidad, 'class_', entidad).__name__}.{getattr(relacion, 'key', relacion)}"
+    else:
+        clave = orm_execute_state.lazy_loaded_from.class_.__name__
+    detector.registrar_carga_perezosa(clave)
+
+
+def _al_cargar(target, context):
+    detector = _activo.get()
+    if detector is not None:
+        detector.registrar_instancia(type(target).__name__)
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    detector = _activo.get()
+    if detector is not None and not executemany:
+        detector.registrar_sentencia(statement)
+
+
+_hooks_registrados = False
+
+
+def _registrar_hooks():
+    global _hooks_registrados
+    if _hooks_registrados:
+        return
+    from app.extensions import db
+
+    event.listen(Session, "do_orm_execute", _al_ejecutar_orm)
+    event.listen(db.Model, "load", _al_cargar, propagate=True)
+    event.listen(Engine, "before_cursor_execute", _antes_de_consulta)
+    _hooks_registrados = True
+
+
+@contextmanager
+def vigilar(umbral: int = UMBRAL_POR_DEFECTO, modo: str = "raise", nombre: str = ""):
+    """Vigila el bloque y al salir verifica los umbrales (``modo`` "raise" o "warn")."""
+    _registrar_hooks()
+    detector = DetectorNMasUno(umbral, modo, nombre)
+    token = _activo.set(detector)
+    try:
+        yield detector
+    finally:
+        _activo.reset(token)
+    detector.verificar()
+
+
+# ==============================
+# Integración con Flask
+# ==============================
+def init_nplus1(app):
+    """Vigila cada request si ``NPLUS1_DETECT`` es "warn" o "raise" (pensado para desarrollo)."""
+    modo = app.config.get("NPLUS1_DETECT")
+    if modo not in ("warn", "raise"):
+        return False
+    _registrar_hooks()
+    umbral = app.config.get("NPLUS1_UMBRAL", UMBRAL_POR_DEFECTO)
+
+    @app.before_request
+    def _nplus1_inicio():
+        detector = DetectorNMasUno(umbral, modo, request.endpoint or request.path)
+        g._nplus1 = (detector, _activo.set(detector))
+
+    @app.after_request
+    def _nplus1_fin(response):
+        estado = g.pop("_nplus1", None)
+        if estado is None:
+            return response
+        detector, token = estado
+        _activo.reset(token)
+        detector.verificar()
+        return response
+
+    @app.teardown_request
+    def _nplus1_limpiar(exc):
+        # Si el request falló antes de after_request, no dejar el detector activo en el hilo
+        estado = g.pop("_nplus1", None)
+        if estado is not None:
+            _activo.reset(estado[1])
+
+    return True
+
+
+# ==============================
+# Fixture de pytest
+# ==============================
+# Solo si pytest ya está cargado (pytest_plugins): importarlo en la app cuesta ~50 ms de arranque
+pytest = sys.modules.get("pytest")
+
+if pytest is not None:
+    @pytest.fixture
+    def nplus1():
+        """Falla el test si el código bajo prueba hace N+1 (umbral por defecto)."""
+        with vigilar(modo="raise", nombre="test") as detector:
+            yield detector
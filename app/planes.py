@@ -0,0 +1,338 @@
+# app/planes.py
+"""
+Revisión de planes de consulta (``EXPLAIN QUERY PLAN`` en SQLite,
+``EXPLAIN`` en PostgreSQL).
+
+``CONSULTAS_PRINCIPALES`` reproduce las consultas de las vistas más usadas
+(admin, técnico, geo y documentos) tal como las arman las rutas, con el
+filtro por empresa activo como en un request. ``revisar`` las ejecuta,
+captura el SQL que llega al motor y devuelve el plan de cada sentencia con
+sus hallazgos: recorridos completos de tabla (``SCAN``) y ordenamientos en
+un B-tree temporal (el índice no entrega las filas en el orden pedido, así
+que se leen y ordenan todas las de la empresa).
+
+Lo usa ``verificar_indices.py`` para comprobar que los índices compuestos
+cubren esas consultas.
+
+``revisar_planes.py`` va más allá: registra todas las sentencias distintas
+que emiten los escenarios de ``app.benchmark`` y estas consultas, explica
+cada una y compara los hallazgos contra una línea base versionada; una
+sentencia nueva (o que empeoró) con recorridos u ordenamientos es regresión.
+"""
+import hashlib
+import re
+from datetime import datetime
+
+from flask import g
+from sqlalchemy import event, or_
+from sqlalchemy.orm import selectinload
+
+# "SCAN huertos", "SCAN huertos USING INDEX ..." (recorre toda la tabla o todo el índice)
+_RE_SCAN = re.compile(r"^SCAN (\w+)")
+_RE_TEMP_BTREE = re.compile(r"^USE TEMP B-TREE FOR (.+)")
+# PostgreSQL: "Seq Scan on huertos  (cost=...)", "  ->  Sort  (cost=...)"
+_RE_SEQ_SCAN = re.compile(r"^\s*(?:->\s+)?(?:Parallel )?Seq Scan on (\w+)")
+_RE_SORT = re.compile(r"^\s*(?:->\s+)?(Incremental )?Sort\b")
+# Listas de parámetros de IN (selectinload, expanding) cambian de largo en cada request
+_RE_LISTA_PARAMETROS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)")
+
+
+# ==============================
+# Captura y EXPLAIN
+# ==============================
+class CapturaSQL:
+    """Guarda (sql, parámetros) de cada SELECT ejecutado en los motores dados, sin repetir."""
+
+    def __init__(self, *engines):
+        self.engines = engines
+        self.sentencias = {}
+
+    def _guardar(self, conn, cursor, sql, parametros, contexto, executemany):
+        if not executemany and sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.sentencias.setdefault(sql, parametros)
+
+    def __enter__(self):
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._guardar)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._guardar)
+
+
+def explicar(conn, sql: str, parametros=()) -> list[str]:
+    """Plan de la sentencia: columna ``detail`` en SQLite, líneas de texto en PostgreSQL."""
+    if conn.dialect.name == "sqlite":
+        filas = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+    else:
+        filas = conn.exec_driver_sql(f"EXPLAIN {sql}", parametros).fetchall()
+    return [f[-1] for f in filas]
+
+
+def hallazgos(plan: list[str], tablas) -> list[str]:
+    """
+    ``SCAN <tabla>`` por cada tabla de ``tablas`` recorrida completa (subconsultas
+    y CTE no cuentan) y ``TEMP B-TREE <motivo>`` / ``SORT`` por cada ordenamiento
+    que no sale de un índice.
+    """
+    encontrados = []
+    for linea in plan:
+        if (m := _RE_SCAN.match(linea) or _RE_SEQ_SCAN.match(linea)) and m.group(1) in tablas:
+            encontrados.append(f"SCAN {m.group(1)}")
+        elif m := _RE_TEMP_BTREE.match(linea):
+            encontrados.append(f"TEMP B-TREE {m.group(1)}")
+        elif m := _RE_SORT.match(linea):
+            encontrados.append("INCREMENTAL SORT" if m.group(1) else "SORT")
+    return encontrados
+
+
+# ==============================
+# Consultas de las vistas
+# ==============================
+# Cada función recibe los sujetos de ``benchmark.elegir_sujetos`` y ejecuta lo mismo que la ruta
+def _admin_dashboard(s):
+    from app.models import Bodega, Huerto, User
+
+    admin_id, empresa_id = s["admin"]
+    (Huerto.query.filter_by(empresa_id=empresa_id)
+     .join(User, Huerto.responsable_id == User.id)
+     .filter((Huerto.responsable_id.is_(None)) | (User.created_by == admin_id))
+     .options(selectinload(Huerto.bodegas), selectinload(Huerto.responsable))
+     .order_by(Huerto.nombre.asc()).limit(9).all())
+    (Bodega.query.filter_by(empresa_id=empresa_id)
+     .join(Huerto, Bodega.huerto_id == Huerto.id)
+     .join(User, Huerto.responsable_id == User.id)
+     .filter((Huerto.responsable_id.is_(None)) | (User.created_by == admin_id))
+     .order_by(Bodega.nombre.asc()).all())
+    (User.query.filter_by(role="tecnico", empresa_id=empresa_id, created_by=admin_id)
+     .order_by(User.name.asc()).limit(8).all())
+
+
+def _vista_global_huerto(s):
+    from app.models import ActividadCampo, ActividadHuerto, Bodega, Documento, Parcela, Recomendacion
+
+    huerto_id = s["huerto_id"]
+    ActividadHuerto.query.filter_by(huerto_id=huerto_id).order_by(ActividadHuerto.fecha.desc()).limit(10).all()
+    Recomendacion.query.filter_by(huerto_id=huerto_id).order_by(Recomendacion.fecha.desc()).limit(10).all()
+    Bodega.query.filter_by(huerto_id=huerto_id).options(selectinload(Bodega.quimicos)).all()
+    Parcela.query.filter_by(huerto_id=huerto_id).all()
+    ActividadCampo.query.filter_by(huerto_id=huerto_id).order_by(ActividadCampo.fecha.desc()).limit(5).all()
+    Documento.query.filter_by(huerto_id=huerto_id).order_by(Documento.created_at.desc()).limit(5).all()
+
+
+def _bitacora_huerto(s):
+    from app.models import ActividadHuerto
+
+    ActividadHuerto.query.filter_by(huerto_id=s["huerto_id"]).order_by(ActividadHuerto.fecha.desc()).all()
+
+
+def _registrar_actividad(s):
+    from app.models import Bodega, Quimico
+
+    Quimico.query.join(Bodega).filter(Bodega.empresa_id == s["admin"][1]).all()
+
+
+def _geo(s):
+    from app.models import ActividadCampo, Huerto, Parcela
+
+    Huerto.query.order_by(Huerto.nombre).all()
+    Parcela.query.order_by(Parcela.nombre).all()
+    ActividadCampo.query.order_by(ActividadCampo.fecha.desc()).limit(500).all()
+    Parcela.query.filter_by(huerto_id=s["huerto_id"]).order_by(Parcela.huerto_id.asc(), Parcela.nombre.asc()).all()
+    Parcela.query.order_by(Parcela.huerto_id.asc(), Parcela.nombre.asc()).all()
+
+
+def _docs_list(s):
+    from app.models import Documento, Huerto
+
+    tecnico_id, empresa_id = s["tecnico"]
+    (Documento.query.filter(Documento.empresa_id == empresa_id)
+     .join(Huerto, Documento.huerto_id == Huerto.id, isouter=True)
+     .filter((Huerto.responsable_id == tecnico_id) | (Documento.huerto_id.is_(None)))
+     .order_by(Documento.created_at.desc()).all())
+    (Documento.query.filter(Documento.empresa_id == empresa_id)
+     .filter(or_(Documento.huerto_id == s["huerto_id"], Documento.huerto_id.is_(None)))
+     .order_by(Documento.created_at.desc()).all())
+
+
+def _tecnico_dashboard(s):
+    from app.models import Bodega, Huerto, Recomendacion
+
+    tecnico_id, empresa_id = s["tecnico"]
+    (Huerto.query.filter_by(responsable_id=tecnico_id, empresa_id=empresa_id)
+     .order_by(Huerto.nombre.asc()).limit(6).all())
+    (Bodega.query.filter_by(responsable_id=tecnico_id, empresa_id=empresa_id)
+     .order_by(Bodega.nombre.asc()).all())
+    (Recomendacion.query.filter_by(tecnico_id=tecnico_id, empresa_id=empresa_id)
+     .order_by(Recomendacion.fecha.desc()).limit(5).all())
+
+
+def _kardex_quimico(s):
+    from app.models import Bodega, MovimientoInventario, Quimico
+
+    quimico = Quimico.query.join(Bodega).filter(Bodega.huerto_id == s["huerto_id"]).first()
+    if quimico is not None:
+        (MovimientoInventario.query.filter_by(quimico_id=quimico.id)
+         .order_by(MovimientoInventario.fecha.desc()).all())
+
+
+# nombre -> (rol cuya empresa queda activa, función)
+CONSULTAS_PRINCIPALES = {
+    "admin_dashboard": ("admin", _admin_dashboard),
+    "vista_global_huerto": ("admin", _vista_global_huerto),
+    "bitacora_huerto": ("admin", _bitacora_huerto),
+    "registrar_actividad": ("admin", _registrar_actividad),
+    "geo": ("admin", _geo),
+    "docs_list": ("tecnico", _docs_list),
+    "tecnico_dashboard": ("tecnico", _tecnico_dashboard),
+    "kardex_quimico": ("admin", _kardex_quimico),
+}
+
+
+def capturar_consultas(app, sujetos: dict, solo: list[str] | None = None) -> dict:
+    """Ejecuta cada grupo de ``CONSULTAS_PRINCIPALES`` con la empresa activa: ``{grupo: {sql: parámetros}}``."""
+    from app import tenancy
+    from app.extensions import db
+    from app.models import Empresa
+
+    capturas = {}
+    with app.app_context():
+        engine = db.engine
+        for nombre, (rol, consultas) in CONSULTAS_PRINCIPALES.items():
+            if solo and nombre not in solo:
+                continue
+            with app.test_request_context():
+                g._shard_motor = None
+                tenancy.activar(db.session.get(Empresa, sujetos[rol][1]))
+                with CapturaSQL(engine) as captura:
+                    consultas(sujetos)
+                db.session.rollback()
+            capturas[nombre] = captura.sentencias
+    return capturas
+
+
+def capturar_escenarios(app, sujetos: dict, solo: list[str] | None = None) -> dict:
+    """Un GET por escenario de ``app.benchmark.ESCENARIOS``: ``{escenario: {sql: parámetros}}``."""
+    from app import benchmark
+    from app.extensions import db
+
+    clientes = {rol: benchmark.cliente_con_sesion(app, *sujetos[rol]) for rol in ("admin", "tecnico")}
+    with app.app_context():
+        engines = [db.engine, *([app.extensions["db_lectura"]] if "db_lectura" in app.extensions else [])]
+
+    capturas = {}
+    for nombre, (rol, plantilla) in benchmark.ESCENARIOS.items():
+        if solo and nombre not in solo:
+            continue
+        with CapturaSQL(*engines) as captura:
+            clientes[rol].get(plantilla.format(huerto=sujetos["huerto_id"])).close()
+        capturas[nombre] = captura.sentencias
+    return capturas
+
+
+def explicar_capturas(app, capturas: dict) -> dict:
+    """``{origen: [{"sql", "plan", "hallazgos"}]}`` explicando cada sentencia en el motor principal."""
+    from app.extensions import db
+
+    resultado = {}
+    with app.app_context():
+        tablas = set(db.metadata.tables)
+        with db.engine.connect() as conn:
+            for origen, sentencias in capturas.items():
+                filas = []
+                for sql, parametros in sentencias.items():
+                    plan = explicar(conn, sql, parametros)
+                    filas.append({"sql": sql, "plan": plan, "hallazgos": hallazgos(plan, tablas)})
+                resultado[origen] = filas
+    return resultado
+
+
+def revisar(app, sujetos: dict, solo: list[str] | None = None) -> dict:
+    """
+    Ejecuta cada grupo de ``CONSULTAS_PRINCIPALES`` con la empresa activa y
+    devuelve ``{grupo: [{"sql", "plan", "hallazgos"}]}``.
+    """
+    return explicar_capturas(app, capturar_consultas(app, sujetos, solo))
+
+
+# ==============================
+# Línea base y comparación
+# ==============================
+def normalizar_sql(sql: str) -> str:
+    """Espacios colapsados y listas de IN de largo variable reducidas a ``(...)``."""
+    return _RE_LISTA_PARAMETROS.sub("(...)", " ".join(sql.split()))
+
+
+def huella(sql: str) -> str:
+    return hashlib.sha1(normalizar_sql(sql).encode()).hexdigest()[:12]
+
+
+def registrar(app, explicados: dict) -> dict:
+    """
+    Línea base a partir de ``explicar_capturas``: solo se guardan las sentencias
+    con hallazgos (indexadas por huella), con los orígenes que las emiten.
+    """
+    from app.benchmark import _commit_actual
+    from app.extensions import db
+
+    sentencias, total = {}, set()
+    for origen, filas in sorted(explicados.items()):
+        for f in filas:
+            clave = huella(f["sql"])
+            total.add(clave)
+            if not f["hallazgos"]:
+                continue
+            entrada = sentencias.setdefault(clave, {
+                "sql": normalizar_sql(f["sql"]), "hallazgos": sorted(f["hallazgos"]),
+                "plan": f["plan"], "origenes": [],
+            })
+            entrada["origenes"].append(origen)
+    with app.app_context():
+        dialecto = db.engine.dialect.name
+    return {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_actual(),
+            "dialecto": dialecto,
+            "sentencias_revisadas": len(total),
+        },
+        "sentencias": dict(sorted(sentencias.items())),
+    }
+
+
+def comparar(actual: dict, base: dict) -> list[dict]:
+    """
+    Una fila por sentencia con hallazgos en ``actual`` o en ``base``. Es regresión
+    si la sentencia no está en la base o tiene hallazgos que la base no tenía;
+    las que desaparecieron o mejoraron quedan como ``resuelta``.
+    """
+    filas = []
+    base_sentencias = base.get("sentencias", {})
+    for clave in sorted(set(actual["sentencias"]) | set(base_sentencias)):
+        a, b = actual["sentencias"].get(clave), base_sentencias.get(clave)
+        hallazgos_a = list(a["hallazgos"]) if a else []
+        hallazgos_b = list(b["hallazgos"]) if b else []
+        nuevos = list(hallazgos_a)
+        for h in hallazgos_b:
+            if h in nuevos:
+                nuevos.remove(h)
+        if b is None:
+            estado = "nueva"
+        elif nuevos:
+            estado = "peor"
+        elif len(hallazgos_a) < len(hallazgos_b):
+            estado = "resuelta"
+        else:
+            estado = "igual"
+        filas.append({
+            "huella": clave,
+            "sql": (a or b)["sql"],
+            "origenes": (a or b)["origenes"],
+            "hallazgos": hallazgos_a,
+            "hallazgos_base": hallazgos_b,
+            "nuevos": nuevos,
+            "estado": estado,
+            "regresion": estado in ("nueva", "peor"),
+        })
+    return filas
@@ -0,0 +1,93 @@
+# app/plantillas.py
+"""
+Caché de bytecode de las plantillas Jinja, compartido entre workers.
+
+Sin caché, cada worker compila cada plantilla (fuente → AST → Python →
+``compile``) la primera vez que la usa; con ~60 plantillas eso es del orden
+de medio segundo por proceso. Con ``TEMPLATE_CACHE_DIR`` Jinja guarda el
+código compilado en archivos (``FileSystemBytecodeCache``) y los demás
+workers, y los reinicios, lo cargan con ``marshal`` en vez de compilar.
+
+* Jinja escribe cada archivo en un temporal y lo renombra, así que varios
+  workers pueden compartir el directorio sin leer archivos a medias.
+* Cada entrada guarda el checksum de la fuente y la versión de Python: una
+  plantilla modificada (o un Python nuevo) se recompila sola.
+
+``precompilar_plantillas.py`` llena el caché en el deploy, antes de reiniciar
+la app; ``--limpiar`` además quita las entradas de plantillas que ya no
+existen.
+"""
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+EXTENSIONES = ("html", "js", "xml", "txt")
+
+
+def directorio_cache(app) -> str | None:
+    directorio = app.config.get("TEMPLATE_CACHE_DIR")
+    if directorio is None:
+        directorio = os.path.join(app.instance_path, "jinja_cache")
+    return directorio or None
+
+
+def init_plantillas(app):
+    """Activa el caché de bytecode si hay directorio (``TEMPLATE_CACHE_DIR = ""`` lo desactiva)."""
+    directorio = directorio_cache(app)
+    if directorio is None:
+        return False
+    os.makedirs(directorio, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio, "agrodesk_%s.cache")
+    return True
+
+
+def nombres(app) -> list[str]:
+    return sorted(app.jinja_env.list_templates(extensions=EXTENSIONES))
+
+
+def _cargar_todas(entorno, lista) -> tuple[float, dict]:
+    entorno.cache.clear()
+    errores = {}
+    inicio = time.perf_counter()
+    for nombre in lista:
+        try:
+            entorno.get_template(nombre)
+        except Exception as e:   # TemplateSyntaxError, filtros inexistentes, etc.
+            errores[nombre] = f"{type(e).__name__}: {e}"
+    return (time.perf_counter() - inicio) * 1000, errores
+
+
+def precompilar(app, limpiar: bool = False) -> dict:
+    """Compila todas las plantillas al caché de bytecode.
+
+    Devuelve lo que cuesta cargarlas compilando desde la fuente y desde el
+    caché, los errores de compilación por plantilla y el tamaño del caché.
+    """
+    entorno = app.jinja_env
+    cache = entorno.bytecode_cache
+    if cache is None:
+        raise RuntimeError("El caché de bytecode está desactivado (TEMPLATE_CACHE_DIR vacío)")
+    if limpiar:
+        cache.clear()
+    lista = nombres(app)
+
+    entorno.bytecode_cache = None
+    try:
+        compilar_ms, errores = _cargar_todas(entorno, lista)
+    finally:
+        entorno.bytecode_cache = cache
+    _cargar_todas(entorno, lista)                 # escribe las entradas nuevas o desactualizadas
+    desde_cache_ms, _ = _cargar_todas(entorno, lista)
+    entorno.cache.clear()
+
+    archivos = [os.path.join(cache.directory, n) for n in os.listdir(cache.directory) if n.endswith(".cache")]
+    return {
+        "directorio": cache.directory,
+        "plantillas": len(lista),
+        "errores": errores,
+        "compilar_ms": round(compilar_ms, 1),
+        "desde_cache_ms": round(desde_cache_ms, 1),
+        "archivos": len(archivos),
+        "bytes": sum(os.path.getsize(a) for a in archivos),
+    }
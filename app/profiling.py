@@ -0,0 +1,242 @@
+# app/profiling.py
+"""
+Perfilado por request: cantidad y tiempo de SQL, tiempo de render y total.
+
+Es opcional (``PROFILING_ENABLED``) y muestreado (``PROFILING_SAMPLE_RATE``):
+los requests no muestreados solo pagan un ``g.get`` por consulta. Los
+muestreados devuelven un header ``Server-Timing`` (visible en las DevTools)
+y alimentan un agregado en memoria por endpoint y por plantilla con ventana
+móvil, que se ve en ``/admin/profiling``. El agregado es por proceso.
+
+El render se informa sin el SQL que se ejecuta durante él (cargas perezosas
+desde la plantilla): ese tiempo va aparte como ``sql_en_render``, para que
+el costo de la plantilla no se confunda con el de la base.
+"""
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request, request_started, request_finished
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+VENTANA_POR_DEFECTO = 200     # muestras por endpoint para promedios y p95
+MAX_FINGERPRINTS = 15          # consultas más repetidas que se guardan por endpoint
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def fingerprint_sql(sql: str) -> str:
+    """Normaliza un SQL a su "forma": literales → ``?``, listas IN colapsadas, espacios simples."""
+    s = _RE_STRING.sub("?", sql)
+    s = _RE_NUMERO.sub("?", s)
+    s = _RE_ESPACIOS.sub(" ", s).strip()
+    return _RE_LISTA_IN.sub("(?…)", s)
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+# ==============================
+# Agregado por endpoint
+# ==============================
+class AgregadoEndpoints:
+    """Ventana móvil de muestras por endpoint (thread-safe)."""
+
+    def __init__(self, ventana: int = VENTANA_POR_DEFECTO):
+        self.ventana = ventana
+        self._lock = threading.Lock()
+        self._muestras: dict[str, deque] = {}
+        self._totales: Counter = Counter()
+        self._sql: dict[str, Counter] = {}
+        self._plantillas: dict[str, deque] = {}
+        self._renders: Counter = Counter()
+
+    def registrar(self, endpoint: str, muestra: dict, fingerprints: Counter | None = None,
+                  plantillas: list | None = None):
+        with self._lock:
+            self._muestras.setdefault(endpoint, deque(maxlen=self.ventana)).append(muestra)
+            self._totales[endpoint] += 1
+            for nombre, render_ms, sql_ms, sql_n in plantillas or ():
+                self._plantillas.setdefault(nombre, deque(maxlen=self.ventana)).append((render_ms, sql_ms, sql_n))
+                self._renders[nombre] += 1
+            if fingerprints:
+                acumulado = self._sql.setdefault(endpoint, Counter())
+                acumulado.update(fingerprints)
+                if len(acumulado) > MAX_FINGERPRINTS * 4:
+                    self._sql[endpoint] = Counter(dict(acumulado.most_common(MAX_FINGERPRINTS)))
+
+    def resumen(self) -> list[dict]:
+        with self._lock:
+            copia = {k: list(v) for k, v in self._muestras.items()}
+            totales = dict(self._totales)
+            sql = {k: v.most_common(5) for k, v in self._sql.items()}
+
+        filas = []
+        for endpoint, muestras in copia.items():
+            n = len(muestras)
+            total = [m["total_ms"] for m in muestras]
+            filas.append({
+                "endpoint": endpoint,
+                "requests": totales[endpoint],
+                "muestras": n,
+                "total_ms_prom": sum(total) / n,
+                "total_ms_p95": _percentil(total, 0.95),
+                "sql_n_prom": sum(m["sql_n"] for m in muestras) / n,
+                "sql_n_max": max(m["sql_n"] for m in muestras),
+                "sql_ms_prom": sum(m["sql_ms"] for m in muestras) / n,
+                "render_ms_prom": sum(m["render_ms"] for m in muestras) / n,
+                "render_sql_ms_prom": sum(m.get("render_sql_ms", 0.0) for m in muestras) / n,
+                "top_sql": sql.get(endpoint, []),
+            })
+        filas.sort(key=lambda f: f["total_ms_prom"] * f["requests"], reverse=True)
+        return filas
+
+    def resumen_plantillas(self) -> list[dict]:
+        """Una fila por plantilla: render sin SQL (prom. y p95) y SQL disparado desde la plantilla."""
+        with self._lock:
+            copia = {k: list(v) for k, v in self._plantillas.items()}
+            renders = dict(self._renders)
+
+        filas = []
+        for nombre, muestras in copia.items():
+            n = len(muestras)
+            render = [m[0] for m in muestras]
+            filas.append({
+                "plantilla": nombre,
+                "renders": renders[nombre],
+                "render_ms_prom": sum(render) / n,
+                "render_ms_p95": _percentil(render, 0.95),
+                "sql_ms_prom": sum(m[1] for m in muestras) / n,
+                "sql_n_prom": sum(m[2] for m in muestras) / n,
+            })
+        filas.sort(key=lambda f: f["render_ms_prom"] * f["renders"], reverse=True)
+        return filas
+
+    def reiniciar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._totales.clear()
+            self._sql.clear()
+            self._plantillas.clear()
+            self._renders.clear()
+
+
+agregado = AgregadoEndpoints()
+
+
+# ==============================
+# Hooks
+# ==============================
+def _perfil_actual():
+    if not has_request_context():
+        return None
+    return g.get("_perfil")
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _perfil_actual() is not None:
+        context._perfil_t0 = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_perfil_t0", None)
+    perfil = _perfil_actual()
+    if inicio is None or perfil is None:
+        return
+    perfil["sql_n"] += 1
+    perfil["sql_s"] += time.perf_counter() - inicio
+    perfil["sql"][fingerprint_sql(statement)] += 1
+
+
+def _inicio_request(app, **extra):
+    tasa = app.config.get("PROFILING_SAMPLE_RATE", 1.0)
+    if tasa >= 1.0 or random.random() < tasa:
+        g._perfil = {
+            "inicio": time.perf_counter(), "sql_n": 0, "sql_s": 0.0,
+            "render_s": 0.0, "render_sql_s": 0.0, "render_pila": [], "plantillas": [], "sql": Counter(),
+        }
+
+
+def _antes_de_render(app, template, context, **extra):
+    perfil = _perfil_actual()
+    if perfil is not None:
+        perfil["render_pila"].append((time.perf_counter(), perfil["sql_s"], perfil["sql_n"]))
+
+
+def _despues_de_render(app, template, context, **extra):
+    perfil = _perfil_actual()
+    if perfil is None or not perfil["render_pila"]:
+        return
+    inicio, sql_s_inicio, sql_n_inicio = perfil["render_pila"].pop()
+    if perfil["render_pila"]:  # solo el render más externo, sin contar dos veces
+        return
+    sql_s = perfil["sql_s"] - sql_s_inicio
+    render_s = time.perf_counter() - inicio - sql_s
+    perfil["render_s"] += render_s
+    perfil["render_sql_s"] += sql_s
+    perfil["plantillas"].append((
+        template.name or "<string>", render_s * 1000, sql_s * 1000, perfil["sql_n"] - sql_n_inicio,
+    ))
+
+
+def _fin_request(app, response, **extra):
+    perfil = _perfil_actual()
+    if perfil is None:
+        return
+    g._perfil = None
+    total_ms = (time.perf_counter() - perfil["inicio"]) * 1000
+    sql_ms = perfil["sql_s"] * 1000
+    render_ms = perfil["render_s"] * 1000
+    render_sql_ms = perfil["render_sql_s"] * 1000
+
+    if app.config.get("PROFILING_SERVER_TIMING", True):
+        nombres = ", ".join(p[0] for p in perfil["plantillas"]).replace('"', "")
+        response.headers.add(
+            "Server-Timing",
+            f'sql;dur={sql_ms:.1f};desc="{perfil["sql_n"]} consultas", '
+            f'render;dur={render_ms:.1f};desc="{nombres or "sin plantilla"}", '
+            f'render-sql;dur={render_sql_ms:.1f};desc="SQL durante el render", total;dur={total_ms:.1f}',
+        )
+
+    endpoint = request.url_rule.endpoint if request.url_rule else "<sin ruta>"
+    if endpoint == "static":
+        return
+    agregado.registrar(endpoint, {
+        "total_ms": total_ms, "sql_ms": sql_ms, "sql_n": perfil["sql_n"],
+        "render_ms": render_ms, "render_sql_ms": render_sql_ms,
+    }, perfil["sql"], perfil["plantillas"])
+
+
+_hooks_sql_registrados = False
+
+
+def init_profiling(app):
+    """Activa el perfilado si ``PROFILING_ENABLED``; sin eso no se registra ningún hook."""
+    app.extensions["profiling"] = agregado
+    if not app.config.get("PROFILING_ENABLED"):
+        return False
+
+    agregado.ventana = app.config.get("PROFILING_VENTANA", VENTANA_POR_DEFECTO)
+
+    global _hooks_sql_registrados
+    if not _hooks_sql_registrados:
+        event.listen(Engine, "before_cursor_execute", _antes_de_consulta)
+        event.listen(Engine, "after_cursor_execute", _despues_de_consulta)
+        _hooks_sql_registrados = True
+
+    request_started.connect(_inicio_request, app)
+    before_render_template.connect(_antes_de_render, app)
+    template_rendered.connect(_despues_de_render, app)
+    request_finished.connect(_fin_request, app)
+    return True
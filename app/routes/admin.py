@@ -2,12 +2,15 @@
 from datetime import datetime
 from functools import wraps
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 from sqlalchemy.orm import selectinload
 from sqlalchemy import extract
 
+from app.cache import memoize
+from app.database import solo_lectura
+from app.fragmentos import perezoso
 from app.extensions import db  # 👈 usar extensions
 from app.models import User, Recomendacion, Huerto, Bodega, Quimico, ActividadHuerto, MovimientoInventario, Parcela, ActividadCampo, Documento
 
@@ -38,6 +41,7 @@ def admin_required(f):
 # ======================
 # Helpers (scoped por empresa)
 # ======================
+@memoize(tags=("users",), por_usuario=True)
 def cargar_tecnicos_choices():
     # Solo técnicos asignados a este administrador
     tecnicos = (
@@ -49,6 +53,7 @@ def cargar_tecnicos_choices():
     # Fallback a email si no hay name
     return [(u.id, (u.name or u.email or f"Técnico {u.id}")) for u in tecnicos]
 
+@memoize(tags=("huertos", "users"), por_usuario=True)
 def cargar_huertos_choices():
     huertos = (
         Huerto.query.filter_by(empresa_id=current_user.empresa_id)
@@ -68,7 +73,61 @@ def cargar_huertos_choices():
 
 # Dashboard
 # ======================
+@memoize(tags=("huertos", "users"), por_usuario=True)
+def _kpis_admin() -> dict:
+    """Totales del panel del administrador actual (huertos, superficie, técnicos con teléfono)."""
+    # Estadísticas de huertos (solo del administrador actual)
+    total_huertos = (
+        Huerto.query.filter_by(empresa_id=current_user.empresa_id)
+        .join(User, Huerto.responsable_id == User.id)
+        .filter((Huerto.responsable_id.is_(None)) | (User.created_by == current_user.id))
+        .count()
+    )
+    huertos_con_responsable = (
+        Huerto.query.filter_by(empresa_id=current_user.empresa_id)
+        .join(User, Huerto.responsable_id == User.id)
+        .filter(User.created_by == current_user.id)
+        .filter(Huerto.responsable_id.isnot(None))
+        .count()
+    )
+    huertos_sin_responsable = total_huertos - huertos_con_responsable
+    
+    # Estadísticas de superficie por cultivo (solo del administrador actual)
+    superficie_por_cultivo = (
+        db.session.query(
+            Huerto.tipo_cultivo,
+            db.func.sum(Huerto.superficie_ha).label('total_superficie'),
+            db.func.count(Huerto.id).label('cantidad')
+        )
+        .join(User, Huerto.responsable_id == User.id)
+        .filter(Huerto.empresa_id == current_user.empresa_id)
+        .filter((Huerto.responsable_id.is_(None)) | (User.created_by == current_user.id))
+        .group_by(Huerto.tipo_cultivo)
+        .all()
+    )
+    
+    # Calcular superficie total
+    total_superficie = sum(s.total_superficie or 0 for s in superficie_por_cultivo)
+    
+    # Estadísticas de técnicos
+    tecnicos_con_telefono = User.query.filter_by(
+        role="tecnico", 
+        empresa_id=current_user.empresa_id, 
+        created_by=current_user.id
+    ).filter(User.telefono.isnot(None)).count()
+
+    return {
+        "total_huertos": total_huertos,
+        "huertos_con_responsable": huertos_con_responsable,
+        "huertos_sin_responsable": huertos_sin_responsable,
+        "superficie_por_cultivo": superficie_por_cultivo,
+        "total_superficie": total_superficie,
+        "tecnicos_con_telefono": tecnicos_con_telefono,
+    }
+
+
 @admin_bp.route("/dashboard")
+@solo_lectura
 @login_required
 @admin_required
 def admin_dashboard():
@@ -90,8 +149,8 @@ def admin_dashboard():
         .paginate(page=page_huertos, per_page=per_page_huertos, error_out=False)
     )
 
-    # Bodegas + relaciones (solo del administrador actual)
-    bodegas = (
+    # Bodegas y KPIs se muestran en fragmentos cacheados ({% cache %}): se consultan solo si hay que renderizarlos
+    bodegas = perezoso(lambda: (
         Bodega.query.filter_by(empresa_id=current_user.empresa_id)
         .join(Huerto, Bodega.huerto_id == Huerto.id)
         .join(User, Huerto.responsable_id == User.id)
@@ -102,7 +161,7 @@ def admin_dashboard():
         )
         .order_by(Bodega.nombre.asc())
         .all()
-    )
+    ))
 
     # Solo técnicos asignados a este administrador (paginados)
     tecnicos_paginados = (
@@ -112,46 +171,8 @@ def admin_dashboard():
         .paginate(page=page_tecnicos, per_page=per_page_tecnicos, error_out=False)
     )
 
-    # Estadísticas de huertos (solo del administrador actual)
-    total_huertos = (
-        Huerto.query.filter_by(empresa_id=current_user.empresa_id)
-        .join(User, Huerto.responsable_id == User.id)
-        .filter((Huerto.responsable_id.is_(None)) | (User.created_by == current_user.id))
-        .count()
-    )
-    huertos_con_responsable = (
-        Huerto.query.filter_by(empresa_id=current_user.empresa_id)
-        .join(User, Huerto.responsable_id == User.id)
-        .filter(User.created_by == current_user.id)
-        .filter(Huerto.responsable_id.isnot(None))
-        .count()
-    )
-    huertos_sin_responsable = total_huertos - huertos_con_responsable
-    
-    # Estadísticas de superficie por cultivo (solo del administrador actual)
-    superficie_por_cultivo = (
-        db.session.query(
-            Huerto.tipo_cultivo,
-            db.func.sum(Huerto.superficie_ha).label('total_superficie'),
-            db.func.count(Huerto.id).label('cantidad')
-        )
-        .join(User, Huerto.responsable_id == User.id)
-        .filter(Huerto.empresa_id == current_user.empresa_id)
-        .filter((Huerto.responsable_id.is_(None)) | (User.created_by == current_user.id))
-        .group_by(Huerto.tipo_cultivo)
-        .all()
-    )
-    
-    # Calcular superficie total
-    total_superficie = sum(s.total_superficie or 0 for s in superficie_por_cultivo)
-    
-    # Estadísticas de técnicos
-    tecnicos_con_telefono = User.query.filter_by(
-        role="tecnico", 
-        empresa_id=current_user.empresa_id, 
-        created_by=current_user.id
-    ).filter(User.telefono.isnot(None)).count()
-    
+    kpis = perezoso(_kpis_admin)
+
     # Actividades recientes (si existe el modelo)
     actividades_recientes = []
     try:
@@ -191,12 +212,7 @@ def admin_dashboard():
         tecnicos_paginados=tecnicos_paginados,
         tecnicos=tecnicos_paginados.items,
         ultimas_recomendaciones=ultimas_recomendaciones,
-        total_superficie=total_superficie,
-        superficie_por_cultivo=superficie_por_cultivo,
-        total_huertos=total_huertos,
-        huertos_con_responsable=huertos_con_responsable,
-        huertos_sin_responsable=huertos_sin_responsable,
-        tecnicos_con_telefono=tecnicos_con_telefono,
+        kpis=kpis,
         actividades_recientes=actividades_recientes,
     )
 
@@ -473,6 +489,7 @@ def editar_huerto(huerto_id):
     return render_template("admin/editar_huerto.html", form=form, huerto=huerto)
 
 @admin_bp.route("/huerto/<int:huerto_id>/vista-global")
+@solo_lectura
 @login_required
 @admin_required
 def vista_global_huerto(huerto_id):
@@ -484,9 +501,13 @@ def vista_global_huerto(huerto_id):
     )
     
     # Obtener toda la información relacionada
-    actividades = ActividadHuerto.query.filter_by(huerto_id=huerto.id).order_by(ActividadHuerto.fecha.desc()).limit(10).all()
+    # la línea de tiempo va en {% cache %}: la consulta corre solo si el fragmento no está guardado
+    actividades = perezoso(
+        lambda: ActividadHuerto.query.filter_by(huerto_id=huerto.id).order_by(ActividadHuerto.fecha.desc()).limit(10).all()
+    )
     recomendaciones = Recomendacion.query.filter_by(huerto_id=huerto.id).order_by(Recomendacion.fecha.desc()).limit(10).all()
-    bodegas = Bodega.query.filter_by(huerto_id=huerto.id).all()
+    # químicos en una sola consulta (la plantilla y el total usan bodega.quimicos)
+    bodegas = Bodega.query.filter_by(huerto_id=huerto.id).options(selectinload(Bodega.quimicos)).all()
     parcelas = Parcela.query.filter_by(huerto_id=huerto.id).all()
     actividades_geo = ActividadCampo.query.filter_by(huerto_id=huerto.id).order_by(ActividadCampo.fecha.desc()).limit(5).all()
     documentos = Documento.query.filter_by(huerto_id=huerto.id).order_by(Documento.created_at.desc()).limit(5).all()
@@ -494,9 +515,7 @@ def vista_global_huerto(huerto_id):
     # Estadísticas
     total_actividades = ActividadHuerto.query.filter_by(huerto_id=huerto.id).count()
     total_recomendaciones = Recomendacion.query.filter_by(huerto_id=huerto.id).count()
-    total_quimicos = 0
-    for bodega in bodegas:
-        total_quimicos += len(bodega.quimicos)
+    total_quimicos = sum(len(bodega.quimicos) for bodega in bodegas)
     
     return render_template("admin/vista_global_huerto.html", 
                          huerto=huerto,
@@ -511,6 +530,7 @@ def vista_global_huerto(huerto_id):
                          total_quimicos=total_quimicos)
 
 @admin_bp.route("/huerto/<int:huerto_id>/bitacora")
+@solo_lectura
 @login_required
 @admin_required
 def bitacora_huerto(huerto_id):
@@ -1002,3 +1022,24 @@ def asignar_responsable_huerto(huerto_id):
         return redirect(url_for("admin.admin_dashboard"))
 
     return render_template("admin/asignar_responsable_huerto.html", form=form, huerto=huerto)
+
+
+# ======================
+# Perfilado por endpoint
+# ======================
+@admin_bp.route("/profiling", methods=["GET", "POST"])
+@login_required
+@admin_required
+def profiling():
+    agregado = current_app.extensions["profiling"]
+    if request.method == "POST":
+        agregado.reiniciar()
+        flash("Métricas reiniciadas", "info")
+        return redirect(url_for("admin.profiling"))
+    return render_template(
+        "admin/profiling.html",
+        filas=agregado.resumen(),
+        plantillas=agregado.resumen_plantillas(),
+        activo=current_app.config.get("PROFILING_ENABLED", False),
+        tasa=current_app.config.get("PROFILING_SAMPLE_RATE", 1.0),
+    )
@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, current_user
 from werkzeug.security import check_password_hash
 from app.forms import LoginForm
 from app.models import User, Empresa
+from app.shards import activar_shard
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -17,6 +18,8 @@ def login():
         if not empresa:
             flash("Empresa no encontrada.", "danger")
             return render_template("login.html", form=form)
+        # Los usuarios viven en el shard de la empresa (el login solo lee: se permite durante un traslado)
+        activar_shard(empresa, bloquear_escrituras=False)
 
         user = User.query.filter_by(
             empresa_id=empresa.id,
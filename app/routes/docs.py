@@ -13,6 +13,8 @@ from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+from app.database import solo_lectura
+from app.metricas import conexion_sse
 from app.extensions import db
 from app.models import Documento, Huerto
 
@@ -234,6 +236,7 @@ def delete(doc_id):
 
 # ----------------- API JSON (para Técnico / UI) -----------------
 @docs_bp.route("/list")
+@solo_lectura
 @login_required
 def list_docs():
     try:
@@ -271,10 +274,11 @@ def list_docs():
 def stream():
     @stream_with_context
     def event_stream():
-        # Ejemplo simple: ping inicial y pings de keep-alive
-        yield f"data: {json.dumps({'type': 'hello', 'ts': time.time()})}\n\n"
-        while True:
-            time.sleep(25)
-            yield f"data: {json.dumps({'type': 'keepalive', 'ts': time.time()})}\n\n"
+        with conexion_sse("docs"):
+            # Ejemplo simple: ping inicial y pings de keep-alive
+            yield f"data: {json.dumps({'type': 'hello', 'ts': time.time()})}\n\n"
+            while True:
+                time.sleep(25)
+                yield f"data: {json.dumps({'type': 'keepalive', 'ts': time.time()})}\n\n"
 
     return Response(event_stream(), mimetype="text/event-stream")
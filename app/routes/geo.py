@@ -2,6 +2,8 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import login_required, current_user
 from functools import wraps
+from app.cache import memoize
+from app.database import solo_lectura
 from app.extensions import db
 from app.models import Huerto, Parcela, ActividadCampo
 from app.forms import ParcelaForm, ActividadForm
@@ -80,10 +82,9 @@ def nueva_actividad():
 
     return render_template("geo/actividades_form.html", form=form)
 
-# --- APIS GEOJSON (colecciones) ---
-@geo_bp.route("/api/huertos", endpoint="api_huertos")
-@login_required
-def api_huertos():
+# --- APIS GEOJSON (colecciones; en caché por empresa hasta que cambian sus tablas) ---
+@memoize(tags=("huertos",))
+def _geojson_huertos():
     features = []
     for h in Huerto.query.all():
         center = [h.center_lng or -71.5430, h.center_lat or -35.6751]
@@ -98,11 +99,16 @@ def api_huertos():
             except Exception:
                 feature["geometry"] = None
         features.append(feature)
-    return jsonify({"type": "FeatureCollection", "features": features})
+    return {"type": "FeatureCollection", "features": features}
 
-@geo_bp.route("/api/parcelas", endpoint="api_parcelas")
+@geo_bp.route("/api/huertos", endpoint="api_huertos")
+@solo_lectura
 @login_required
-def api_parcelas():
+def api_huertos():
+    return jsonify(_geojson_huertos())
+
+@memoize(tags=("parcelas",))
+def _geojson_parcelas():
     features = []
     for p in Parcela.query.all():
         geom = None
@@ -116,11 +122,16 @@ def api_parcelas():
             "geometry": geom,
             "properties": {"id": p.id, "nombre": p.nombre, "huerto_id": p.huerto_id}
         })
-    return jsonify({"type": "FeatureCollection", "features": features})
+    return {"type": "FeatureCollection", "features": features}
 
-@geo_bp.route("/api/actividades", endpoint="api_actividades")
+@geo_bp.route("/api/parcelas", endpoint="api_parcelas")
+@solo_lectura
 @login_required
-def api_actividades():
+def api_parcelas():
+    return jsonify(_geojson_parcelas())
+
+@memoize(tags=("actividades_campo",))
+def _geojson_actividades():
     features = []
     for a in ActividadCampo.query.order_by(ActividadCampo.fecha.desc()).limit(500).all():
         geom = None
@@ -144,10 +155,17 @@ def api_actividades():
                 "duracion_min": a.duracion_min
             }
         })
-    return jsonify({"type": "FeatureCollection", "features": features})
+    return {"type": "FeatureCollection", "features": features}
+
+@geo_bp.route("/api/actividades", endpoint="api_actividades")
+@solo_lectura
+@login_required
+def api_actividades():
+    return jsonify(_geojson_actividades())
 
 # --- APIS GEOJSON (uno por id) para 'focus' ---
 @geo_bp.route("/api/parcelas/<int:pid>", endpoint="api_parcela")
+@solo_lectura
 @login_required
 def api_parcela(pid):
     p = Parcela.query.get_or_404(pid)
@@ -164,6 +182,7 @@ def api_parcela(pid):
     })
 
 @geo_bp.route("/api/actividades/<int:aid>", endpoint="api_actividad")
+@solo_lectura
 @login_required
 def api_actividad(aid):
     a = ActividadCampo.query.get_or_404(aid)
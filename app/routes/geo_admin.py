@@ -4,11 +4,13 @@ from flask_login import login_required
 from app.models import Parcela, Huerto, ActivityType
 from app.forms import ParcelaForm, ActivityTypeForm
 from app import db
+from app.cache import memoize
 import json
 
 geo_admin_bp = Blueprint('geo_admin', __name__, url_prefix='/admin/geo')
 geo_types_bp = Blueprint('geo_types', __name__, url_prefix='/admin/geo/tipos')
 
+@memoize(tags=("huertos",))
 def _huertos_choices():
     return [(h.id, h.nombre) for h in Huerto.query.order_by(Huerto.nombre.asc()).all()]
 
@@ -1,4 +1,6 @@
-from flask import Blueprint, render_template
+import os
+
+from flask import Blueprint, render_template, current_app, jsonify, Response
 
 from app.models import User, Recomendacion, Huerto
 from app.models import Bodega
@@ -11,5 +13,22 @@ main_bp = Blueprint('main', __name__)
 def index():
     return render_template('index.html')
 
+@main_bp.route('/sw.js')
+def service_worker():
+    # Servido desde la raíz para que su scope cubra toda la app (no solo /static/).
+    # La versión del precache va embebida: si cambia un asset, cambia el SW y se reinstala.
+    with open(os.path.join(current_app.static_folder, 'sw.js'), encoding='utf-8') as f:
+        js = f.read()
+    version = current_app.extensions['precache_manifest']['version']
+    resp = Response(js.replace('__PRECACHE_VERSION__', version), mimetype='application/javascript')
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+@main_bp.route('/precache-manifest.json')
+def precache_manifest():
+    resp = jsonify(current_app.extensions['precache_manifest'])
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
 
 
@@ -0,0 +1,22 @@
+# app/routes/metricas.py
+from flask import Blueprint, Response, abort, current_app
+
+from app import metricas
+
+metricas_bp = Blueprint("metricas", __name__)
+
+
+@metricas_bp.route("/metrics")
+def metrics():
+    """Métricas de todos los workers en formato de texto de Prometheus (requiere ``METRICS_TOKEN``)."""
+    token = current_app.config.get("METRICS_TOKEN")
+    volcado = current_app.extensions.get("metricas")
+    if not token or volcado is None:
+        abort(404)
+    if not metricas.token_valido(token):
+        return Response("Token inválido\n", 401, {"WWW-Authenticate": "Bearer"}, mimetype="text/plain")
+    return Response(
+        metricas.exposicion(volcado.agregado()),
+        mimetype="text/plain; version=0.0.4; charset=utf-8",
+        headers={"Cache-Control": "no-store"},
+    )
@@ -0,0 +1,60 @@
+# app/routes/search.py
+from flask import Blueprint, jsonify, request, current_app
+from flask_login import login_required, current_user
+
+from app.extensions import db
+from app.models import Huerto
+from app import search
+
+search_bp = Blueprint("search", __name__, url_prefix="/buscar")
+
+
+@search_bp.route("/")
+@login_required
+def buscar():
+    """
+    Búsqueda full-text en bitácoras, recomendaciones y documentos de la empresa.
+    Parámetros: q, entidad (actividad|recomendacion|documento), anio, page, per_page.
+    """
+    q = (request.args.get("q") or "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), 50)
+
+    if str(db.engine.url) not in search._motores_indexados:
+        return jsonify({"error": "Búsqueda no disponible en este motor de base de datos"}), 501
+
+    # Técnicos: solo sus huertos (+ recomendaciones asignadas y documentos generales)
+    huerto_ids = None
+    if current_user.role == "tecnico":
+        huerto_ids = [
+            h_id for (h_id,) in db.session.query(Huerto.id).filter_by(
+                empresa_id=current_user.empresa_id, responsable_id=current_user.id
+            )
+        ]
+
+    try:
+        res = search.buscar(
+            q,
+            current_user.empresa_id,
+            huerto_ids=huerto_ids,
+            tecnico_id=current_user.id,
+            entidad=request.args.get("entidad"),
+            anio=request.args.get("anio", type=int),
+            page=page,
+            per_page=per_page,
+        )
+    except Exception:
+        # el detalle (SQL / FTS) queda en el log, no en la respuesta
+        current_app.logger.exception("Error en /buscar")
+        return jsonify({"error": "No se pudo completar la búsqueda"}), 500
+
+    # Nombre de huerto para mostrar en resultados (una sola consulta)
+    ids = {i["huerto_id"] for i in res["items"] if i["huerto_id"]}
+    nombres = dict(
+        db.session.query(Huerto.id, Huerto.nombre).filter(Huerto.id.in_(ids)).all()
+    ) if ids else {}
+    for i in res["items"]:
+        i["huerto"] = nombres.get(i["huerto_id"])
+
+    res["q"] = q
+    return jsonify(res)
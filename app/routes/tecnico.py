@@ -2,15 +2,17 @@
 from datetime import datetime
 from functools import wraps
 
-from flask import Blueprint, flash, render_template, redirect, request, url_for, abort
+from flask import Blueprint, flash, render_template, redirect, request, url_for, abort, jsonify, current_app
 from flask_login import login_required, current_user
-from sqlalchemy import extract
-from sqlalchemy.orm import selectinload
+from sqlalchemy import extract, or_
+from sqlalchemy.orm import selectinload, joinedload
 
+from app.database import solo_lectura
 from app.extensions import db  # 👈 DB desde extensions
+from app import sync
 from app.models import (
     Bodega, Huerto, Recomendacion, Quimico,
-    FormularioTarea, ChecklistItem, ActividadHuerto, MovimientoInventario
+    FormularioTarea, ChecklistItem, ActividadHuerto, MovimientoInventario, tecnico_bodega
 )
 from app.forms import (
     QuimicoForm, ResponderFormularioForm, ChecklistItemForm, RegistrarActividadForm,
@@ -78,6 +80,7 @@ def _get_bodega_or_404(bodega_id: int) -> Bodega:
 
 # ================== Dashboard técnico ==================
 @tecnico_bp.route("/tecnico/dashboard")
+@solo_lectura
 @login_required
 @tecnico_required
 def tecnico_dashboard():
@@ -289,6 +292,7 @@ def editar_huerto(huerto_id):
 
 # ================== Bitácora de huerto ==================
 @tecnico_bp.route("/huerto/<int:huerto_id>/bitacora")
+@solo_lectura
 @login_required
 @tecnico_required
 def bitacora_huerto(huerto_id):
@@ -560,24 +564,22 @@ def responder_formulario(formulario_id):
 @login_required
 @tecnico_required
 def todos_los_quimicos():
-    print("=== DEBUG DETALLADO ===")
-    print(f"Usuario actual: {current_user.name} (ID: {current_user.id})")
-
-    bodegas_m2m = []
-    try:
-        bodegas_m2m = current_user.bodegas_asignadas.filter_by(empresa_id=current_user.empresa_id).all()
-    except Exception:
-        bodegas_m2m = [b for b in getattr(current_user, "bodegas_asignadas", []) if _same_empresa(b)]
-    print(f"1) M2M bodegas: {len(bodegas_m2m)}")
-
-    bodegas_resp = Bodega.query.filter_by(responsable_id=current_user.id, empresa_id=current_user.empresa_id).all()
-    print(f"2) Bodegas responsable: {len(bodegas_resp)}")
-
-    # Consolidado
-    bodegas = list({*bodegas_m2m, *bodegas_resp})
-    quimicos = []
-    for b in bodegas:
-        quimicos.extend(b.quimicos)
+    # Bodegas asignadas (M2M) o de las que es responsable, con químicos y huerto
+    # precargados: la plantilla recorre bodega.quimicos y quimico.bodega.huerto
+    asignadas = db.session.query(tecnico_bodega.c.bodega_id).filter(
+        tecnico_bodega.c.tecnico_id == current_user.id
+    )
+    bodegas = (
+        Bodega.query
+        .filter(
+            Bodega.empresa_id == current_user.empresa_id,
+            or_(Bodega.responsable_id == current_user.id, Bodega.id.in_(asignadas)),
+        )
+        .options(selectinload(Bodega.quimicos), joinedload(Bodega.huerto))
+        .order_by(Bodega.nombre.asc())
+        .all()
+    )
+    quimicos = [q for b in bodegas for q in b.quimicos]
 
     return render_template("tecnico/todos_los_quimicos.html", quimicos=quimicos, bodegas=bodegas)
 
@@ -597,3 +599,36 @@ def registrar_actividad():
         .all()
     )
     return render_template("tecnico/elegir_huerto.html", huertos=huertos)
+
+
+# ================== API sincronización offline ==================
+@tecnico_bp.route("/api/sync", methods=["POST"])
+@login_required
+@tecnico_required
+def api_sync():
+    """
+    Aplica en lote mutaciones registradas sin conexión.
+    Body: {"mutaciones": [{"client_id", "entidad", "op", "data"}, ...]}
+    """
+    payload = request.get_json(silent=True) or {}
+    mutaciones = payload.get("mutaciones")
+    if not isinstance(mutaciones, list):
+        return jsonify({"error": "Se espera una lista 'mutaciones'"}), 400
+    try:
+        resultados = sync.aplicar_lote(current_user, mutaciones)
+    except sync.MutacionInvalida as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Error en /tecnico/api/sync")
+        return jsonify({"error": "No se pudo aplicar el lote; reintentar más tarde"}), 500
+    return jsonify({"resultados": resultados})
+
+
+@tecnico_bp.route("/api/changes")
+@login_required
+@tecnico_required
+def api_changes():
+    """Cambios (altas/modificaciones/bajas) visibles para el técnico desde el token ``since``."""
+    since = request.args.get("since", type=int)
+    return jsonify(sync.cambios_desde(current_user, since))
@@ -0,0 +1,325 @@
+# app/search.py
+"""
+Índice full-text (SQLite FTS5) sobre bitácoras, recomendaciones y documentos.
+
+El índice vive en la tabla virtual ``busqueda_fts`` y se mantiene
+incrementalmente con eventos de los modelos (insert/update/delete), dentro
+de la misma transacción que modifica la fila original.
+"""
+import os
+import re
+import zipfile
+
+from flask import current_app, has_app_context
+from markupsafe import escape
+from sqlalchemy import event, inspect, text
+
+from app.extensions import db
+from app.models import ActividadHuerto, Recomendacion, Documento, Huerto
+
+FTS_TABLE = "busqueda_fts"
+
+# Código por entidad: el rowid del índice es (id * 4 + código), así se puede
+# reemplazar/borrar una entrada por rowid sin escanear la tabla virtual.
+ENTIDADES = {
+    "actividad": 1,
+    "recomendacion": 2,
+    "documento": 3,
+}
+_ENTIDAD_POR_CODIGO = {v: k for k, v in ENTIDADES.items()}
+
+MAX_TEXTO_DOC = 200_000  # caracteres indexados por documento
+# snippet() marca con caracteres de control; se cambian por <mark> después de escapar el texto
+MARCA_INICIO, MARCA_FIN = "\x02", "\x03"
+
+# URLs de motores donde el índice existe (se registran en ensure_search_index)
+_motores_indexados = set()
+
+
+def _rowid(entidad: str, entidad_id: int) -> int:
+    return entidad_id * 4 + ENTIDADES[entidad]
+
+
+# ==============================
+# Creación / reconstrucción
+# ==============================
+def ensure_search_index(engine=None, backfill: bool = True) -> bool:
+    """
+    Crea la tabla FTS5 si no existe. Si se acaba de crear y ``backfill`` es
+    True, la puebla con los datos actuales. Devuelve False si el motor no
+    es SQLite (el índice queda deshabilitado).
+    """
+    engine = engine or db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+
+    with engine.begin() as conn:
+        existe = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"),
+            {"n": FTS_TABLE},
+        ).first()
+        if not existe:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                "titulo, contenido, "
+                "entidad UNINDEXED, entidad_id UNINDEXED, empresa_id UNINDEXED, "
+                "huerto_id UNINDEXED, tecnico_id UNINDEXED, fecha UNINDEXED, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+    _motores_indexados.add(str(engine.url))
+
+    # En una BD recién creada (reset_database) las tablas de origen aún no existen
+    if not existe and backfill and inspect(engine).has_table(ActividadHuerto.__tablename__):
+        reindexar_todo(engine)
+    return True
+
+
+def reindexar_todo(engine=None) -> int:
+    """Vacía el índice y lo reconstruye desde las tablas de origen."""
+    engine = engine or db.engine
+    total = 0
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        for modelo, fn in (
+            (ActividadHuerto, _doc_actividad),
+            (Recomendacion, _doc_recomendacion),
+            (Documento, _doc_documento),
+        ):
+            cols = [c.key for c in modelo.__table__.columns]
+            for fila in conn.execute(modelo.__table__.select()).mappings():
+                _upsert(conn, fn(conn, _Fila(fila, cols)))
+                total += 1
+    return total
+
+
+class _Fila:
+    """Envoltorio mínimo para usar filas Core con los mismos builders que los eventos."""
+    def __init__(self, mapping, cols):
+        for c in cols:
+            setattr(self, c, mapping[c])
+
+
+# ==============================
+# Construcción de entradas
+# ==============================
+def _nombre_huerto(conn, huerto_id):
+    if not huerto_id:
+        return ""
+    return conn.execute(
+        text("SELECT nombre FROM huertos WHERE id = :id"), {"id": huerto_id}
+    ).scalar() or ""
+
+
+def _unir(*partes) -> str:
+    return "\n".join(p for p in partes if p)
+
+
+def _doc_actividad(conn, a):
+    titulo = _unir((a.tipo or "").replace("_", " "), _nombre_huerto(conn, a.huerto_id))
+    contenido = _unir(a.descripcion, a.observaciones, a.plaga, a.producto, a.resultado)
+    return dict(
+        rowid=_rowid("actividad", a.id), titulo=titulo, contenido=contenido,
+        entidad="actividad", entidad_id=a.id, empresa_id=a.empresa_id,
+        huerto_id=a.huerto_id, tecnico_id=None,
+        fecha=a.fecha.isoformat() if a.fecha else None,
+    )
+
+
+def _doc_recomendacion(conn, r):
+    return dict(
+        rowid=_rowid("recomendacion", r.id),
+        titulo=_unir(r.categoria, _nombre_huerto(conn, r.huerto_id)),
+        contenido=r.contenido or "",
+        entidad="recomendacion", entidad_id=r.id, empresa_id=r.empresa_id,
+        huerto_id=r.huerto_id, tecnico_id=r.tecnico_id,
+        fecha=r.fecha.date().isoformat() if r.fecha else None,
+    )
+
+
+def _doc_documento(conn, d):
+    return dict(
+        rowid=_rowid("documento", d.id),
+        titulo=_unir(d.titulo, d.categoria),
+        contenido=extraer_texto_documento(d.filename),
+        entidad="documento", entidad_id=d.id, empresa_id=d.empresa_id,
+        huerto_id=d.huerto_id, tecnico_id=None,
+        fecha=d.created_at.date().isoformat() if d.created_at else None,
+    )
+
+
+def _upsert(conn, doc: dict):
+    conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), {"rowid": doc["rowid"]})
+    conn.execute(text(
+        f"INSERT INTO {FTS_TABLE} "
+        "(rowid, titulo, contenido, entidad, entidad_id, empresa_id, huerto_id, tecnico_id, fecha) "
+        "VALUES (:rowid, :titulo, :contenido, :entidad, :entidad_id, :empresa_id, "
+        ":huerto_id, :tecnico_id, :fecha)"
+    ), doc)
+
+
+# ==============================
+# Extracción de texto de archivos
+# ==============================
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _texto_xml_zip(path: str, miembros) -> str:
+    partes = []
+    with zipfile.ZipFile(path) as z:
+        for nombre in z.namelist():
+            if any(nombre.startswith(m) for m in miembros):
+                xml = z.read(nombre).decode("utf-8", errors="ignore")
+                partes.append(_TAG_RE.sub(" ", xml))
+    return " ".join(partes)
+
+
+def extraer_texto_documento(filename: str) -> str:
+    """
+    Extrae texto plano del archivo subido (txt/csv, docx, xlsx y, si está
+    instalado ``pypdf``, pdf). Cualquier error devuelve cadena vacía: el
+    documento queda indexado al menos por título y categoría.
+    """
+    if not filename or not has_app_context():
+        return ""
+    path = os.path.join(current_app.config.get("UPLOAD_FOLDER", ""), filename)
+    if not os.path.isfile(path):
+        return ""
+
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    try:
+        if ext in ("txt", "csv"):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                texto = f.read(MAX_TEXTO_DOC)
+        elif ext == "docx":
+            texto = _texto_xml_zip(path, ("word/document.xml",))
+        elif ext == "xlsx":
+            texto = _texto_xml_zip(path, ("xl/sharedStrings.xml",))
+        elif ext == "pdf":
+            try:
+                from pypdf import PdfReader  # opcional
+            except ImportError:
+                return ""
+            texto = " ".join((p.extract_text() or "") for p in PdfReader(path).pages)
+        else:
+            return ""
+    except Exception:
+        current_app.logger.warning("No se pudo extraer texto de %s", filename, exc_info=True)
+        return ""
+    return re.sub(r"\s+", " ", texto)[:MAX_TEXTO_DOC]
+
+
+# ==============================
+# Hooks: mantener el índice al día
+# ==============================
+def _activo(connection) -> bool:
+    return str(connection.engine.url) in _motores_indexados
+
+
+def _registrar_hooks(modelo, entidad, builder):
+    @event.listens_for(modelo, "after_insert")
+    @event.listens_for(modelo, "after_update")
+    def _indexar(mapper, connection, target):
+        if _activo(connection):
+            _upsert(connection, builder(connection, target))
+
+    @event.listens_for(modelo, "after_delete")
+    def _desindexar(mapper, connection, target):
+        if _activo(connection):
+            connection.execute(
+                text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"),
+                {"rowid": _rowid(entidad, target.id)},
+            )
+
+
+_registrar_hooks(ActividadHuerto, "actividad", _doc_actividad)
+_registrar_hooks(Recomendacion, "recomendacion", _doc_recomendacion)
+_registrar_hooks(Documento, "documento", _doc_documento)
+
+
+@event.listens_for(Huerto, "after_update")
+def _reindexar_titulos_huerto(mapper, connection, target):
+    """Al renombrar un huerto, rehace las entradas cuyo título incluye su nombre."""
+    if not _activo(connection) or not inspect(target).attrs.nombre.history.has_changes():
+        return
+    for modelo, builder in ((ActividadHuerto, _doc_actividad), (Recomendacion, _doc_recomendacion)):
+        tabla = modelo.__table__
+        cols = [c.key for c in tabla.columns]
+        for fila in connection.execute(tabla.select().where(tabla.c.huerto_id == target.id)).mappings():
+            _upsert(connection, builder(connection, _Fila(fila, cols)))
+
+
+# ==============================
+# Consulta
+# ==============================
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _expresion_match(q: str) -> str | None:
+    """Convierte texto libre en una expresión FTS5 segura (AND implícito, prefijo en el último término)."""
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    partes = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return " ".join(partes)
+
+
+def _resaltar(extracto: str | None) -> str:
+    """Escapa el extracto y cambia las marcas de ``snippet()`` por ``<mark>``."""
+    return str(escape(extracto or "")).replace(MARCA_INICIO, "<mark>").replace(MARCA_FIN, "</mark>")
+
+
+def buscar(q: str, empresa_id: int, *, huerto_ids=None, tecnico_id=None,
+           entidad: str | None = None, anio: int | None = None,
+           page: int = 1, per_page: int = 20) -> dict:
+    """
+    Busca en el índice, siempre acotado a ``empresa_id``.
+
+    Si se pasa ``huerto_ids`` (técnicos) solo se devuelven entradas de esos
+    huertos, recomendaciones asignadas a ``tecnico_id`` y documentos generales.
+    Resultados ordenados por bm25 (el título pesa más que el contenido).
+    ``extracto`` es HTML seguro: el texto va escapado y solo trae ``<mark>``.
+    """
+    match = _expresion_match(q)
+    if not match:
+        return {"items": [], "total": 0, "page": page, "per_page": per_page}
+
+    where = [f"{FTS_TABLE} MATCH :match", "empresa_id = :empresa_id"]
+    params = {"match": match, "empresa_id": empresa_id}
+
+    if entidad in ENTIDADES:
+        where.append("entidad = :entidad")
+        params["entidad"] = entidad
+    if anio:
+        where.append("substr(fecha, 1, 4) = :anio")
+        params["anio"] = str(anio)
+    if huerto_ids is not None:
+        ids = ",".join(str(int(h)) for h in huerto_ids) or "NULL"
+        where.append(
+            f"(huerto_id IN ({ids}) OR tecnico_id = :tecnico_id "
+            "OR (entidad = 'documento' AND huerto_id IS NULL))"
+        )
+        params["tecnico_id"] = tecnico_id
+
+    filtro = " AND ".join(where)
+    total = db.session.execute(
+        text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {filtro}"), params
+    ).scalar() or 0
+
+    params.update(limit=per_page, offset=(page - 1) * per_page)
+    filas = db.session.execute(text(
+        f"SELECT rowid, entidad_id, huerto_id, fecha, titulo, "
+        f"snippet({FTS_TABLE}, 1, char(2), char(3), '…', 16) AS extracto, "
+        f"bm25({FTS_TABLE}, 5.0, 1.0) AS rank "
+        f"FROM {FTS_TABLE} WHERE {filtro} ORDER BY rank LIMIT :limit OFFSET :offset"
+    ), params).mappings().all()
+
+    items = [{
+        "entidad": _ENTIDAD_POR_CODIGO[f["rowid"] % 4],
+        "id": f["entidad_id"],
+        "huerto_id": f["huerto_id"],
+        "fecha": f["fecha"],
+        "titulo": f["titulo"],
+        "extracto": _resaltar(f["extracto"]),
+        "score": round(-f["rank"], 4),
+    } for f in filas]
+    return {"items": items, "total": total, "page": page, "per_page": per_page}
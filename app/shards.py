@@ -0,0 +1,433 @@
+# app/shards.py
+"""
+Sharding por empresa.
+
+La BD principal es el directorio: siempre tiene ``empresas`` y, para las
+empresas sin shard (``Empresa.shard`` NULL), también todos sus datos. Una
+empresa con shard guarda todas sus tablas en otro motor, configurado en
+``DB_SHARDS`` como ``nombre=destino`` separados por ``;``. El destino es
+una URL (p. ej. otro archivo SQLite) o ``schema:<nombre>`` para usar un
+schema de la misma BD PostgreSQL::
+
+    DB_SHARDS="exportadora=sqlite:////srv/agrodesk/shard_exportadora.db;sur=schema:tenant_sur"
+
+``load_tenant`` llama a ``activar_shard`` y la sesión (``SesionEnrutada``)
+manda cada consulta del request al motor del shard. Así una importación
+pesada de una empresa solo bloquea su propio archivo. Fuera de un request
+(scripts de importación) se enlaza con ``with enlazar(empresa):``; sin eso,
+``insertar_bulk`` se niega a escribir filas de una empresa con shard en la
+BD principal (``verificar_enlace``).
+
+Herramientas (``shards.py``): migrar todos los shards con Alembic y mover
+una empresa entre shards. Durante el traslado la empresa sigue leyendo; sus
+escrituras reciben 503 hasta que termina la copia.
+
+Ids globales: una empresa trasladada conserva sus ids (los clientes
+offline y los cursores de sincronización los guardan), así que cada BD
+reparte ids de un rango propio de ``RANGO_IDS``: la principal desde 1 y el
+shard en la posición *n* de ``DB_SHARDS`` desde ``n * RANGO_IDS``. Por eso
+a ``DB_SHARDS`` solo se le agregan shards al final, nunca se reordena ni se
+quita uno del medio. En SQLite el siguiente id es el máximo de la tabla más
+uno, de modo que:
+
+* las tablas de un shard SQLite se crean con AUTOINCREMENT y su
+  ``sqlite_sequence`` parte en el inicio del rango (borrar filas no
+  libera ids);
+* no se traslada a una BD SQLite una empresa con ids por encima de su
+  rango (p. ej. de vuelta a la principal tras crear datos en un shard);
+* ``borrar_origen`` se rechaza si el origen es una tabla SQLite sin
+  AUTOINCREMENT cuyo id máximo es de la empresa (se volvería a entregar).
+"""
+import time
+from contextlib import contextmanager
+
+from flask import abort, current_app, g, request
+from sqlalchemy import Integer, MetaData, create_engine, delete, func, inspect, select, text
+
+from app.database import opciones_motor, registrar_pragmas
+
+PRINCIPAL = "principal"
+LOTE_COPIA = 1000
+PREFIJO_SCHEMA = "schema:"
+RANGO_IDS = 100_000_000     # ids por BD; cabe en INTEGER de PostgreSQL hasta 20 shards
+
+
+class ErrorShard(RuntimeError):
+    pass
+
+
+def parsear_shards(valor: str | None) -> dict[str, str]:
+    shards = {}
+    for parte in (valor or "").split(";"):
+        if not parte.strip():
+            continue
+        nombre, _, destino = parte.partition("=")
+        nombre, destino = nombre.strip(), destino.strip()
+        if not nombre or not destino or nombre == PRINCIPAL:
+            raise ErrorShard(f"Entrada inválida en DB_SHARDS: {parte!r}")
+        shards[nombre] = destino
+    return shards
+
+
+def _crear_motor(app, destino: str, principal):
+    if destino.startswith(PREFIJO_SCHEMA):
+        # Mismo pool que el principal; las tablas sin schema explícito se traducen al del shard
+        return principal.execution_options(schema_translate_map={None: destino[len(PREFIJO_SCHEMA):]})
+    motor = create_engine(destino, **opciones_motor({**app.config, "SQLALCHEMY_DATABASE_URI": destino}))
+    registrar_pragmas(motor, app.extensions.get("db_profile", {}))
+    return motor
+
+
+def init_shards(app, db):
+    """Crea un motor por shard de ``DB_SHARDS``. Sin shards configurados no hace nada."""
+    destinos = parsear_shards(app.config.get("DB_SHARDS"))
+    with app.app_context():
+        principal = db.engine
+    app.extensions["shards"] = {nombre: _crear_motor(app, d, principal) for nombre, d in destinos.items()}
+    app.extensions["shards_destinos"] = destinos
+
+    # Índice de búsqueda de cada shard SQLite ya creado (los hooks solo indexan motores registrados)
+    from app import search
+    for nombre, motor in app.extensions["shards"].items():
+        try:
+            if motor.dialect.name == "sqlite" and _tiene_tablas(motor):
+                search.ensure_search_index(motor)
+        except Exception:
+            app.logger.warning("No se pudo preparar el índice de búsqueda del shard %s", nombre, exc_info=True)
+    return bool(destinos)
+
+
+def motor_de(nombre: str | None, app=None):
+    """Motor del shard ``nombre`` (None o "principal" = BD principal)."""
+    app = app or current_app
+    if not nombre or nombre == PRINCIPAL:
+        from app.extensions import db
+        with app.app_context():
+            return db.engine
+    try:
+        return app.extensions["shards"][nombre]
+    except KeyError:
+        raise ErrorShard(f"Shard {nombre!r} no está en DB_SHARDS") from None
+
+
+def base_ids(nombre: str | None, app=None) -> int:
+    """Primer id del rango de ``nombre`` (0 para la principal): la posición en ``DB_SHARDS``."""
+    if not nombre or nombre == PRINCIPAL:
+        return 0
+    destinos = list((app or current_app).extensions["shards_destinos"])
+    if nombre not in destinos:
+        raise ErrorShard(f"Shard {nombre!r} no está en DB_SHARDS")
+    base = (destinos.index(nombre) + 1) * RANGO_IDS
+    if base + RANGO_IDS > 2**31:
+        raise ErrorShard(f"Demasiados shards para RANGO_IDS={RANGO_IDS}: {nombre!r} quedaría fuera de INTEGER")
+    return base
+
+
+def activar_shard(empresa, bloquear_escrituras: bool = True):
+    """Enlaza la sesión del request al shard de ``empresa``; 503 a escrituras si se está trasladando."""
+    g._shard_motor = None
+    if empresa is None:
+        return
+    if bloquear_escrituras and empresa.shard_bloqueado and request.method not in ("GET", "HEAD", "OPTIONS"):
+        abort(503, description="La empresa se está trasladando de servidor; intenta en unos segundos.")
+    if empresa.shard:
+        motor = current_app.extensions.get("shards", {}).get(empresa.shard)
+        if motor is None:
+            current_app.logger.error("Empresa %s apunta al shard desconocido %r", empresa.id, empresa.shard)
+            abort(503)
+        g._shard_motor = motor
+
+
+@contextmanager
+def enlazar(empresa):
+    """Fuera de un request: la sesión lee y escribe en el shard de ``empresa`` dentro del bloque.
+
+    Llamar con la sesión sin cambios pendientes: lo ya agregado a la sesión
+    se escribe donde apunte al hacer flush.
+    """
+    if empresa.shard_bloqueado:
+        raise ErrorShard(f"La empresa {empresa.slug!r} se está trasladando de shard; reintenta al terminar")
+    motor = motor_de(empresa.shard) if empresa.shard else None
+    anterior = g.get("_shard_motor")
+    g._shard_motor = motor
+    try:
+        yield motor
+    finally:
+        g._shard_motor = anterior
+
+
+def verificar_enlace(empresa_ids):
+    """``ErrorShard`` si la sesión no apunta al shard de alguna de ``empresa_ids`` (sin shards no hace nada)."""
+    if not current_app.extensions.get("shards"):
+        return
+    from app.extensions import db
+    from app.models import Empresa
+
+    activo = g.get("_shard_motor")
+    for empresa_id, shard in db.session.execute(
+        select(Empresa.id, Empresa.shard).where(Empresa.id.in_([e for e in empresa_ids if e is not None]))
+    ):
+        esperado = motor_de(shard) if shard else None
+        if activo is not esperado:
+            raise ErrorShard(f"La empresa {empresa_id} está en {shard or PRINCIPAL!r} y la sesión no: "
+                             "enlázala con shards.enlazar(empresa)")
+
+
+# ==============================
+# Traslado de una empresa
+# ==============================
+def _filtro_empresa(tabla, metadata, empresa_id):
+    """Condición que selecciona las filas de la empresa en ``tabla`` (None si la tabla no es por empresa)."""
+    if "empresa_id" in tabla.c:
+        return tabla.c.empresa_id == empresa_id
+    # Tablas hijas sin empresa_id: se siguen por su FK hacia una tabla que sí la tiene
+    for fk in tabla.foreign_keys:
+        padre = fk.column.table
+        if "empresa_id" in padre.c:
+            return fk.parent.in_(select(fk.column).where(padre.c.empresa_id == empresa_id))
+    return None
+
+
+def tablas_por_empresa(metadata):
+    """Tablas con datos de empresa, en orden de dependencias (padres primero)."""
+    return [t for t in metadata.sorted_tables
+            if t.name != "empresas" and _filtro_empresa(t, metadata, 0) is not None]
+
+
+def _pk_entera(tabla):
+    pk = list(tabla.primary_key.columns)
+    return pk[0] if len(pk) == 1 and isinstance(pk[0].type, Integer) else None
+
+
+def _sin_autoincrement(conn, tablas) -> list[str]:
+    """Tablas SQLite cuyo id sale de max(id) + 1 (sin AUTOINCREMENT)."""
+    creadas = dict(conn.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'table'")).all())
+    return [t.name for t in tablas if t.name in creadas and "AUTOINCREMENT" not in creadas[t.name].upper()]
+
+
+def reservar_rango_ids(motor, metadata, base: int):
+    """
+    Hace que los ids nuevos de ``motor`` salgan desde ``base``: ajusta
+    ``sqlite_sequence`` o las secuencias de PostgreSQL (solo hacia arriba).
+    """
+    if base <= 0:
+        return
+    tablas = [t for t in tablas_por_empresa(metadata) if _pk_entera(t) is not None]
+    with motor.begin() as conn:
+        if motor.dialect.name == "sqlite":
+            sin_auto = _sin_autoincrement(conn, tablas)
+            if sin_auto:
+                raise ErrorShard(f"Tablas sin AUTOINCREMENT en el shard: {', '.join(sin_auto)}; "
+                                 "no se puede reservar su rango de ids (hay que recrearlo)")
+            for tabla in tablas:
+                conn.execute(text("UPDATE sqlite_sequence SET seq = :base WHERE name = :t AND seq < :base"),
+                             {"t": tabla.name, "base": base})
+                conn.execute(text("INSERT INTO sqlite_sequence (name, seq) SELECT :t, :base "
+                                  "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :t)"),
+                             {"t": tabla.name, "base": base})
+        elif motor.dialect.name == "postgresql":
+            schema = _schema_de(motor)
+            for tabla in tablas:
+                nombre = f'"{schema}".{tabla.name}' if schema else tabla.name
+                secuencia = conn.execute(text("SELECT pg_get_serial_sequence(:t, :c)"),
+                                         {"t": nombre, "c": _pk_entera(tabla).name}).scalar()
+                if secuencia:
+                    conn.execute(text(f"SELECT setval(:s, GREATEST(:base, (SELECT last_value FROM {secuencia})))"),
+                                 {"s": secuencia, "base": base})
+
+
+def _verificar_rangos(empresa_id, origen, destino, metadata, base_destino: int, borrar_origen: bool):
+    """Rechaza traslados que harían que dos BD entreguen el mismo id (ver el docstring del módulo)."""
+    tablas = [t for t in tablas_por_empresa(metadata) if _pk_entera(t) is not None]
+    with origen.connect() as src:
+        maximos = {
+            t.name: src.execute(
+                select(func.max(_pk_entera(t))).where(_filtro_empresa(t, metadata, empresa_id))
+            ).scalar()
+            for t in tablas
+        }
+        if destino.dialect.name == "sqlite":
+            fuera = [n for n, m in maximos.items() if m is not None and m >= base_destino + RANGO_IDS]
+            if fuera:
+                raise ErrorShard(f"La empresa tiene ids fuera del rango del destino ({', '.join(fuera)}); "
+                                 "en SQLite el destino seguiría entregando ids de otro shard")
+        if borrar_origen and origen.dialect.name == "sqlite":
+            riesgo = [
+                t.name for t in tablas
+                if t.name in _sin_autoincrement(src, [t]) and maximos[t.name] is not None
+                and maximos[t.name] == src.execute(select(func.max(_pk_entera(t)))).scalar()
+            ]
+            if riesgo:
+                raise ErrorShard(f"Borrar el origen liberaría los ids más altos de {', '.join(riesgo)} "
+                                 "y se volverían a entregar; mueve sin --borrar-origen")
+
+
+def _ids_en_conflicto(conn_destino, tabla, ids):
+    pk = list(tabla.primary_key.columns)
+    if len(pk) != 1 or not ids:
+        return 0
+    total = 0
+    for i in range(0, len(ids), LOTE_COPIA):
+        total += conn_destino.execute(
+            select(pk[0]).where(pk[0].in_(ids[i:i + LOTE_COPIA]))
+        ).first() is not None
+    return total
+
+
+@contextmanager
+def _instantanea(motor):
+    """
+    Conexión que lee todas las tablas en una misma transacción: ``BEGIN
+    IMMEDIATE`` en SQLite (nadie más escribe hasta terminar) y ``REPEATABLE
+    READ`` en PostgreSQL. Al salir se deshace (solo se leyó).
+    """
+    with motor.connect() as conn:
+        if motor.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        elif motor.dialect.name == "postgresql":
+            conn.execution_options(isolation_level="REPEATABLE READ")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
+def copiar_empresa(empresa, origen, destino, metadata, reemplazar_en_destino: bool = True, progreso=None):
+    """
+    Copia todas las filas de la empresa de ``origen`` a ``destino`` conservando
+    los ids (los cursores de sincronización siguen valiendo). Falla si algún id
+    ya lo usa otra empresa en el destino. El origen se lee en una sola
+    transacción (``_instantanea``), así las tablas son del mismo momento.
+    """
+    tablas = tablas_por_empresa(metadata)
+    es_sqlite = destino.dialect.name == "sqlite"
+    conteos = {}
+    with _instantanea(origen) as src, destino.begin() as dst:
+        if es_sqlite:
+            dst.execute(text("PRAGMA defer_foreign_keys=ON"))   # users.created_by apunta a la misma tabla
+
+        # La fila de empresas debe existir en el destino por las FK
+        fila_empresa = src.execute(
+            select(metadata.tables["empresas"]).where(metadata.tables["empresas"].c.id == empresa.id)
+        ).mappings().first() or {c.name: getattr(empresa, c.name) for c in metadata.tables["empresas"].c}
+        if dst.execute(select(metadata.tables["empresas"].c.id)
+                       .where(metadata.tables["empresas"].c.id == empresa.id)).first() is None:
+            dst.execute(metadata.tables["empresas"].insert(), [dict(fila_empresa)])
+
+        if reemplazar_en_destino:
+            for tabla in reversed(tablas):
+                dst.execute(delete(tabla).where(_filtro_empresa(tabla, metadata, empresa.id)))
+
+        for tabla in tablas:
+            filas = [dict(f) for f in src.execute(
+                select(tabla).where(_filtro_empresa(tabla, metadata, empresa.id))
+            ).mappings()]
+            pk = list(tabla.primary_key.columns)
+            if len(pk) == 1 and _ids_en_conflicto(dst, tabla, [f[pk[0].name] for f in filas]):
+                raise ErrorShard(f"Ids de {tabla.name} ya usados por otra empresa en el destino")
+            for i in range(0, len(filas), LOTE_COPIA):
+                dst.execute(tabla.insert(), filas[i:i + LOTE_COPIA])
+            conteos[tabla.name] = len(filas)
+            if progreso:
+                progreso(tabla.name, len(filas))
+    return conteos
+
+
+def borrar_empresa(empresa_id, motor, metadata, incluir_fila_empresa: bool):
+    with motor.begin() as conn:
+        if motor.dialect.name == "sqlite":
+            conn.execute(text("PRAGMA defer_foreign_keys=ON"))
+        for tabla in reversed(tablas_por_empresa(metadata)):
+            conn.execute(delete(tabla).where(_filtro_empresa(tabla, metadata, empresa_id)))
+        if incluir_fila_empresa:
+            empresas = metadata.tables["empresas"]
+            conn.execute(delete(empresas).where(empresas.c.id == empresa_id))
+
+
+def _schema_de(motor) -> str | None:
+    return (motor.get_execution_options().get("schema_translate_map") or {}).get(None)
+
+
+def _tiene_tablas(motor) -> bool:
+    return inspect(motor).has_table("empresas", schema=_schema_de(motor))
+
+
+def _con_autoincrement(metadata):
+    """Copia de ``metadata`` con AUTOINCREMENT en SQLite para las tablas con id entero."""
+    copia = MetaData()
+    for tabla in metadata.sorted_tables:
+        nueva = tabla.to_metadata(copia)
+        if _pk_entera(nueva) is not None:
+            nueva.dialect_kwargs["sqlite_autoincrement"] = True
+    return copia
+
+
+def preparar_shard(motor, metadata, base: int = 0):
+    """
+    Crea el schema, las tablas y el índice de búsqueda si el shard está vacío,
+    con los ids desde ``base`` (ver ``base_ids``). True si lo creó.
+    """
+    from app import search
+
+    if _tiene_tablas(motor):
+        reservar_rango_ids(motor, metadata, base)
+        return False
+    schema = _schema_de(motor)
+    if schema:
+        with motor.begin() as conn:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+    (_con_autoincrement(metadata) if motor.dialect.name == "sqlite" else metadata).create_all(motor)
+    reservar_rango_ids(motor, metadata, base)
+    search.ensure_search_index(motor, backfill=False)
+    return True
+
+
+def mover_empresa(app, empresa_id: int, destino_nombre: str, borrar_origen: bool = False, progreso=None,
+                  espera: float | None = None):
+    """
+    Traslada una empresa al shard ``destino_nombre`` ("principal" = BD principal):
+
+    0. verifica que el traslado respete los rangos de ids,
+    1. bloquea sus escrituras (``shard_bloqueado``; las lecturas siguen) y
+       espera ``espera`` segundos (``SHARD_ESPERA_SEGUNDOS``): ``activar_shard``
+       mira el flag al empezar cada request, así que los que ya habían
+       empezado pueden seguir escribiendo en el origen hasta terminar,
+    2. copia sus filas al destino en una sola lectura consistente del origen
+       y reconstruye el índice de búsqueda,
+    3. cambia ``Empresa.shard`` y desbloquea,
+    4. opcionalmente borra las filas del origen.
+    """
+    from app import search
+    from app.extensions import db
+    from app.models import Empresa
+
+    with app.app_context():
+        empresa = db.session.get(Empresa, empresa_id)
+        if empresa is None:
+            raise ErrorShard(f"No existe la empresa {empresa_id}")
+        origen_nombre = empresa.shard or PRINCIPAL
+        if origen_nombre == destino_nombre:
+            raise ErrorShard(f"La empresa ya está en {destino_nombre!r}")
+        origen, destino = motor_de(origen_nombre, app), motor_de(destino_nombre, app)
+        base_destino = base_ids(destino_nombre, app)
+        if destino_nombre != PRINCIPAL:
+            preparar_shard(destino, db.metadata, base_destino)
+        _verificar_rangos(empresa_id, origen, destino, db.metadata, base_destino, borrar_origen)
+
+        empresa.shard_bloqueado = True
+        db.session.commit()
+        try:
+            time.sleep(app.config.get("SHARD_ESPERA_SEGUNDOS", 30) if espera is None else espera)
+            conteos = copiar_empresa(empresa, origen, destino, db.metadata, progreso=progreso)
+            if search.ensure_search_index(destino, backfill=False):
+                search.reindexar_todo(destino)
+            empresa.shard = None if destino_nombre == PRINCIPAL else destino_nombre
+        finally:
+            empresa.shard_bloqueado = False
+            db.session.commit()
+
+        if borrar_origen:
+            borrar_empresa(empresa_id, origen, db.metadata, incluir_fila_empresa=origen_nombre != PRINCIPAL)
+            if search.ensure_search_index(origen, backfill=False):
+                search.reindexar_todo(origen)
+        return conteos
@@ -0,0 +1,276 @@
+# app/slowlog.py
+"""
+Registro de consultas lentas.
+
+Cada sentencia SQL que tarda ``SLOW_QUERY_MS`` o más se escribe como una
+línea JSON en ``SLOW_QUERY_LOG`` (con rotación por tamaño)::
+
+    {"ts": "...", "ms": 812.4, "sql": "SELECT ...", "huella": "3f2a9c01d4e7",
+     "params": {"empresa_id_1": 3, "password_1": "***"}, "endpoint": "admin.admin_dashboard",
+     "metodo": "GET", "ruta": "/admin/dashboard", "empresa_id": 3, "usuario_id": 12,
+     "pila": ["app/routes/admin.py:84 admin_dashboard", ...]}
+
+Los parámetros se redactan: los de nombre sensible (password, token, ...) y
+los valores con forma de hash de contraseña se reemplazan por ``***``, y los
+textos largos se recortan. ``pila`` resume los frames del código de la app
+(sin librerías) que llevaron a la consulta.
+
+La duración es la del ``cursor.execute`` (como en ``app.profiling``): con
+SQLite incluye el plan y los ordenamientos, no la lectura de todas las filas.
+
+``consultas_lentas.py`` agrega el archivo por huella (la forma normalizada
+de la sentencia, ver ``profiling.fingerprint_sql``).
+
+Con varios workers de gunicorn cada proceso rota su propio handler; si la
+rotación se cruza se pierde a lo más el archivo de un worker. Para volúmenes
+grandes conviene ``SLOW_QUERY_LOG_MAX_BYTES = 0`` y logrotate.
+"""
+import glob
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.profiling import _percentil, fingerprint_sql
+
+NOMBRE_LOGGER = "agrodesk.consultas_lentas"
+MAX_LARGO_TEXTO = 200
+MAX_FILAS_EXECUTEMANY = 3
+MAX_FRAMES = 6
+
+_RE_SENSIBLE = re.compile(r"pass|token|secret|clave|api_?key|hash", re.IGNORECASE)
+_RE_HASH_CLAVE = re.compile(r"^(pbkdf2:|scrypt:|\$2[aby]\$|argon2)")
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ESTE_ARCHIVO = os.path.abspath(__file__)
+
+
+# ==============================
+# Redacción y contexto
+# ==============================
+def _redactar_valor(nombre: str | None, valor):
+    if nombre and _RE_SENSIBLE.search(nombre):
+        return "***"
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return f"<{len(valor)} bytes>"
+    if isinstance(valor, str):
+        if _RE_HASH_CLAVE.match(valor):
+            return "***"
+        if len(valor) > MAX_LARGO_TEXTO:
+            return valor[:MAX_LARGO_TEXTO] + f"… (+{len(valor) - MAX_LARGO_TEXTO})"
+        return valor
+    if valor is None or isinstance(valor, (int, float, bool)):
+        return valor
+    return str(valor)[:MAX_LARGO_TEXTO]
+
+
+def redactar_parametros(parametros, nombres=None):
+    """Parámetros listos para JSON: dict por nombre si se conocen (``nombres``), si no lista."""
+    if isinstance(parametros, dict):
+        return {k: _redactar_valor(k, v) for k, v in parametros.items()}
+    valores = list(parametros or ())
+    if nombres and len(nombres) == len(valores):
+        return {n: _redactar_valor(n, v) for n, v in zip(nombres, valores)}
+    return [_redactar_valor(None, v) for v in valores]
+
+
+def _nombres_posicionales(context):
+    compilado = getattr(context, "compiled", None)
+    return list(getattr(compilado, "positiontup", None) or []) or None
+
+
+def resumen_pila(limite: int = MAX_FRAMES) -> list[str]:
+    """Frames del código de la app (los más cercanos a la consulta primero)."""
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith("<"):
+            continue   # código generado (<string>, <stdin>)
+        archivo = os.path.abspath(frame.filename)
+        if archivo == _ESTE_ARCHIVO or not archivo.startswith(_RAIZ) or "site-packages" in archivo:
+            continue
+        frames.append(f"{os.path.relpath(archivo, _RAIZ)}:{frame.lineno} {frame.name}")
+        if len(frames) >= limite:
+            break
+    return frames
+
+
+def _contexto_request() -> dict:
+    if not has_request_context():
+        return {"endpoint": None, "metodo": None, "ruta": None, "empresa_id": None, "usuario_id": None}
+    from flask_login import current_user
+    from app.tenancy import empresa_actual_id
+
+    usuario = getattr(current_user, "id", None) if "_login_user" in g else None
+    empresa_id = empresa_actual_id()
+    if empresa_id is None and g.get("empresa") is not None:
+        empresa_id = g.empresa.id
+    return {
+        "endpoint": request.endpoint, "metodo": request.method, "ruta": request.path,
+        "empresa_id": empresa_id, "usuario_id": usuario,
+    }
+
+
+def huella(sql: str) -> str:
+    return hashlib.sha1(fingerprint_sql(sql).encode()).hexdigest()[:12]
+
+
+# ==============================
+# Hooks
+# ==============================
+def _config_actual():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("consultas_lentas")
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _config_actual() is not None:
+        context._lenta_t0 = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_lenta_t0", None)
+    if inicio is None:
+        return
+    ms = (time.perf_counter() - inicio) * 1000
+    config = _config_actual()
+    if config is None or ms < config["umbral_ms"]:
+        return
+
+    nombres = _nombres_posicionales(context)
+    if executemany:
+        params = [redactar_parametros(p, nombres) for p in list(parameters)[:MAX_FILAS_EXECUTEMANY]]
+    else:
+        params = redactar_parametros(parameters, nombres)
+    entrada = {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "ms": round(ms, 2),
+        "sql": statement,
+        "huella": huella(statement),
+        "params": params,
+        "filas_executemany": len(parameters) if executemany else None,
+        **_contexto_request(),
+        "pila": resumen_pila(),
+    }
+    try:
+        config["logger"].info(json.dumps(entrada, ensure_ascii=False, default=str))
+    except Exception:
+        pass   # el registro nunca debe romper la consulta
+
+
+_hooks_sql_registrados = False
+
+
+def _crear_logger(ruta: str, max_bytes: int, respaldos: int) -> logging.Logger:
+    logger = logging.getLogger(f"{NOMBRE_LOGGER}.{os.path.abspath(ruta)}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        if max_bytes > 0:
+            handler = logging.handlers.RotatingFileHandler(
+                ruta, maxBytes=max_bytes, backupCount=respaldos, encoding="utf-8",
+            )
+        else:
+            handler = logging.handlers.WatchedFileHandler(ruta, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+
+def init_slowlog(app):
+    """Registra consultas de ``SLOW_QUERY_MS`` o más; con 0 (o sin valor) no se registra ningún hook."""
+    umbral = app.config.get("SLOW_QUERY_MS") or 0
+    if umbral <= 0:
+        return False
+    ruta = app.config.get("SLOW_QUERY_LOG") or os.path.join(app.instance_path, "logs", "consultas_lentas.jsonl")
+    app.extensions["consultas_lentas"] = {
+        "umbral_ms": umbral,
+        "ruta": ruta,
+        "logger": _crear_logger(
+            ruta, app.config.get("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024),
+            app.config.get("SLOW_QUERY_LOG_RESPALDOS", 5),
+        ),
+    }
+
+    global _hooks_sql_registrados
+    if not _hooks_sql_registrados:
+        event.listen(Engine, "before_cursor_execute", _antes_de_consulta)
+        event.listen(Engine, "after_cursor_execute", _despues_de_consulta)
+        _hooks_sql_registrados = True
+    return True
+
+
+# ==============================
+# Lectura y agregado (consultas_lentas.py)
+# ==============================
+def archivos_del_log(ruta: str) -> list[str]:
+    """El archivo y sus respaldos rotados (``.1``, ``.2``...), del más viejo al más nuevo."""
+    respaldos = [r for r in glob.glob(f"{glob.escape(ruta)}.*") if r.rsplit(".", 1)[-1].isdigit()]
+    respaldos.sort(key=lambda r: int(r.rsplit(".", 1)[-1]), reverse=True)
+    return respaldos + ([ruta] if os.path.exists(ruta) else [])
+
+
+def leer_entradas(rutas, desde: str | None = None, empresa_id: int | None = None,
+                  endpoint: str | None = None):
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    continue   # línea cortada por una rotación o un worker que murió
+                if desde and entrada.get("ts", "") < desde:
+                    continue
+                if empresa_id is not None and entrada.get("empresa_id") != empresa_id:
+                    continue
+                if endpoint and entrada.get("endpoint") != endpoint:
+                    continue
+                yield entrada
+
+
+def agregar(entradas) -> list[dict]:
+    """Una fila por huella: veces, tiempos (total, p50, p95, máx), endpoints, empresas y un ejemplo."""
+    grupos = {}
+    for e in entradas:
+        clave = e.get("huella") or huella(e["sql"])
+        grupo = grupos.setdefault(clave, {
+            "huella": clave, "forma": fingerprint_sql(e["sql"]), "tiempos": [],
+            "endpoints": Counter(), "empresas": Counter(), "ejemplo": None,
+            "primera": e.get("ts"), "ultima": e.get("ts"),
+        })
+        ts = e.get("ts")
+        grupo["tiempos"].append(e["ms"])
+        grupo["endpoints"][e.get("endpoint") or "<fuera de request>"] += 1
+        if e.get("empresa_id") is not None:
+            grupo["empresas"][e["empresa_id"]] += 1
+        if ts:
+            grupo["primera"] = min(grupo["primera"] or ts, ts)
+            grupo["ultima"] = max(grupo["ultima"] or ts, ts)
+        if grupo["ejemplo"] is None or e["ms"] > grupo["ejemplo"]["ms"]:
+            grupo["ejemplo"] = {k: e.get(k) for k in ("ts", "ms", "params", "endpoint", "empresa_id", "pila")}
+
+    filas = []
+    for grupo in grupos.values():
+        tiempos = grupo.pop("tiempos")
+        filas.append({
+            **grupo,
+            "veces": len(tiempos),
+            "total_ms": round(sum(tiempos), 2),
+            "p50_ms": round(_percentil(tiempos, 0.50), 2),
+            "p95_ms": round(_percentil(tiempos, 0.95), 2),
+            "max_ms": round(max(tiempos), 2),
+            "endpoints": grupo["endpoints"].most_common(5),
+            "empresas": grupo["empresas"].most_common(5),
+        })
+    filas.sort(key=lambda f: f["total_ms"], reverse=True)
+    return filas
@@ -0,0 +1,115 @@
+// Cola offline de mutaciones (IndexedDB) para técnicos en terreno.
+// Se usa tanto desde las páginas como desde el service worker (importScripts).
+(function (global) {
+  'use strict';
+
+  const DB_NAME = 'agrodesk-offline';
+  const STORE = 'mutaciones';
+  const SYNC_URL = '/tecnico/api/sync';
+  const SYNC_TAG = 'agrodesk-sync';
+  const LOTE = 50;
+
+  function abrir() {
+    return new Promise((resolve, reject) => {
+      const req = indexedDB.open(DB_NAME, 1);
+      req.onupgradeneeded = () => req.result.createObjectStore(STORE, { keyPath: 'client_id' });
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+  }
+
+  function transaccion(modo, fn) {
+    return abrir().then(db => new Promise((resolve, reject) => {
+      const tx = db.transaction(STORE, modo);
+      const req = fn(tx.objectStore(STORE));
+      tx.oncomplete = () => { db.close(); resolve(req ? req.result : undefined); };
+      tx.onerror = () => { db.close(); reject(tx.error); };
+    }));
+  }
+
+  function nuevoId() {
+    if (global.crypto && global.crypto.randomUUID) return global.crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+  }
+
+  function pendientes() {
+    return transaccion('readonly', s => s.getAll());
+  }
+
+  function quitar(ids) {
+    return transaccion('readwrite', s => { ids.forEach(id => s.delete(id)); });
+  }
+
+  // Background Sync si está disponible; si no, intento directo cuando hay red
+  function programarSync() {
+    const sw = global.navigator && global.navigator.serviceWorker;
+    if (sw && 'SyncManager' in global) {
+      return sw.ready.then(reg => reg.sync.register(SYNC_TAG)).catch(() => flush());
+    }
+    if (!global.navigator || global.navigator.onLine) return flush().catch(() => 0);
+    return Promise.resolve(0);
+  }
+
+  function encolar(entidad, data, op) {
+    const m = { client_id: nuevoId(), entidad, op: op || 'create', data, creado: Date.now() };
+    return transaccion('readwrite', s => s.put(m)).then(() => { programarSync(); return m; });
+  }
+
+  let enCurso = null;
+
+  // Envía la cola en lotes; cada resultado (incluidos errores de validación) es definitivo
+  function flush() {
+    if (enCurso) return enCurso;
+    enCurso = (async () => {
+      let enviados = 0;
+      const errores = [];
+      for (;;) {
+        const lista = (await pendientes()).sort((a, b) => a.creado - b.creado).slice(0, LOTE);
+        if (!lista.length) break;
+
+        const resp = await fetch(SYNC_URL, {
+          method: 'POST',
+          credentials: 'same-origin',
+          headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+          body: JSON.stringify({
+            mutaciones: lista.map(({ client_id, entidad, op, data }) => ({ client_id, entidad, op, data }))
+          })
+        });
+        const tipo = resp.headers.get('content-type') || '';
+        if (!resp.ok || !tipo.includes('json')) {
+          // Sin sesión (redirige a login) o servidor caído: se reintenta más tarde
+          throw new Error('Sincronización pendiente (HTTP ' + resp.status + ')');
+        }
+
+        const { resultados } = await resp.json();
+        const ids = (resultados || []).map(r => r.client_id).filter(Boolean);
+        if (!ids.length) break;
+        await quitar(ids);
+        enviados += ids.length;
+        resultados.filter(r => r.estado === 'error').forEach(r => errores.push(r));
+      }
+      notificar({ enviados, errores });
+      return enviados;
+    })().finally(() => { enCurso = null; });
+    return enCurso;
+  }
+
+  function notificar(detalle) {
+    if (typeof global.dispatchEvent === 'function' && typeof CustomEvent === 'function' && global.document) {
+      global.dispatchEvent(new CustomEvent('agrosync', { detail: detalle }));
+    } else if (global.clients) {
+      global.clients.matchAll().then(cs => cs.forEach(c => c.postMessage({ type: 'agrosync', detalle })));
+    }
+  }
+
+  global.AgroSync = { encolar, pendientes, flush, SYNC_TAG };
+
+  if (global.document) {
+    global.addEventListener('online', () => { flush().catch(() => {}); });
+    if (global.navigator.serviceWorker) {
+      global.navigator.serviceWorker.addEventListener('message', ev => {
+        if (ev.data && ev.data.type === 'agrosync') notificar(ev.data.detalle);
+      });
+    }
+  }
+})(typeof self !== 'undefined' ? self : window);
@@ -1,47 +1,173 @@
-const CACHE_NAME = 'agrodesk-cache-v1';
-const urlsToCache = [
-  '/',
-  '/static/css/styles.css',
-  '/static/js/geo_map.js',
-  '/static/img/logoagrodesk.svg',
-  'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
-  'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.css'
-];
+// Service worker AgroDESK (servido en /sw.js; la versión la inyecta el servidor)
+importScripts('/static/js/offline_sync.js');
 
+const VERSION = '__PRECACHE_VERSION__';
+const MANIFEST_URL = '/precache-manifest.json';
+const MANIFEST_KEY = '/__precache-manifest';
+
+const PRECACHE = 'agrodesk-precache';      // shell versionado: una entrada por url+hash
+const RUNTIME = 'agrodesk-runtime-v1';     // JSON de APIs, estáticos sin hash y CDN
+const PAGES = 'agrodesk-pages-v1';         // HTML (solo como respaldo sin conexión)
+const CACHES_VIGENTES = [PRECACHE, RUNTIME, PAGES];
+const MAX_PAGINAS = 40;
+const MAX_RUNTIME = 150;
+
+const CDN_HOSTS = ['cdn.jsdelivr.net', 'unpkg.com', 'cdnjs.cloudflare.com', 'cdn.datatables.net'];
+const SIN_CACHE = ['/docs/stream', '/metrics', '/tecnico/api/changes', '/sw.js', MANIFEST_URL];
+
+let manifestEnMemoria = null;
+
+function claveAsset(url, hash) {
+  return url + '?__v=' + hash;
+}
+
+function mapaManifest(manifest) {
+  const mapa = new Map();
+  (manifest.assets || []).forEach(a => mapa.set(a.url, a.hash));
+  return mapa;
+}
+
+async function leerManifest() {
+  if (manifestEnMemoria) return manifestEnMemoria;
+  const cache = await caches.open(PRECACHE);
+  const resp = await cache.match(MANIFEST_KEY);
+  manifestEnMemoria = resp ? mapaManifest(await resp.json()) : new Map();
+  return manifestEnMemoria;
+}
+
+async function recortar(nombre, maximo) {
+  const cache = await caches.open(nombre);
+  const claves = await cache.keys();
+  for (let i = 0; i < claves.length - maximo; i++) {
+    await cache.delete(claves[i]);
+  }
+}
+
+// ---------- Instalación: descarga solo los hashes nuevos ----------
 self.addEventListener('install', event => {
-  event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then(cache => {
-        console.log('Cache abierto');
-        return cache.addAll(urlsToCache);
-      })
-  );
+  event.waitUntil((async () => {
+    const resp = await fetch(MANIFEST_URL + '?v=' + VERSION, { cache: 'no-store' });
+    const manifest = await resp.json();
+    const cache = await caches.open(PRECACHE);
+    await Promise.all((manifest.assets || []).map(async a => {
+      const clave = claveAsset(a.url, a.hash);
+      if (await cache.match(clave)) return;
+      const r = await fetch(a.url, { cache: 'reload' });
+      if (r.ok) await cache.put(clave, r);
+    }));
+    await cache.put(MANIFEST_KEY, new Response(JSON.stringify(manifest), {
+      headers: { 'Content-Type': 'application/json' }
+    }));
+    manifestEnMemoria = mapaManifest(manifest);
+    await self.skipWaiting();
+  })());
+});
+
+// ---------- Activación: desalojo por hash y de caches antiguos ----------
+self.addEventListener('activate', event => {
+  event.waitUntil((async () => {
+    const nombres = await caches.keys();
+    await Promise.all(nombres.filter(n => !CACHES_VIGENTES.includes(n)).map(n => caches.delete(n)));
+
+    manifestEnMemoria = null;
+    const vigentes = new Set();
+    (await leerManifest()).forEach((hash, url) => vigentes.add(claveAsset(url, hash)));
+    const cache = await caches.open(PRECACHE);
+    for (const req of await cache.keys()) {
+      const u = new URL(req.url);
+      const clave = u.pathname + u.search;
+      if (clave !== MANIFEST_KEY && !vigentes.has(clave)) await cache.delete(req);
+    }
+    await self.clients.claim();
+  })());
 });
 
+// ---------- Estrategias ----------
+async function precacheFirst(request, hash) {
+  const url = new URL(request.url);
+  const cache = await caches.open(PRECACHE);
+  const hit = await cache.match(claveAsset(url.pathname, hash));
+  return hit || fetch(request);
+}
+
+async function staleWhileRevalidate(event, nombre, maximo) {
+  const cache = await caches.open(nombre);
+  const hit = await cache.match(event.request);
+  const red = fetch(event.request).then(resp => {
+    if (resp.ok && (resp.type === 'basic' || resp.type === 'cors')) {
+      cache.put(event.request, resp.clone()).then(() => recortar(nombre, maximo));
+    }
+    return resp;
+  });
+  if (hit) {
+    event.waitUntil(red.catch(() => {}));
+    return hit;
+  }
+  return red;
+}
+
+async function networkFirst(event) {
+  const cache = await caches.open(PAGES);
+  try {
+    const resp = await fetch(event.request);
+    if (resp.ok && !resp.redirected) {
+      event.waitUntil(cache.put(event.request, resp.clone()).then(() => recortar(PAGES, MAX_PAGINAS)));
+    }
+    return resp;
+  } catch (err) {
+    const hit = await cache.match(event.request);
+    if (hit) return hit;
+    throw err;
+  }
+}
+
+function esJson(request, url) {
+  const accept = request.headers.get('Accept') || '';
+  return url.pathname.includes('/api/') || url.pathname === '/docs/list' ||
+         url.pathname.startsWith('/buscar') || accept.includes('application/json');
+}
+
 self.addEventListener('fetch', event => {
-  event.respondWith(
-    caches.match(event.request)
-      .then(response => {
-        // Cache hit - return response
-        if (response) {
-          return response;
-        }
-        return fetch(event.request);
-      })
-  );
+  const request = event.request;
+  if (request.method !== 'GET') return;
+
+  const url = new URL(request.url);
+
+  if (url.origin !== self.location.origin) {
+    if (CDN_HOSTS.includes(url.hostname)) {
+      event.respondWith(staleWhileRevalidate(event, RUNTIME, MAX_RUNTIME));
+    }
+    return;
+  }
+  if (SIN_CACHE.some(p => url.pathname.startsWith(p))) return;
+
+  // Al cerrar sesión no deben quedar páginas ni datos del usuario en el equipo
+  if (url.pathname === '/logout') {
+    event.waitUntil(Promise.all([caches.delete(PAGES), caches.delete(RUNTIME)]));
+    return;
+  }
+
+  if (url.pathname.startsWith('/static/')) {
+    event.respondWith(leerManifest().then(mapa => {
+      const hash = mapa.get(url.pathname);
+      return hash ? precacheFirst(request, hash) : staleWhileRevalidate(event, RUNTIME, MAX_RUNTIME);
+    }));
+    return;
+  }
+
+  if (request.mode === 'navigate' || (request.headers.get('Accept') || '').includes('text/html')) {
+    event.respondWith(networkFirst(event));
+    return;
+  }
+
+  if (esJson(request, url)) {
+    event.respondWith(staleWhileRevalidate(event, RUNTIME, MAX_RUNTIME));
+  }
 });
 
-self.addEventListener('activate', event => {
-  const cacheWhitelist = [CACHE_NAME];
-  event.waitUntil(
-    caches.keys().then(cacheNames => {
-      return Promise.all(
-        cacheNames.map(cacheName => {
-          if (cacheWhitelist.indexOf(cacheName) === -1) {
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    })
-  );
+// Cola offline: se envía cuando vuelve la conectividad (Background Sync)
+self.addEventListener('sync', event => {
+  if (event.tag === self.AgroSync.SYNC_TAG) {
+    event.waitUntil(self.AgroSync.flush());
+  }
 });
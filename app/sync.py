@@ -0,0 +1,351 @@
+# app/sync.py
+"""
+Sincronización offline para técnicos.
+
+El cliente (service worker) acumula mutaciones en IndexedDB, cada una con un
+``client_id`` único, y las envía en lote. Aquí se aplican en una sola
+transacción y se registran en ``SyncMutacion``
+para que un reintento del mismo lote no duplique nada.
+
+También expone la sincronización delta: a partir del registro ``Cambio`` se
+devuelven solo las filas creadas, modificadas o borradas desde un token.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import (
+    Huerto, Parcela, Quimico, Bodega, ActividadHuerto, ActividadCampo,
+    ChecklistItem, FormularioTarea, MovimientoInventario, SyncMutacion,
+    Recomendacion, Cambio, tecnico_bodega,
+)
+
+MAX_MUTACIONES = 200
+
+
+class MutacionInvalida(ValueError):
+    """Error de validación de una mutación; se informa al cliente y no se reintenta."""
+
+
+# ==============================
+# Helpers
+# ==============================
+def _fecha(valor, por_defecto=None):
+    if not valor:
+        return por_defecto
+    try:
+        return datetime.fromisoformat(str(valor))
+    except ValueError:
+        raise MutacionInvalida(f"Fecha inválida: {valor!r}")
+
+
+def _numero(valor, tipo=float):
+    if valor in (None, ""):
+        return None
+    try:
+        return tipo(valor)
+    except (TypeError, ValueError):
+        raise MutacionInvalida(f"Número inválido: {valor!r}")
+
+
+def _huerto_del_tecnico(usuario, huerto_id) -> Huerto:
+    huerto = Huerto.query.filter_by(
+        id=huerto_id, empresa_id=usuario.empresa_id, responsable_id=usuario.id
+    ).first()
+    if not huerto:
+        raise MutacionInvalida("Huerto inexistente o sin acceso")
+    return huerto
+
+
+def descontar_stock(actividad: ActividadHuerto, usuario) -> None:
+    """Egreso de inventario asociado a una actividad (mismo criterio que los formularios)."""
+    if not (actividad.quimico_id and actividad.cantidad_aplicada):
+        return
+    q = Quimico.query.join(Bodega).filter(
+        Quimico.id == actividad.quimico_id, Bodega.empresa_id == usuario.empresa_id
+    ).first()
+    if q and q.cantidad_litros >= actividad.cantidad_aplicada:
+        q.cantidad_litros -= actividad.cantidad_aplicada
+        db.session.add(MovimientoInventario(
+            quimico_id=q.id, tipo="egreso", cantidad=actividad.cantidad_aplicada,
+            usuario_id=usuario.id, referencia_actividad_id=actividad.id,
+            empresa_id=usuario.empresa_id,
+        ))
+
+
+# ==============================
+# Aplicadores por entidad
+# ==============================
+def _crear_actividad_huerto(usuario, data) -> int:
+    huerto = _huerto_del_tecnico(usuario, data.get("huerto_id"))
+    if not data.get("descripcion"):
+        raise MutacionInvalida("La descripción es obligatoria")
+    fecha = _fecha(data.get("fecha"))
+    act = ActividadHuerto(
+        huerto_id=huerto.id,
+        empresa_id=usuario.empresa_id,
+        fecha=fecha.date() if fecha else date.today(),
+        tipo=data.get("tipo") or "otra",
+        descripcion=data.get("descripcion"),
+        responsable=(usuario.name or usuario.email),
+        observaciones=data.get("observaciones"),
+        producto=data.get("producto"),
+        dosis=data.get("dosis"),
+        plaga=data.get("plaga"),
+        nivel_infestacion=data.get("nivel_infestacion"),
+        resultado=data.get("resultado"),
+        quimico_id=_numero(data.get("quimico_id"), int) or None,
+        cantidad_aplicada=_numero(data.get("cantidad_aplicada")),
+        fotos="",
+    )
+    db.session.add(act)
+    db.session.flush()
+    descontar_stock(act, usuario)
+    return act.id
+
+
+def _crear_actividad_campo(usuario, data) -> int:
+    huerto = _huerto_del_tecnico(usuario, data.get("huerto_id"))
+    if not data.get("tipo"):
+        raise MutacionInvalida("El tipo es obligatorio")
+    parcela_id = _numero(data.get("parcela_id"), int) or None
+    if parcela_id and not Parcela.query.filter_by(id=parcela_id, huerto_id=huerto.id).first():
+        raise MutacionInvalida("Parcela inexistente para el huerto")
+    act = ActividadCampo(
+        huerto_id=huerto.id,
+        parcela_id=parcela_id,
+        empresa_id=usuario.empresa_id,
+        tipo=data["tipo"],
+        descripcion=data.get("descripcion"),
+        lat=_numero(data.get("lat")),
+        lng=_numero(data.get("lng")),
+        ruta_geojson=data.get("ruta_geojson"),
+        fecha=_fecha(data.get("fecha"), datetime.utcnow()),
+        duracion_min=_numero(data.get("duracion_min"), int) or 0,
+    )
+    db.session.add(act)
+    db.session.flush()
+    return act.id
+
+
+def _actualizar_checklist_item(usuario, data) -> int:
+    item = (
+        ChecklistItem.query.join(FormularioTarea)
+        .filter(
+            ChecklistItem.id == data.get("id"),
+            FormularioTarea.empresa_id == usuario.empresa_id,
+            FormularioTarea.tecnico_id == usuario.id,
+        )
+        .first()
+    )
+    if not item:
+        raise MutacionInvalida("Ítem de checklist inexistente o sin acceso")
+    if "realizado" in data:
+        item.realizado = bool(data["realizado"])
+    if "comentario" in data:
+        item.comentario = data["comentario"]
+    if data.get("completar_formulario"):
+        item.formulario.estado = "completado"
+    return item.id
+
+
+APLICADORES = {
+    ("actividad_huerto", "create"): _crear_actividad_huerto,
+    ("actividad_campo", "create"): _crear_actividad_campo,
+    ("checklist_item", "update"): _actualizar_checklist_item,
+}
+
+
+# ==============================
+# Lote
+# ==============================
+def aplicar_lote(usuario, mutaciones: list) -> list[dict]:
+    """
+    Aplica un lote de mutaciones y devuelve un resultado por cada una:
+    ``{"client_id", "estado": "creado"|"actualizado"|"duplicado"|"error", "id", "error"}``.
+
+    Las ya aplicadas (mismo client_id) devuelven el id original. Los
+    aplicadores validan antes de escribir, así una mutación inválida (también
+    una que no sea un objeto o cuyo ``data`` no lo sea) queda como ``error``
+    sin afectar al resto; todo el lote se confirma en un único commit.
+
+    Si otro request registró a la vez alguno de los mismos client_id (la cola
+    del cliente reintentó), la restricción única hace fallar el commit: se
+    descarta el lote y se aplica de nuevo, y esas mutaciones llegan como
+    ``duplicado`` con el id que guardó el otro request.
+    """
+    if len(mutaciones) > MAX_MUTACIONES:
+        raise MutacionInvalida(f"Máximo {MAX_MUTACIONES} mutaciones por lote")
+    try:
+        return _aplicar_lote(usuario, mutaciones)
+    except IntegrityError:
+        db.session.rollback()
+    return _aplicar_lote(usuario, mutaciones)
+
+
+def _aplicar_lote(usuario, mutaciones: list) -> list[dict]:
+    client_ids = [
+        str(m.get("client_id") or "") if isinstance(m, dict) else "" for m in mutaciones
+    ]
+    previas = {
+        s.client_id: s
+        for s in SyncMutacion.query.filter(
+            SyncMutacion.empresa_id == usuario.empresa_id,
+            SyncMutacion.client_id.in_([c for c in client_ids if c]),
+        )
+    }
+
+    resultados = []
+    for cid, m in zip(client_ids, mutaciones):
+        if not cid or len(cid) > 64:
+            resultados.append({"client_id": cid, "estado": "error", "error": "client_id inválido"})
+            continue
+        if cid in previas:
+            resultados.append({"client_id": cid, "estado": "duplicado", "id": previas[cid].server_id})
+            continue
+
+        entidad, op = m.get("entidad"), m.get("op", "create")
+        aplicar = APLICADORES.get((entidad, op))
+        if not aplicar:
+            resultados.append({"client_id": cid, "estado": "error", "error": f"Operación no soportada: {entidad}/{op}"})
+            continue
+        data = m.get("data") or {}
+        if not isinstance(data, dict):
+            # Error de esta mutación (el cliente la descarta), no un 500 que bloquee toda la cola
+            resultados.append({"client_id": cid, "estado": "error", "error": "'data' debe ser un objeto"})
+            continue
+
+        try:
+            server_id = aplicar(usuario, data)
+        except MutacionInvalida as e:
+            resultados.append({"client_id": cid, "estado": "error", "error": str(e)})
+            continue
+
+        registro = SyncMutacion(
+            client_id=cid, entidad=entidad, server_id=server_id,
+            usuario_id=usuario.id, empresa_id=usuario.empresa_id,
+        )
+        db.session.add(registro)
+        previas[cid] = registro
+        resultados.append({
+            "client_id": cid,
+            "estado": "creado" if op == "create" else "actualizado",
+            "id": server_id,
+        })
+
+    db.session.commit()
+    return resultados
+
+
+# ==============================
+# Sincronización delta
+# ==============================
+MAX_CAMBIOS_DELTA = 5000  # por sobre esto conviene reenviar todo
+
+
+def _serializar(obj) -> dict:
+    out = {}
+    for col in obj.__table__.columns:
+        v = getattr(obj, col.key)
+        out[col.key] = v.isoformat() if isinstance(v, (date, datetime)) else v
+    return out
+
+
+def _consultas_visibles(usuario) -> dict:
+    """Query por tabla con las filas que el técnico ve en su dashboard/mis_huertos/mis_bodegas."""
+    huertos_q = Huerto.query.filter_by(empresa_id=usuario.empresa_id, responsable_id=usuario.id)
+    huerto_ids = db.session.query(Huerto.id).filter_by(
+        empresa_id=usuario.empresa_id, responsable_id=usuario.id
+    )
+    asignadas = db.session.query(tecnico_bodega.c.bodega_id).filter(
+        tecnico_bodega.c.tecnico_id == usuario.id
+    )
+    bodegas_q = Bodega.query.filter(
+        Bodega.empresa_id == usuario.empresa_id,
+        or_(Bodega.responsable_id == usuario.id, Bodega.id.in_(asignadas)),
+    )
+    bodega_ids = bodegas_q.with_entities(Bodega.id)
+    return {
+        Huerto.__tablename__: (Huerto, huertos_q),
+        Bodega.__tablename__: (Bodega, bodegas_q),
+        Quimico.__tablename__: (Quimico, Quimico.query.filter(
+            Quimico.empresa_id == usuario.empresa_id, Quimico.bodega_id.in_(bodega_ids)
+        )),
+        ActividadHuerto.__tablename__: (ActividadHuerto, ActividadHuerto.query.filter(
+            ActividadHuerto.empresa_id == usuario.empresa_id,
+            ActividadHuerto.huerto_id.in_(huerto_ids),
+        )),
+        Recomendacion.__tablename__: (Recomendacion, Recomendacion.query.filter_by(
+            empresa_id=usuario.empresa_id, tecnico_id=usuario.id
+        )),
+    }
+
+
+def delta_soportado() -> bool:
+    """True si la BD de ``cambios`` de esta sesión confirma los ids en orden (solo SQLite)."""
+    return db.session.get_bind(mapper=Cambio.__mapper__).dialect.name == "sqlite"
+
+
+def cambios_desde(usuario, since: int | None) -> dict:
+    """
+    Devuelve ``{"token", "reset", "cambios": {tabla: {"upserts": [...], "deletes": [...]}}}``.
+
+    Con ``since`` vacío (o demasiados cambios acumulados) se envía el
+    conjunto completo con ``reset=True`` para que el cliente reemplace su réplica.
+
+    El token es el ``Cambio.id`` más alto, y eso solo sirve si los ids se
+    confirman en orden: en SQLite hay un único escritor, así que sí. En
+    PostgreSQL (``DATABASE_URL`` o shards ``schema:``) una transacción larga
+    puede confirmar un id menor después de que el cliente ya avanzó y ese
+    cambio se perdería; ahí no hay delta y siempre se envía todo
+    (``delta_soportado``).
+    Las filas que dejaron de ser visibles (p. ej. huerto reasignado) llegan como ``deletes``;
+    al reasignar un huerto o una bodega se registran también sus actividades o
+    químicos (hooks en ``app/models.py``), así el técnico nuevo los recibe y el
+    anterior los borra.
+    """
+    token = db.session.query(func.max(Cambio.id)).filter(
+        Cambio.empresa_id == usuario.empresa_id
+    ).scalar() or 0
+    visibles = _consultas_visibles(usuario)
+
+    pendientes = None
+    if since and delta_soportado():
+        pendientes = (
+            db.session.query(Cambio.entidad, Cambio.entidad_id, func.max(Cambio.id))
+            .filter(Cambio.empresa_id == usuario.empresa_id,
+                    Cambio.id > since, Cambio.id <= token)
+            .group_by(Cambio.entidad, Cambio.entidad_id)
+            .limit(MAX_CAMBIOS_DELTA + 1)
+            .all()
+        )
+        if len(pendientes) > MAX_CAMBIOS_DELTA:
+            pendientes = None
+
+    if pendientes is None:
+        return {
+            "token": token,
+            "reset": True,
+            "cambios": {
+                tabla: {"upserts": [_serializar(o) for o in q.all()], "deletes": []}
+                for tabla, (_, q) in visibles.items()
+            },
+        }
+
+    tocados = {}
+    for entidad, entidad_id, _ in pendientes:
+        if entidad in visibles:
+            tocados.setdefault(entidad, set()).add(entidad_id)
+
+    cambios = {}
+    for tabla, ids in tocados.items():
+        modelo, q = visibles[tabla]
+        filas = q.filter(modelo.id.in_(ids)).all()
+        presentes = {o.id for o in filas}
+        cambios[tabla] = {
+            "upserts": [_serializar(o) for o in filas],
+            "deletes": sorted(ids - presentes),
+        }
+    return {"token": token, "reset": False, "cambios": cambios}
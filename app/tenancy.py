@@ -0,0 +1,74 @@
+# app/tenancy.py
+"""
+Filtro automático por empresa (tenant).
+
+Con una empresa activa en el request (``load_tenant`` llama a ``activar`` con
+``g.empresa``), cada SELECT del ORM recibe ``with_loader_criteria`` sobre los
+modelos con ``TenantMixin``: ``empresa_id = <empresa>`` se agrega a la
+consulta principal, a joins, a ``selectinload``/``joinedload`` y a las cargas
+perezosas de relaciones. Así ninguna vista puede listar datos de otra empresa
+aunque olvide el ``filter_by(empresa_id=...)``, y las consultas usan el índice
+de ``empresa_id`` en vez de recorrer la tabla completa.
+
+Además, los objetos nuevos sin ``empresa_id`` la toman de la empresa activa.
+
+Fuera de un request (scripts, importadores) no se filtra nada. Para saltarse
+el filtro a propósito::
+
+    Huerto.query.todas_las_empresas().count()
+    db.session.execute(select(Huerto).execution_options(todas_las_empresas=True))
+"""
+from flask import g, has_request_context
+from flask_sqlalchemy.query import Query
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+
+from app.database import SesionEnrutada
+
+OPCION_SIN_FILTRO = "todas_las_empresas"
+
+
+class ConsultaTenant(Query):
+    """``Model.query`` con escape explícito del filtro por empresa."""
+
+    def todas_las_empresas(self):
+        return self.execution_options(**{OPCION_SIN_FILTRO: True})
+
+
+def activar(empresa):
+    """Activa el filtro para el resto del request (``empresa`` puede ser None)."""
+    g._tenant_id = empresa.id if empresa is not None else None
+
+
+def empresa_actual_id() -> int | None:
+    if not has_request_context():
+        return None
+    return g.get("_tenant_id")
+
+
+@event.listens_for(SesionEnrutada, "do_orm_execute")
+def _filtrar_por_empresa(estado):
+    if not estado.is_select or estado.is_column_load or estado.is_relationship_load:
+        return   # las cargas de columnas/relaciones heredan el criterio de la consulta original
+    if estado.execution_options.get(OPCION_SIN_FILTRO):
+        return
+    empresa_id = empresa_actual_id()
+    if empresa_id is None:
+        return
+    from app.models import TenantMixin
+
+    estado.statement = estado.statement.options(
+        with_loader_criteria(TenantMixin, lambda cls: cls.empresa_id == empresa_id, include_aliases=True)
+    )
+
+
+@event.listens_for(SesionEnrutada, "before_flush")
+def _completar_empresa(sesion, contexto, instancias):
+    empresa_id = empresa_actual_id()
+    if empresa_id is None:
+        return
+    from app.models import TenantMixin
+
+    for obj in sesion.new:
+        if isinstance(obj, TenantMixin) and getattr(obj, "empresa_id", None) is None:
+            obj.empresa_id = empresa_id
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Arranque en frío: importación por módulo, fases de create_app() y tiempo hasta el primer request
+#
+# Uso:
+#   python arranque.py                          (create_app() con config.py, calentar() y GET /login)
+#   python arranque.py --sin-calentar           (como el primer visitante tras un reinicio sin calentar)
+#   python arranque.py --ruta /admin/dashboard --top 30
+#   python arranque.py --repeticiones 5         (mediana de 5 procesos nuevos)
+#   python arranque.py --db sqlite:////ruta/agrocloud.db
+#
+# Cada corrida es un proceso nuevo con ``python -X importtime``, como un
+# worker recién levantado por Passenger o gunicorn.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from app import arranque
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+HIJO = """
+import json
+from app import create_app
+from app.arranque import calentar
+
+app = create_app()
+if {calentar}:
+    calentar(app)
+respuesta = app.test_client().get({ruta!r})
+print(json.dumps({{"estado": respuesta.status_code, **app.extensions["arranque"].resumen()}}))
+"""
+
+
+def correr(calentar: bool, ruta: str, db_url: str | None = None) -> tuple[dict, dict, float]:
+    env = {**os.environ, "DATABASE_URL": db_url} if db_url else None
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", HIJO.format(calentar=calentar, ruta=ruta)],
+        cwd=RAIZ, env=env, capture_output=True, text=True,
+    )
+    total_s = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        errores = [l for l in proceso.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError("\n".join(errores[-20:]))
+    resumen = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return resumen, arranque.leer_importtime(proceso.stderr), total_s
+
+
+def _mediana(resumenes, clave):
+    valores = [r[clave] for r in resumenes if r.get(clave) is not None]
+    return round(statistics.median(valores), 3) if valores else None
+
+
+def main(args):
+    resumenes, importaciones, totales = [], [], []
+    for i in range(args.repeticiones):
+        try:
+            resumen, modulos, total_s = correr(not args.sin_calentar, args.ruta, args.db)
+        except RuntimeError as e:
+            print(f"❌ El proceso de prueba falló:\n{e}")
+            return 1
+        resumenes.append(resumen)
+        importaciones.append(modulos)
+        totales.append(total_s)
+    modulos = arranque.combinar_importaciones(importaciones)
+
+    if args.json:
+        json.dump({"corridas": resumenes, "modulos": modulos}, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    print(f"🚀 === ARRANQUE ({args.repeticiones} procesos, "
+          f"{'sin calentar' if args.sin_calentar else 'con calentar()'}, primer request GET {args.ruta}) ===\n")
+    print(f"   importar app        {_mediana(resumenes, 'importacion_ms'):>8} ms")
+    print(f"   create_app()        {_mediana(resumenes, 'create_app_ms'):>8} ms")
+    for fase in resumenes[0]["fases"]:
+        print(f"      {fase:<20} {statistics.median(r['fases'][fase] for r in resumenes):>8} ms")
+    if not args.sin_calentar:
+        print(f"   calentar()          {_mediana(resumenes, 'calentamiento_ms'):>8} ms")
+    print(f"   primer request      {_mediana(resumenes, 'primer_request_ms'):>8} ms  (HTTP {resumenes[-1]['estado']})")
+    print(f"   ⏱️  listo a los       {_mediana(resumenes, 'listo_s'):>8} s del inicio del proceso "
+          f"(proceso completo {statistics.median(totales):.2f} s)")
+
+    print(f"\n📦 Importación por paquete (µs propios sumados, mediana por módulo)")
+    for paquete, propio, cuenta in arranque.por_paquete(modulos)[:args.top]:
+        print(f"   {propio / 1000:>8.1f} ms  {paquete}  ({cuenta} módulos)")
+
+    print(f"\n🐢 Módulos más caros (propio / acumulado)")
+    for nombre, (propio, acumulado) in sorted(modulos.items(), key=lambda m: m[1][0], reverse=True)[:args.top]:
+        print(f"   {propio / 1000:>8.1f} ms  {acumulado / 1000:>8.1f} ms  {nombre}")
+
+    propios = sorted(((n, v) for n, v in modulos.items() if n == "app" or n.startswith("app.")),
+                     key=lambda m: m[1][1], reverse=True)
+    print(f"\n🌱 Módulos de la app (propio / acumulado)")
+    for nombre, (propio, acumulado) in propios:
+        print(f"   {propio / 1000:>8.1f} ms  {acumulado / 1000:>8.1f} ms  {nombre}")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide el arranque en frío de la app en procesos nuevos")
+    parser.add_argument("--ruta", default="/login", help="ruta del primer request (GET, sin sesión)")
+    parser.add_argument("--sin-calentar", action="store_true", help="no llama a calentar() antes del primer request")
+    parser.add_argument("--db", help="URL de la base (por defecto la de config.py / DATABASE_URL)")
+    parser.add_argument("--repeticiones", type=int, default=3, help="procesos a medir (se informa la mediana)")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="salida JSON (corridas y módulos)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# Benchmarks de endpoints calientes (latencia p50/p95/p99 y consultas por request)
+#
+# Uso:
+#   python benchmark.py --salida bench/base.json                 (guarda una línea base)
+#   python benchmark.py --comparar bench/base.json                (falla si hay regresiones)
+#   python benchmark.py --perfil grande --repeticiones 50 --solo admin_dashboard
+#   python benchmark.py --con-cache --salida bench/cache.json  (mide con caché de la app, aparte)
+#
+# El dataset se genera con app/datagen.py y se cachea en instance/benchmarks/
+# Por defecto se mide sin caché de la app ni de fragmentos; --con-cache usa un
+# caché desechable junto al dataset (nunca instance/cache/app.db).
+
+import argparse
+import json
+import os
+import sys
+
+from app import benchmark
+from app.datagen import PARAMETROS_POR_DEFECTO, PERFILES
+
+DIRECTORIO_DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "benchmarks")
+
+
+def _imprimir_resultado(nombre, r):
+    alerta = "" if r["estados"] == [200] else f"  ⚠️ estados {r['estados']}"
+    print(f"   {nombre:<26} p50 {r['p50_ms']:>8.2f}  p95 {r['p95_ms']:>8.2f}  "
+          f"p99 {r['p99_ms']:>8.2f} ms  {r['consultas']:>4} consultas{alerta}")
+
+
+def main(args):
+    parametros = {**PARAMETROS_POR_DEFECTO, **PERFILES[args.perfil], "semilla": args.semilla}
+    os.makedirs(DIRECTORIO_DATASETS, exist_ok=True)
+    db_path = benchmark.ruta_dataset(DIRECTORIO_DATASETS, parametros)
+    if args.regenerar or not os.path.exists(db_path):
+        print(f"🧪 Generando dataset ({args.perfil}, semilla {args.semilla})...")
+    app = benchmark.crear_app_benchmark(db_path, regenerar=args.regenerar, parametros=parametros,
+                                        con_cache=args.con_cache)
+
+    modo = "CON caché" if args.con_cache else "sin caché"
+    print(f"\n⏱️  === BENCHMARKS ({args.repeticiones} repeticiones, {modo}) ===")
+    resultado = benchmark.ejecutar(app, args.repeticiones, args.solo, progreso=_imprimir_resultado)
+    resultado["meta"].update({"perfil": args.perfil, "dataset": parametros})
+
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.salida}")
+
+    if not args.comparar:
+        return 0
+
+    with open(args.comparar, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("meta", {}).get("dataset") != parametros:
+        print("\n⚠️  La línea base se midió con otro dataset; la comparación puede no ser válida")
+    if base.get("meta", {}).get("cache", False) != args.con_cache:
+        print("\n⚠️  La línea base se midió en otro modo de caché; la comparación no es válida")
+
+    filas = benchmark.comparar(resultado, base, args.tolerancia)
+    print(f"\n📊 === COMPARACIÓN con {args.comparar} (commit {base.get('meta', {}).get('commit')}) ===")
+    for f in filas:
+        marca = "❌" if f["regresion"] else "✅"
+        print(f"   {marca} {f['endpoint']:<26} p50 {f['p50_base']:>8.2f} → {f['p50']:>8.2f}  "
+              f"p95 {f['p95_base']:>8.2f} → {f['p95']:>8.2f}  "
+              f"consultas {f['consultas_base']} → {f['consultas']}  {'; '.join(f['motivos'])}")
+    regresiones = [f for f in filas if f["regresion"]]
+    print(f"\n{'❌' if regresiones else '✅'} {len(regresiones)} regresiones")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks de endpoints con comparación contra línea base")
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="mediano", help="tamaño del dataset")
+    parser.add_argument("--semilla", type=int, default=PARAMETROS_POR_DEFECTO["semilla"])
+    parser.add_argument("--regenerar", action="store_true", help="vuelve a generar el dataset")
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--solo", nargs="+", choices=sorted(benchmark.ESCENARIOS), help="solo estos endpoints")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--con-cache", action="store_true",
+                        help="mide con el caché de la app y de fragmentos (modo aparte, en JSON queda meta.cache)")
+    parser.add_argument("--comparar", help="JSON de línea base contra el cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=benchmark.TOLERANCIA_POR_DEFECTO,
+                        help="empeoramiento relativo de p50/p95 tolerado (0.2 = 20%%)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Throughput de escrituras concurrentes en SQLite según el perfil del motor (DB_PROFILE)
+#
+# Uso:
+#   python benchmark_escrituras.py                                   (ninguno vs produccion, 4 procesos)
+#   python benchmark_escrituras.py --perfiles ninguno desarrollo produccion --procesos 8 --escrituras 300
+#
+# Cada proceso imita a un worker de gunicorn: lee la bitácora de un huerto y registra
+# una actividad (un commit) en bucle, todos contra el mismo archivo.
+
+import argparse
+import json
+import os
+import sys
+
+from app import benchmark
+from app.database import PERFILES_SQLITE
+from app.datagen import PARAMETROS_POR_DEFECTO, PERFILES
+
+DIRECTORIO_DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "benchmarks")
+
+
+def main(args):
+    parametros = {**PARAMETROS_POR_DEFECTO, **PERFILES["chico"], "semilla": args.semilla}
+    os.makedirs(DIRECTORIO_DATASETS, exist_ok=True)
+    origen = benchmark.ruta_dataset(DIRECTORIO_DATASETS, parametros)
+    if not os.path.exists(origen):
+        print("🧪 Generando dataset (chico)...")
+    app = benchmark.crear_app_benchmark(origen, parametros=parametros)
+    from app.extensions import db
+    with app.app_context():
+        db.engine.dispose()   # cierra conexiones antes de copiar
+
+    print(f"✍️  {args.procesos} procesos × {args.escrituras} escrituras\n")
+    print(f"   {'perfil':<12} {'escr/s':>8} {'ok':>6} {'bloqueos':>9} {'p50':>8} {'p99':>8} ms")
+    resultados = []
+    for perfil in args.perfiles:
+        r = benchmark.medir_escrituras(origen, perfil, args.procesos, args.escrituras, DIRECTORIO_DATASETS)
+        resultados.append(r)
+        print(f"   {perfil:<12} {r['escrituras_por_s']:>8.1f} {r['escrituras_ok']:>6} {r['bloqueos']:>9} "
+              f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\n💾 Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara perfiles de SQLite con escritores concurrentes")
+    parser.add_argument("--perfiles", nargs="+", choices=sorted(PERFILES_SQLITE), default=["ninguno", "produccion"])
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--escrituras", type=int, default=200, help="escrituras por proceso")
+    parser.add_argument("--semilla", type=int, default=PARAMETROS_POR_DEFECTO["semilla"])
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    sys.exit(main(parser.parse_args()))
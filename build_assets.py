@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# Genera app/static/dist: archivos con hash en el nombre, .gz/.br y variantes WebP.
+# Ejecutar en cada deploy (antes de reiniciar la app) para que url_for('static') los use.
+
+import os
+
+from app import assets
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "static")
+
+
+def build_assets():
+    manifest = assets.construir_dist(STATIC_FOLDER)
+    dist = os.path.join(STATIC_FOLDER, assets.DIST_DIR)
+
+    comprimidos = sum(
+        1 for _, _, archivos in os.walk(dist) for n in archivos if n.endswith((".gz", ".br"))
+    )
+    webp = sum(len(v) for v in manifest["webp"].values())
+    print(f"✅ {len(manifest['archivos'])} archivos con hash en {dist}")
+    print(f"   {comprimidos} precomprimidos, {webp} variantes WebP")
+    print(f"   se conservan los archivos de los últimos {assets.DIST_BUILDS_CONSERVADOS} builds "
+          f"(workers aún con el manifest anterior)")
+    if assets.brotli is None:
+        print("⚠️  Sin 'brotli' instalado: solo se generó .gz")
+    if assets.Image is None:
+        print("⚠️  Sin 'Pillow' instalado: no se generaron variantes WebP")
+
+
+if __name__ == '__main__':
+    build_assets()
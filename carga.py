@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Prueba de carga concurrente (técnicos y admins) contra gunicorn en localhost
+#
+# Uso:
+#   python carga.py --workers 1 2 4 --tecnicos 20 --admins 4 --duracion 60
+#   python carga.py --workers 2 --prob-sse 0.5 --sse-segundos 30   (reproduce agotamiento de workers)
+#   python carga.py --salida bench/carga.json
+#
+# Sin gunicorn instalado se usa el servidor de werkzeug con N procesos (aproximación).
+
+import argparse
+import json
+import os
+import sys
+
+from app import benchmark, carga
+from app.datagen import CLAVE_DEMO, PARAMETROS_POR_DEFECTO, PERFILES
+
+DIRECTORIO_DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "benchmarks")
+
+
+def _imprimir(workers, servidor, r):
+    t = r["total"]
+    print(f"\n🚦 === {workers} worker(s) · {servidor} ===")
+    print(f"   {'endpoint':<26} {'req':>6} {'req/s':>7} {'error%':>7} {'p50':>8} {'p95':>8} {'p99':>8} ms")
+    for nombre, f in r["endpoints"].items():
+        alerta = " ⚠️" if f["tasa_error"] > 0 else ""
+        print(f"   {nombre:<26} {f['requests']:>6} {f['rps']:>7.1f} {f['tasa_error'] * 100:>6.1f}% "
+              f"{f['p50_ms']:>8.1f} {f['p95_ms']:>8.1f} {f['p99_ms']:>8.1f}{alerta}")
+    print(f"   {'TOTAL':<26} {t['requests']:>6} {t['rps']:>7.1f} {t['tasa_error'] * 100:>6.1f}% "
+          f"{'':>8} {t['p95_ms']:>8.1f} {t['p99_ms']:>8.1f}")
+
+
+def main(args):
+    parametros = {**PARAMETROS_POR_DEFECTO, **PERFILES[args.perfil], "semilla": args.semilla}
+    os.makedirs(DIRECTORIO_DATASETS, exist_ok=True)
+    db_path = benchmark.ruta_dataset(DIRECTORIO_DATASETS, parametros)
+    if not os.path.exists(db_path):
+        print(f"🧪 Generando dataset ({args.perfil}, semilla {args.semilla})...")
+    app = benchmark.crear_app_benchmark(db_path, parametros=parametros)
+    cuentas = carga.cuentas_de_prueba(app)
+    uploads = os.path.join(DIRECTORIO_DATASETS, "uploads-carga")
+
+    opciones = {
+        "clave": CLAVE_DEMO, "pensar_s": args.pensar, "prob_subida": args.prob_subida,
+        "prob_sse": args.prob_sse, "sse_segundos": args.sse_segundos, "rampa_s": args.rampa,
+    }
+    print(f"👥 {args.tecnicos} técnicos + {args.admins} admins virtuales · {args.duracion:.0f}s por corrida")
+
+    corridas = []
+    for workers in args.workers:
+        with carga.Servidor(db_path, workers, uploads, args.servidor) as servidor:
+            resultado = carga.correr(servidor.url, cuentas, args.tecnicos, args.admins,
+                                     args.duracion, opciones, semilla=args.semilla)
+        _imprimir(workers, servidor.tipo, resultado)
+        corridas.append({"workers": workers, "servidor": servidor.tipo, **resultado})
+
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": {**vars(args), "dataset": parametros}, "corridas": corridas},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones de técnicos y admins")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="workers por corrida")
+    parser.add_argument("--servidor", choices=["auto", "gunicorn", "werkzeug"], default="auto")
+    parser.add_argument("--tecnicos", type=int, default=10, help="técnicos virtuales concurrentes")
+    parser.add_argument("--admins", type=int, default=2, help="admins virtuales concurrentes")
+    parser.add_argument("--duracion", type=float, default=30, help="segundos por corrida")
+    parser.add_argument("--rampa", type=float, default=2, help="segundos para arrancar todos los usuarios")
+    parser.add_argument("--pensar", type=float, default=0.5, help="pausa media entre pasos (s)")
+    parser.add_argument("--prob-subida", type=float, default=0.2, help="probabilidad de subir un documento por vuelta")
+    parser.add_argument("--prob-sse", type=float, default=0.2, help="probabilidad de abrir el SSE por vuelta")
+    parser.add_argument("--sse-segundos", type=float, default=10, help="tiempo que se mantiene abierto el SSE")
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="chico", help="tamaño del dataset")
+    parser.add_argument("--semilla", type=int, default=PARAMETROS_POR_DEFECTO["semilla"])
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    sys.exit(main(parser.parse_args()))
@@ -6,11 +6,72 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'clave-secreta')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///agrocloud.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Perfil del motor (app/database.py): "produccion" | "desarrollo" | "pruebas" | "ninguno"
+    DB_PROFILE = os.environ.get('DB_PROFILE', 'produccion')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    # Pool para PostgreSQL / MySQL (se ignora con SQLite)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+
+    # Lecturas de vistas @solo_lectura: réplica (DB_READ_URL) o, con SQLite, conexión mode=ro al mismo archivo
+    DB_READ_URL = os.environ.get('DB_READ_URL') or None
+    DB_READ_SQLITE_RO = os.environ.get('DB_READ_SQLITE_RO', '0') == '1'
+    DB_READ_RYW_SEGUNDOS = int(os.environ.get('DB_READ_RYW_SEGUNDOS', '5'))  # tras escribir, leer del primario
+
+    # Shards por empresa (app/shards.py): "nombre=sqlite:////ruta/shard.db;otro=schema:tenant_x"
+    DB_SHARDS = os.environ.get('DB_SHARDS', '')
+    # Al mover una empresa, espera tras bloquear sus escrituras: al menos el timeout de un request (gunicorn: 30)
+    SHARD_ESPERA_SEGUNDOS = float(os.environ.get('SHARD_ESPERA_SEGUNDOS', '30'))
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads', 'audios')
     
 
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "instance", "uploads", "docs")
     MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20MB
     ALLOWED_DOC_EXT = {"pdf", "png", "jpg", "jpeg", "doc", "docx", "xlsx"}
+
+    # Service worker: tamaño máximo de un asset para entrar al precache
+    PRECACHE_MAX_BYTES = 1024 * 1024
+
+    # Usa los nombres con hash de static/dist (generados por build_assets.py) si existen
+    STATIC_FINGERPRINT = os.environ.get("STATIC_FINGERPRINT", "1") == "1"
     
 
+    # Bytecode de plantillas Jinja (app/plantillas.py): por defecto instance/jinja_cache; "" = sin caché
+    TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR")
+
+    # Caché de la app (app/cache.py): "sqlite" (compartido entre workers) | "lru" (un proceso) | "redis" | "" (sin caché)
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "sqlite")
+    CACHE_PATH = os.environ.get("CACHE_PATH") or None          # por defecto instance/cache/app.db
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_MAX_ENTRADAS = int(os.environ.get("CACHE_MAX_ENTRADAS", "5000"))   # solo "lru"
+    CACHE_TTL = int(os.environ.get("CACHE_TTL", "300"))         # segundos, si memoize no indica otro
+    CACHE_ESPERA_SEGUNDOS = float(os.environ.get("CACHE_ESPERA_SEGUNDOS", "2"))  # espera a otro proceso que ya calcula
+
+    # Fragmentos {% cache %} (app/fragmentos.py), guardados en el caché de la app; "0" los desactiva
+    FRAGMENT_CACHE = os.environ.get("FRAGMENT_CACHE", "1") == "1"
+
+    # Perfilado por request (Server-Timing + /admin/profiling). Con muestreo es apto para producción
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+    PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0.05"))
+    PROFILING_SERVER_TIMING = True
+
+    # Consultas lentas (app/slowlog.py): JSON por línea en instance/logs/ con rotación; 0 = desactivado
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "500"))
+    SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG") or None
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    SLOW_QUERY_LOG_RESPALDOS = int(os.environ.get("SLOW_QUERY_LOG_RESPALDOS", "5"))
+
+    # Métricas Prometheus en /metrics (app/metricas.py); sin token no se miden ni se exponen
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+    METRICS_DIR = os.environ.get("METRICS_DIR")            # por defecto instance/metrics; "" = solo este proceso
+    METRICS_FLUSH_SEGUNDOS = float(os.environ.get("METRICS_FLUSH_SEGUNDOS", "5"))
+
+    # Arranque (app/arranque.py): Flask-Migrate se importa solo en la CLI o al usarse (shards.py)
+    LAZY_MIGRATE = os.environ.get("LAZY_MIGRATE", "1") == "1"
+
+    # Detector de N+1 por request ("warn" | "raise"); solo para desarrollo
+    NPLUS1_DETECT = os.environ.get("NPLUS1_DETECT") or None
+    NPLUS1_UMBRAL = int(os.environ.get("NPLUS1_UMBRAL", "5"))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Resumen del registro de consultas lentas (ver app/slowlog.py), agrupado por forma de la sentencia
+#
+# Uso:
+#   python consultas_lentas.py                                   (instance/logs/consultas_lentas.jsonl + rotados)
+#   python consultas_lentas.py --desde 2026-10-19 --empresa 3
+#   python consultas_lentas.py --endpoint admin.admin_dashboard --orden p95 --detalle
+#   python consultas_lentas.py --archivo /var/log/agrodesk/lentas.jsonl --json > resumen.json
+
+import argparse
+import json
+import os
+import sys
+
+from app import slowlog
+
+RUTA_POR_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "logs", "consultas_lentas.jsonl")
+ORDENES = {"total": "total_ms", "p95": "p95_ms", "max": "max_ms", "veces": "veces"}
+
+
+def main(args):
+    rutas = slowlog.archivos_del_log(args.archivo)
+    if not rutas:
+        print(f"❌ No hay registro en {args.archivo}")
+        return 1
+
+    filas = slowlog.agregar(slowlog.leer_entradas(rutas, args.desde, args.empresa, args.endpoint))
+    filas.sort(key=lambda f: f[ORDENES[args.orden]], reverse=True)
+    filas = filas[:args.top]
+    if args.json:
+        json.dump(filas, sys.stdout, indent=2, ensure_ascii=False, default=str)
+        print()
+        return 0
+
+    total = sum(f["veces"] for f in filas)
+    print(f"🐢 === CONSULTAS LENTAS ({len(rutas)} archivos, {total} registros en las {len(filas)} formas mostradas) ===\n")
+    for f in filas:
+        print(f"   {f['huella']}  ×{f['veces']:<5} total {f['total_ms']:>10.1f} ms  "
+              f"p50 {f['p50_ms']:>8.1f}  p95 {f['p95_ms']:>8.1f}  máx {f['max_ms']:>8.1f}")
+        print(f"      {f['forma'][:160]}")
+        print(f"      endpoints: {', '.join(f'{e} ×{n}' for e, n in f['endpoints'])}")
+        if f["empresas"]:
+            print(f"      empresas:  {', '.join(f'{e} ×{n}' for e, n in f['empresas'])}")
+        if args.detalle:
+            ejemplo = f["ejemplo"]
+            print(f"      peor caso {ejemplo['ts']} ({ejemplo['ms']} ms) params {json.dumps(ejemplo['params'], ensure_ascii=False, default=str)[:200]}")
+            for frame in ejemplo["pila"] or []:
+                print(f"         {frame}")
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Agrega el registro de consultas lentas por huella de la sentencia")
+    parser.add_argument("--archivo", default=RUTA_POR_DEFECTO, help="registro JSON lines (incluye sus rotados .1, .2...)")
+    parser.add_argument("--desde", help="solo registros desde esta fecha/hora ISO (2026-10-19 o 2026-10-19T08:00)")
+    parser.add_argument("--empresa", type=int, help="solo esta empresa_id")
+    parser.add_argument("--endpoint", help="solo este endpoint (p. ej. admin.admin_dashboard)")
+    parser.add_argument("--orden", choices=sorted(ORDENES), default="total", help="criterio de orden")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--detalle", action="store_true", help="muestra parámetros y pila del peor caso")
+    parser.add_argument("--json", action="store_true", help="salida JSON")
+    sys.exit(main(parser.parse_args()))
@@ -4,7 +4,7 @@
 from app import create_app
 from app.extensions import db
 from app.models import User, Empresa
-from werkzeug.security import generate_password_hash
+from app.importers.usuarios import provisionar_usuarios
 
 def create_admins():
     app = create_app()
@@ -38,23 +38,8 @@ def create_admins():
             ]
             
             print('\n=== CREANDO 3 PERFILES DE ADMINISTRADORES ===')
-            for i, admin_data in enumerate(admins_data, 1):
-                # Verificar si ya existe
-                existente = User.query.filter_by(email=admin_data['email']).first()
-                if existente:
-                    print(f'{i}. ❌ Usuario ya existe: {admin_data["email"]}')
-                    continue
-                    
-                nuevo_admin = User(
-                    name=admin_data['name'],
-                    email=admin_data['email'],
-                    password=generate_password_hash(admin_data['password']),
-                    role=admin_data['role'],
-                    empresa_id=empresa_chs.id
-                )
-                
-                db.session.add(nuevo_admin)
-                print(f'{i}. ✅ Administrador creado: {admin_data["name"]} - {admin_data["email"]}')
+            res = provisionar_usuarios(admins_data, empresa_chs.id, rol_por_defecto='admin')
+            print(f'   {res.resumen()}')
             
             try:
                 db.session.commit()
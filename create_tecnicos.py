@@ -3,8 +3,8 @@
 
 from app import create_app
 from app.extensions import db
-from app.models import User, Empresa
-from werkzeug.security import generate_password_hash
+from app.models import Empresa
+from app.importers.usuarios import provisionar_usuarios
 
 def create_tecnicos():
     app = create_app()
@@ -44,23 +44,8 @@ def create_tecnicos():
             ]
             
             print('\n=== CREANDO 4 PERFILES DE TÉCNICOS ===')
-            for i, tecnico_data in enumerate(tecnicos_data, 1):
-                # Verificar si ya existe
-                existente = User.query.filter_by(email=tecnico_data['email']).first()
-                if existente:
-                    print(f'{i}. ❌ Usuario ya existe: {tecnico_data["email"]}')
-                    continue
-                    
-                nuevo_tecnico = User(
-                    name=tecnico_data['name'],
-                    email=tecnico_data['email'],
-                    password=generate_password_hash(tecnico_data['password']),
-                    role=tecnico_data['role'],
-                    empresa_id=empresa_chs.id
-                )
-                
-                db.session.add(nuevo_tecnico)
-                print(f'{i}. ✅ Técnico creado: {tecnico_data["name"]} - {tecnico_data["email"]}')
+            res = provisionar_usuarios(tecnicos_data, empresa_chs.id, rol_por_defecto='tecnico')
+            print(f'   {res.resumen()}')
             
             try:
                 db.session.commit()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Genera datos sintéticos multi-empresa para pruebas de carga y benchmarks
+#
+# Uso:
+#   python generar_datos.py --perfil chico --reset
+#   python generar_datos.py --empresas 3 --tecnicos 20 --huertos 25 --semilla 7
+#
+# Todos los usuarios quedan con la clave "demo123" (admin1@demo-<semilla>-001.example.com, ...)
+
+import argparse
+import sys
+import time
+
+from app import create_app
+from app.datagen import PARAMETROS_POR_DEFECTO, PERFILES, CLAVE_DEMO, generar_datos
+from app.extensions import db
+from app import search
+
+
+def main(parametros, reset=False):
+    app = create_app()
+    with app.app_context():
+        if reset:
+            db.drop_all()
+            db.create_all()
+            print("🗑️  Base de datos recreada")
+
+        inicio = time.perf_counter()
+        try:
+            conteos = generar_datos(**parametros)
+        except ValueError as e:
+            db.session.rollback()
+            print(f"❌ {e}")
+            return 1
+
+        # Los INSERT masivos no pasan por los hooks del índice de búsqueda
+        if search.ensure_search_index(backfill=False):
+            indexados = search.reindexar_todo()
+            print(f"🔍 Índice de búsqueda reconstruido ({indexados} documentos)")
+
+        print("\n📊 === FILAS GENERADAS ===")
+        for tabla, n in conteos.items():
+            print(f"   {tabla:<24} {n:>8}")
+        print(f"\n⏱️  {time.perf_counter() - inicio:.2f}s · semilla {parametros['semilla']} · clave {CLAVE_DEMO!r}")
+        return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos reproducibles")
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="mediano",
+                        help="tamaño base; los demás argumentos lo sobreescriben")
+    parser.add_argument("--reset", action="store_true", help="borra y recrea todas las tablas antes")
+    for nombre, valor in PARAMETROS_POR_DEFECTO.items():
+        parser.add_argument(f"--{nombre.replace('_', '-')}", type=int, dest=nombre)
+    args = vars(parser.parse_args())
+
+    parametros = {**PARAMETROS_POR_DEFECTO, **PERFILES[args.pop("perfil")]}
+    reset = args.pop("reset")
+    parametros.update({k: v for k, v in args.items() if v is not None})
+    sys.exit(main(parametros, reset))
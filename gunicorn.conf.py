@@ -0,0 +1,8 @@
+# gunicorn.conf.py
+# gunicorn lo lee solo desde el directorio de trabajo (o con -c gunicorn.conf.py)
+
+
+def post_worker_init(worker):
+    # Cada worker calienta su app (mappers, plantillas, conexiones) antes de aceptar requests
+    from app.arranque import calentar
+    calentar(worker.wsgi)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Importa productores y sus huertos desde los CSV <tecnico>_clientes.csv
+#
+# Uso:
+#   python importar_clientes.py manuel_vergara_clientes.csv [--tecnico-email x@chs.cl]
+#   python importar_clientes.py . --workers 4          (todos los *_clientes.csv del directorio)
+#   python importar_clientes.py . --dry-run
+
+import argparse
+import os
+import sys
+import time
+
+from app import create_app, shards
+from app.importers import clientes_csv
+from app.importers.excel import EMPRESA_POR_DEFECTO
+from app.models import Empresa, User
+
+
+def _importar(rutas, empresa, tecnico_email, workers, dry_run):
+    tecnico = None
+    if tecnico_email:
+        tecnico = User.query.filter_by(empresa_id=empresa.id, email=tecnico_email.lower()).first()
+        if not tecnico:
+            return None
+
+    resultados = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            resultados += clientes_csv.importar_directorio(
+                ruta, empresa.id, workers=workers, dry_run=dry_run
+            )
+        else:
+            resultados += clientes_csv.importar_archivo(
+                ruta, empresa.id, tecnico=tecnico, dry_run=dry_run
+            )
+    return resultados
+
+
+def importar_clientes(rutas, empresa_slug=EMPRESA_POR_DEFECTO, tecnico_email=None,
+                      workers=None, dry_run=False):
+    app = create_app()
+    with app.app_context():
+        empresa = Empresa.query.filter_by(slug=empresa_slug).first()
+        if not empresa:
+            print(f"❌ No se encontró la empresa {empresa_slug!r}")
+            return 1
+
+        inicio = time.perf_counter()
+        try:
+            with shards.enlazar(empresa):     # empresa con shard propio: se lee e importa en su BD
+                resultados = _importar(rutas, empresa, tecnico_email, workers, dry_run)
+        except shards.ErrorShard as e:
+            print(f"❌ {e}")
+            return 1
+        if resultados is None:
+            print(f"❌ No se encontró el técnico {tecnico_email}")
+            return 1
+
+        print("\n📊 === RESUMEN ===")
+        for r in resultados:
+            print(f"   {r.resumen()}")
+            for linea, mensaje in r.errores:
+                print(f"      ❌ línea {linea}: {mensaje}")
+        print(f"\n⏱️  {time.perf_counter() - inicio:.2f}s")
+        if dry_run:
+            print("🔎 Dry-run: no se guardó ningún cambio")
+        return 1 if any(r.errores for r in resultados) else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Importa *_clientes.csv (productores y huertos)")
+    parser.add_argument("rutas", nargs="+", help="archivos CSV o directorios")
+    parser.add_argument("--empresa", default=EMPRESA_POR_DEFECTO, help="slug de la empresa destino")
+    parser.add_argument("--tecnico-email", help="técnico responsable (por defecto, el del nombre del archivo)")
+    parser.add_argument("--workers", type=int, help="procesos para leer archivos en paralelo")
+    parser.add_argument("--dry-run", action="store_true", help="valida e informa sin guardar")
+    args = parser.parse_args()
+    sys.exit(importar_clientes(args.rutas, args.empresa, args.tecnico_email, args.workers, args.dry_run))
@@ -96,7 +96,14 @@ def run_migrations_online():
 
     connectable = get_engine()
 
+    # Shards en schemas de PostgreSQL (app/shards.py): migrar dentro del schema indicado
+    schema = current_app.config.get("ALEMBIC_SCHEMA")
+    if schema:
+        conf_args.setdefault("version_table_schema", schema)
+
     with connectable.connect() as connection:
+        if schema:
+            connection = connection.execution_options(schema_translate_map={None: schema})
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
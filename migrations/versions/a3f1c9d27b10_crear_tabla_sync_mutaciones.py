@@ -0,0 +1,41 @@
+"""Crear tabla sync_mutaciones
+
+Revision ID: a3f1c9d27b10
+Revises: 4da08c835930
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9d27b10'
+down_revision = '4da08c835930'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_mutaciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.String(length=64), nullable=False),
+    sa.Column('entidad', sa.String(length=40), nullable=False),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('empresa_id', 'client_id', name='uq_sync_mutacion_empresa_client')
+    )
+    with op.batch_alter_table('sync_mutaciones', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sync_mutaciones_empresa_id'), ['empresa_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sync_mutaciones', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sync_mutaciones_empresa_id'))
+
+    op.drop_table('sync_mutaciones')
@@ -0,0 +1,39 @@
+"""Crear tabla cambios
+
+Revision ID: c52e8b6a0f31
+Revises: a3f1c9d27b10
+Create Date: 2026-10-19 11:02:17.640913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e8b6a0f31'
+down_revision = 'a3f1c9d27b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cambios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('entidad', sa.String(length=40), nullable=False),
+    sa.Column('entidad_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    with op.batch_alter_table('cambios', schema=None) as batch_op:
+        batch_op.create_index('ix_cambios_empresa_id_id', ['empresa_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cambios', schema=None) as batch_op:
+        batch_op.drop_index('ix_cambios_empresa_id_id')
+
+    op.drop_table('cambios')
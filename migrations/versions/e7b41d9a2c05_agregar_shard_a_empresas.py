@@ -0,0 +1,28 @@
+"""Agregar shard a empresas
+
+Revision ID: e7b41d9a2c05
+Revises: c52e8b6a0f31
+Create Date: 2026-10-19 16:40:05.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b41d9a2c05'
+down_revision = 'c52e8b6a0f31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('empresas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('shard_bloqueado', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('empresas', schema=None) as batch_op:
+        batch_op.drop_column('shard_bloqueado')
+        batch_op.drop_column('shard')
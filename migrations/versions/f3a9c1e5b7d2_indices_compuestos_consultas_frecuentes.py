@@ -0,0 +1,104 @@
+"""Indices compuestos para consultas frecuentes
+
+Revision ID: f3a9c1e5b7d2
+Revises: e7b41d9a2c05
+Create Date: 2026-10-19 18:12:44.903617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1e5b7d2'
+down_revision = 'e7b41d9a2c05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_empresa_id_role_created_by_name', ['empresa_id', 'role', 'created_by', 'name'], unique=False)
+
+    with op.batch_alter_table('huertos', schema=None) as batch_op:
+        batch_op.create_index('ix_huertos_empresa_id_nombre', ['empresa_id', 'nombre'], unique=False)
+        batch_op.create_index('ix_huertos_empresa_id_responsable_id_nombre', ['empresa_id', 'responsable_id', 'nombre'], unique=False)
+        batch_op.create_index('ix_huertos_responsable_id', ['responsable_id'], unique=False)
+
+    with op.batch_alter_table('bodegas', schema=None) as batch_op:
+        batch_op.create_index('ix_bodegas_empresa_id_nombre', ['empresa_id', 'nombre'], unique=False)
+        batch_op.create_index('ix_bodegas_empresa_id_responsable_id_nombre', ['empresa_id', 'responsable_id', 'nombre'], unique=False)
+        batch_op.create_index('ix_bodegas_huerto_id', ['huerto_id'], unique=False)
+
+    with op.batch_alter_table('quimicos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_quimicos_bodega_id'), ['bodega_id'], unique=False)
+
+    with op.batch_alter_table('actividad_huerto', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_actividad_huerto_huerto_id'))
+        batch_op.create_index('ix_actividad_huerto_huerto_id_fecha', ['huerto_id', 'fecha'], unique=False)
+
+    with op.batch_alter_table('movimientos_inventario', schema=None) as batch_op:
+        batch_op.create_index('ix_movimientos_inventario_quimico_id_fecha', ['quimico_id', 'fecha'], unique=False)
+
+    with op.batch_alter_table('recomendacion', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recomendacion_huerto_id'))
+        batch_op.drop_index(batch_op.f('ix_recomendacion_tecnico_id'))
+        batch_op.create_index('ix_recomendacion_huerto_id_fecha', ['huerto_id', 'fecha'], unique=False)
+        batch_op.create_index('ix_recomendacion_tecnico_id_fecha', ['tecnico_id', 'fecha'], unique=False)
+
+    with op.batch_alter_table('parcelas', schema=None) as batch_op:
+        batch_op.create_index('ix_parcelas_empresa_id_huerto_id_nombre', ['empresa_id', 'huerto_id', 'nombre'], unique=False)
+        batch_op.create_index('ix_parcelas_empresa_id_nombre', ['empresa_id', 'nombre'], unique=False)
+        batch_op.create_index('ix_parcelas_huerto_id', ['huerto_id'], unique=False)
+
+    with op.batch_alter_table('actividades_campo', schema=None) as batch_op:
+        batch_op.create_index('ix_actividades_campo_empresa_id_fecha', ['empresa_id', 'fecha'], unique=False)
+        batch_op.create_index('ix_actividades_campo_huerto_id_fecha', ['huerto_id', 'fecha'], unique=False)
+
+    with op.batch_alter_table('documentos', schema=None) as batch_op:
+        batch_op.create_index('ix_documentos_empresa_id_created_at', ['empresa_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_documentos_empresa_id_huerto_id_created_at', ['empresa_id', 'huerto_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documentos', schema=None) as batch_op:
+        batch_op.drop_index('ix_documentos_empresa_id_huerto_id_created_at')
+        batch_op.drop_index('ix_documentos_empresa_id_created_at')
+
+    with op.batch_alter_table('actividades_campo', schema=None) as batch_op:
+        batch_op.drop_index('ix_actividades_campo_huerto_id_fecha')
+        batch_op.drop_index('ix_actividades_campo_empresa_id_fecha')
+
+    with op.batch_alter_table('parcelas', schema=None) as batch_op:
+        batch_op.drop_index('ix_parcelas_huerto_id')
+        batch_op.drop_index('ix_parcelas_empresa_id_nombre')
+        batch_op.drop_index('ix_parcelas_empresa_id_huerto_id_nombre')
+
+    with op.batch_alter_table('recomendacion', schema=None) as batch_op:
+        batch_op.drop_index('ix_recomendacion_tecnico_id_fecha')
+        batch_op.drop_index('ix_recomendacion_huerto_id_fecha')
+        batch_op.create_index(batch_op.f('ix_recomendacion_tecnico_id'), ['tecnico_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_recomendacion_huerto_id'), ['huerto_id'], unique=False)
+
+    with op.batch_alter_table('movimientos_inventario', schema=None) as batch_op:
+        batch_op.drop_index('ix_movimientos_inventario_quimico_id_fecha')
+
+    with op.batch_alter_table('actividad_huerto', schema=None) as batch_op:
+        batch_op.drop_index('ix_actividad_huerto_huerto_id_fecha')
+        batch_op.create_index(batch_op.f('ix_actividad_huerto_huerto_id'), ['huerto_id'], unique=False)
+
+    with op.batch_alter_table('quimicos', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_quimicos_bodega_id'))
+
+    with op.batch_alter_table('bodegas', schema=None) as batch_op:
+        batch_op.drop_index('ix_bodegas_huerto_id')
+        batch_op.drop_index('ix_bodegas_empresa_id_responsable_id_nombre')
+        batch_op.drop_index('ix_bodegas_empresa_id_nombre')
+
+    with op.batch_alter_table('huertos', schema=None) as batch_op:
+        batch_op.drop_index('ix_huertos_responsable_id')
+        batch_op.drop_index('ix_huertos_empresa_id_responsable_id_nombre')
+        batch_op.drop_index('ix_huertos_empresa_id_nombre')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_empresa_id_role_created_by_name')
@@ -20,4 +20,8 @@ application = create_app()
 if not application.logger.handlers:
     application.logger.addHandler(handler)
 application.logger.setLevel(logging.INFO)
+
+# Mappers, plantillas, conexiones y SQL de cada request listos antes del primer visitante
+from app.arranque import calentar
+calentar(application)
 application.logger.info("Passenger levantó AgroDesk")
\ No newline at end of file
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# Precompila las plantillas Jinja al caché de bytecode compartido (ver app/plantillas.py).
+# Ejecutar en cada deploy (junto con build_assets.py), antes de reiniciar la app: los
+# workers cargan el bytecode en vez de compilar cada plantilla en su primer uso.
+#
+# Uso:
+#   python precompilar_plantillas.py
+#   python precompilar_plantillas.py --limpiar      (vacía el caché antes: quita plantillas eliminadas)
+#
+# Sale con código 1 si alguna plantilla no compila.
+
+import argparse
+import sys
+
+from app import create_app, plantillas
+
+
+def main(args):
+    app = create_app()
+    try:
+        r = plantillas.precompilar(app, limpiar=args.limpiar)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ {r['plantillas'] - len(r['errores'])} de {r['plantillas']} plantillas en {r['directorio']}")
+    print(f"   {r['archivos']} archivos, {r['bytes'] / 1024:.0f} KB")
+    print(f"   compilar desde la fuente: {r['compilar_ms']:.0f} ms · cargar desde el caché: {r['desde_cache_ms']:.0f} ms")
+    for nombre, error in r["errores"].items():
+        print(f"❌ {nombre}: {error}")
+    return 1 if r["errores"] else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compila las plantillas Jinja al caché de bytecode")
+    parser.add_argument("--limpiar", action="store_true", help="vacía el caché antes de compilar")
+    sys.exit(main(parser.parse_args()))
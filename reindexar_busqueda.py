@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# Reconstruye el índice de búsqueda full-text (bitácoras, recomendaciones, documentos)
+
+from app import create_app
+from app import search
+
+
+def reindexar_busqueda():
+    app = create_app()
+    with app.app_context():
+        if not search.ensure_search_index(backfill=False):
+            print("❌ El índice full-text solo está disponible con SQLite (FTS5)")
+            return
+        total = search.reindexar_todo()
+        print(f"✅ Índice reconstruido: {total} entradas")
+
+
+if __name__ == '__main__':
+    reindexar_busqueda()
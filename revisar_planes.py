@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Regresiones de planes de consulta: recorridos completos (SCAN) y ordenamientos temporales
+#
+# Uso:
+#   python revisar_planes.py                          (compara contra bench/planes_base.json)
+#   python revisar_planes.py --guardar                (acepta el estado actual como línea base)
+#   python revisar_planes.py --base otra.json --planes
+#
+# Registra cada SELECT distinto que emiten los escenarios de benchmark.py y las
+# consultas de verificar_indices.py, le corre EXPLAIN QUERY PLAN (EXPLAIN en
+# PostgreSQL) y sale con código 1 si aparece una sentencia con hallazgos que
+# la línea base no tiene. La línea base se versiona junto al código.
+
+import argparse
+import json
+import os
+import sys
+
+from app import benchmark, planes
+from app.datagen import PARAMETROS_POR_DEFECTO, PERFILES
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_DATASETS = os.path.join(RAIZ, "instance", "benchmarks")
+BASE_POR_DEFECTO = os.path.join(RAIZ, "bench", "planes_base.json")
+
+
+def _imprimir_fila(f, con_plan, plan):
+    marca = {"nueva": "❌", "peor": "❌", "resuelta": "🎉", "igual": "  "}[f["estado"]]
+    detalle = ", ".join(f["nuevos"] if f["regresion"] else f["hallazgos"] or f["hallazgos_base"])
+    print(f"   {marca} {f['estado']:<8} {f['huella']}  {detalle}  ← {', '.join(f['origenes'])}")
+    if f["regresion"] or con_plan:
+        print(f"         {f['sql'][:200]}")
+        for linea in plan or []:
+            print(f"            {linea}")
+
+
+def main(args):
+    parametros = {**PARAMETROS_POR_DEFECTO, **PERFILES[args.perfil], "semilla": args.semilla}
+    os.makedirs(DIRECTORIO_DATASETS, exist_ok=True)
+    db_path = benchmark.ruta_dataset(DIRECTORIO_DATASETS, parametros)
+    if args.regenerar or not os.path.exists(db_path):
+        print(f"🧪 Generando dataset ({args.perfil}, semilla {args.semilla})...")
+    app = benchmark.crear_app_benchmark(db_path, regenerar=args.regenerar, parametros=parametros)
+
+    sujetos = benchmark.elegir_sujetos(app)
+    capturas = {
+        **{f"GET {n}": c for n, c in planes.capturar_escenarios(app, sujetos).items()},
+        **{f"consultas {n}": c for n, c in planes.capturar_consultas(app, sujetos).items()},
+    }
+    actual = planes.registrar(app, planes.explicar_capturas(app, capturas))
+    print(f"🔎 {actual['meta']['sentencias_revisadas']} sentencias distintas en {len(capturas)} escenarios, "
+          f"{len(actual['sentencias'])} con hallazgos")
+
+    if args.guardar:
+        os.makedirs(os.path.dirname(args.base), exist_ok=True)
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"💾 Línea base guardada en {args.base}")
+        return 0
+
+    if not os.path.exists(args.base):
+        print(f"❌ No existe la línea base {args.base} (créala con --guardar)")
+        return 1
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("meta", {}).get("dialecto") != actual["meta"]["dialecto"]:
+        print(f"\n⚠️  La línea base es de {base.get('meta', {}).get('dialecto')}; "
+              f"los planes de {actual['meta']['dialecto']} no son comparables")
+
+    filas = planes.comparar(actual, base)
+    print(f"\n📊 === COMPARACIÓN con {args.base} (commit {base.get('meta', {}).get('commit')}) ===")
+    for f in filas:
+        _imprimir_fila(f, args.planes, actual["sentencias"].get(f["huella"], {}).get("plan"))
+    regresiones = [f for f in filas if f["regresion"]]
+    resueltas = [f for f in filas if f["estado"] == "resuelta"]
+    if resueltas:
+        print(f"\n🎉 {len(resueltas)} sentencias mejoraron; actualiza la línea base con --guardar")
+    print(f"\n{'❌' if regresiones else '✅'} {len(regresiones)} regresiones de planes")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Detecta consultas nuevas que recorren tablas completas u ordenan en temporales")
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="chico", help="tamaño del dataset")
+    parser.add_argument("--semilla", type=int, default=PARAMETROS_POR_DEFECTO["semilla"])
+    parser.add_argument("--regenerar", action="store_true", help="vuelve a generar el dataset")
+    parser.add_argument("--base", default=BASE_POR_DEFECTO, help="JSON de línea base")
+    parser.add_argument("--guardar", action="store_true", help="sobrescribe la línea base con el estado actual")
+    parser.add_argument("--planes", action="store_true", help="muestra el plan de todas las sentencias con hallazgos")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Administración de shards por empresa (ver app/shards.py)
+#
+# Uso:
+#   python shards.py listar
+#   python shards.py migrar                       (BD principal + todos los shards de DB_SHARDS)
+#   python shards.py migrar exportadora
+#   python shards.py mover consultora-chs exportadora [--borrar-origen]
+#   python shards.py mover consultora-chs principal
+#
+# Cada BD entrega ids de su propio rango según la posición del shard en
+# DB_SHARDS (ver app/shards.py): agrega shards nuevos solo al final.
+
+import argparse
+import os
+import sys
+import time
+
+from flask_migrate import stamp, upgrade
+
+from app import create_app
+from app.extensions import db
+from app.models import Empresa
+from app import shards
+
+DIRECTORIO_MIGRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def listar(app):
+    destinos = app.extensions["shards_destinos"]
+    with app.app_context():
+        por_shard = {}
+        for e in Empresa.query.order_by(Empresa.slug):
+            por_shard.setdefault(e.shard or shards.PRINCIPAL, []).append(e)
+        print(f"🗄️  {shards.PRINCIPAL:<16} {db.engine.url.render_as_string(hide_password=True)}")
+        for nombre, destino in destinos.items():
+            print(f"🗄️  {nombre:<16} {destino}  (ids desde {shards.base_ids(nombre, app):,})")
+        print()
+        for nombre in [shards.PRINCIPAL, *destinos]:
+            for e in por_shard.pop(nombre, []):
+                candado = " 🔒 trasladándose" if e.shard_bloqueado else ""
+                print(f"   {nombre:<16} {e.slug}{candado}")
+        for nombre, empresas in por_shard.items():
+            for e in empresas:
+                print(f"   ❌ {nombre:<13} {e.slug} (shard no configurado)")
+    return 0
+
+
+def _migrar_app(app_shard, etiqueta, nuevo_fn):
+    with app_shard.app_context():
+        if nuevo_fn():
+            # Las migraciones no parten de cero: un shard nuevo se crea con create_all y se sella en head
+            stamp(directory=DIRECTORIO_MIGRACIONES)
+            print(f"   ✅ {etiqueta}: creado y sellado en head")
+        else:
+            upgrade(directory=DIRECTORIO_MIGRACIONES)
+            print(f"   ✅ {etiqueta}: actualizado a head")
+
+
+def migrar(app, nombres):
+    destinos = app.extensions["shards_destinos"]
+    objetivo = nombres or [shards.PRINCIPAL, *destinos]
+    for nombre in objetivo:
+        if nombre == shards.PRINCIPAL:
+            with app.app_context():
+                upgrade(directory=DIRECTORIO_MIGRACIONES)
+            print(f"   ✅ {nombre}: actualizado a head")
+            continue
+        if nombre not in destinos:
+            print(f"❌ Shard {nombre!r} no está en DB_SHARDS")
+            return 1
+        destino = destinos[nombre]
+        if destino.startswith(shards.PREFIJO_SCHEMA):
+            app_shard = create_app({"DB_SHARDS": "", "ALEMBIC_SCHEMA": destino[len(shards.PREFIJO_SCHEMA):]})
+            motor = shards.motor_de(nombre, app)
+        else:
+            app_shard = create_app({"DB_SHARDS": "", "SQLALCHEMY_DATABASE_URI": destino})
+            with app_shard.app_context():
+                motor = db.engine
+        base = shards.base_ids(nombre, app)
+        try:
+            _migrar_app(app_shard, nombre, lambda: shards.preparar_shard(motor, db.metadata, base))
+        except shards.ErrorShard as e:
+            print(f"❌ {nombre}: {e}")
+            return 1
+    return 0
+
+
+def mover(app, slug, destino, borrar_origen, espera=None):
+    with app.app_context():
+        empresa = Empresa.query.filter_by(slug=slug).first()
+        if not empresa:
+            print(f"❌ No se encontró la empresa {slug!r}")
+            return 1
+        origen = empresa.shard or shards.PRINCIPAL
+        empresa_id = empresa.id
+
+    print(f"🚚 {slug}: {origen} → {destino} (escrituras bloqueadas durante la copia)")
+    segundos = app.config.get("SHARD_ESPERA_SEGUNDOS", 30) if espera is None else espera
+    print(f"⏳ Esperando {segundos:g}s a que terminen los requests que ya estaban escribiendo...")
+    inicio = time.perf_counter()
+    try:
+        conteos = shards.mover_empresa(
+            app, empresa_id, destino, borrar_origen=borrar_origen, espera=espera,
+            progreso=lambda tabla, n: print(f"   {tabla:<24} {n:>8}"),
+        )
+    except shards.ErrorShard as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"\n✅ {sum(conteos.values())} filas copiadas en {time.perf_counter() - inicio:.2f}s")
+    if borrar_origen:
+        print(f"🗑️  Filas borradas de {origen}")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shards por empresa")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("listar", help="shards configurados y empresas en cada uno")
+    p_migrar = sub.add_parser("migrar", help="aplica las migraciones de Alembic en cada shard")
+    p_migrar.add_argument("shards", nargs="*", help=f"por defecto, {shards.PRINCIPAL} y todos los de DB_SHARDS")
+    p_mover = sub.add_parser("mover", help="traslada una empresa a otro shard")
+    p_mover.add_argument("empresa", help="slug de la empresa")
+    p_mover.add_argument("destino", help=f"nombre del shard ({shards.PRINCIPAL} = BD principal)")
+    p_mover.add_argument("--borrar-origen", action="store_true", help="borra las filas del shard de origen")
+    p_mover.add_argument("--espera", type=float,
+                         help="segundos de gracia tras bloquear escrituras (por defecto SHARD_ESPERA_SEGUNDOS)")
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.comando == "listar":
+        sys.exit(listar(app))
+    if args.comando == "migrar":
+        sys.exit(migrar(app, args.shards))
+    sys.exit(mover(app, args.empresa, args.destino, args.borrar_origen, args.espera))
@@ -0,0 +1,34 @@
+# tests/conftest.py
+"""
+Fixtures comunes: una app sobre un dataset chico de ``app.datagen`` en un
+directorio temporal (sin caché de la app, como los benchmarks) y clientes
+con sesión de admin y de técnico. ``nplus1`` viene de ``app.nplus1``.
+"""
+import pytest
+
+from app import benchmark
+from app.datagen import PARAMETROS_POR_DEFECTO, PERFILES
+
+pytest_plugins = ["app.nplus1"]
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    parametros = {**PARAMETROS_POR_DEFECTO, **PERFILES["chico"]}
+    db_path = tmp_path_factory.mktemp("datos") / "tests.db"
+    return benchmark.crear_app_benchmark(str(db_path), parametros=parametros)
+
+
+@pytest.fixture(scope="session")
+def sujetos(app):
+    return benchmark.elegir_sujetos(app)
+
+
+@pytest.fixture
+def cliente_admin(app, sujetos):
+    return benchmark.cliente_con_sesion(app, *sujetos["admin"])
+
+
+@pytest.fixture
+def cliente_tecnico(app, sujetos):
+    return benchmark.cliente_con_sesion(app, *sujetos["tecnico"])
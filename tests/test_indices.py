@@ -0,0 +1,38 @@
+# tests/test_indices.py
+"""Índices compuestos de los modelos y planes de las consultas principales (EXPLAIN)."""
+import pytest
+from sqlalchemy import inspect
+
+from app import planes
+from app.extensions import db
+
+INDICES_ESPERADOS = {
+    "users": ["ix_users_empresa_id_role_created_by_name"],
+    "huertos": ["ix_huertos_empresa_id_nombre", "ix_huertos_empresa_id_responsable_id_nombre",
+                "ix_huertos_responsable_id"],
+    "bodegas": ["ix_bodegas_empresa_id_nombre", "ix_bodegas_empresa_id_responsable_id_nombre",
+                "ix_bodegas_huerto_id"],
+    "actividad_huerto": ["ix_actividad_huerto_huerto_id_fecha"],
+    "movimientos_inventario": ["ix_movimientos_inventario_quimico_id_fecha"],
+    "recomendacion": ["ix_recomendacion_huerto_id_fecha", "ix_recomendacion_tecnico_id_fecha"],
+    "parcelas": ["ix_parcelas_empresa_id_huerto_id_nombre", "ix_parcelas_empresa_id_nombre",
+                 "ix_parcelas_huerto_id"],
+    "actividades_campo": ["ix_actividades_campo_huerto_id_fecha", "ix_actividades_campo_empresa_id_fecha"],
+    "documentos": ["ix_documentos_empresa_id_huerto_id_created_at", "ix_documentos_empresa_id_created_at"],
+}
+
+
+@pytest.mark.parametrize("tabla", sorted(INDICES_ESPERADOS))
+def test_indices_creados(app, tabla):
+    with app.app_context():
+        creados = {i["name"] for i in inspect(db.engine).get_indexes(tabla)}
+    faltantes = set(INDICES_ESPERADOS[tabla]) - creados
+    assert not faltantes, f"{tabla}: faltan {sorted(faltantes)}"
+
+
+@pytest.mark.parametrize("grupo", sorted(planes.CONSULTAS_PRINCIPALES))
+def test_planes_sin_recorridos_ni_ordenamientos(app, sujetos, grupo):
+    sentencias = planes.revisar(app, sujetos, [grupo])[grupo]
+    assert sentencias, f"{grupo} no ejecutó consultas"
+    problemas = [f"{' '.join(s['sql'].split())[:150]} → {s['hallazgos']}" for s in sentencias if s["hallazgos"]]
+    assert not problemas, "\n".join(problemas)
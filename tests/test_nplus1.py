@@ -0,0 +1,27 @@
+# tests/test_nplus1.py
+"""Las vistas con loops sobre bodegas, químicos y actividades no hacen N+1."""
+import pytest
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Huerto
+from app.nplus1 import NPlusOneError, vigilar
+
+
+def test_vista_global_huerto(cliente_admin, sujetos, nplus1):
+    r = cliente_admin.get(f"/admin/huerto/{sujetos['huerto_id']}/vista-global")
+    assert r.status_code == 200
+    assert nplus1.sentencias, "el detector no vio las consultas del request"
+
+
+def test_todos_los_quimicos(cliente_tecnico, nplus1):
+    r = cliente_tecnico.get("/tecnico/todos_los_quimicos")
+    assert r.status_code == 200
+    assert nplus1.instancias["Quimico"], "el técnico de prueba no tiene químicos"
+
+
+def test_detector_falla_con_consultas_repetidas(app):
+    with app.app_context(), pytest.raises(NPlusOneError):
+        with vigilar(umbral=2):
+            for i in range(5):
+                db.session.execute(select(Huerto.id).where(Huerto.id == i)).all()
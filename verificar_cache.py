@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# Verifica los backends del caché de la app (app/cache.py) y mide su latencia
+#
+# Uso:
+#   python verificar_cache.py                              (LRU, SQLite temporal y Redis falso local)
+#   python verificar_cache.py --redis redis://localhost:6379/15   (además, un Redis real: ¡hace FLUSHDB!)
+#   python verificar_cache.py --operaciones 20000
+#
+# El Redis falso es un servidor RESP mínimo en un hilo (GET, MGET, SET con
+# EX/PX/NX, DEL, INCRBY, FLUSHDB, DBSIZE): alcanza para probar el cliente
+# sin instalar Redis. Sale con código 1 si algún backend falla.
+
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from app.cache import Cache, CacheLRU, CacheRedis, CacheSQLite
+
+
+# ==============================
+# Redis falso
+# ==============================
+class _ManejadorRedis(socketserver.StreamRequestHandler):
+    def _leer_comando(self):
+        linea = self.rfile.readline()
+        if not linea:
+            return None
+        n = int(linea[1:])
+        args = []
+        for _ in range(n):
+            largo = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(largo + 2)[:-2])
+        return args
+
+    @staticmethod
+    def _bulk(valor):
+        return b"$-1\r\n" if valor is None else b"$%d\r\n%s\r\n" % (len(valor), valor)
+
+    def handle(self):
+        datos = self.server.datos
+        while (args := self._leer_comando()) is not None:
+            cmd, args = args[0].upper().decode(), args[1:]
+            with self.server.lock:
+                ahora = time.monotonic()
+                for clave in [c for c, (_, expira) in datos.items() if expira and expira <= ahora]:
+                    del datos[clave]
+                if cmd == "GET":
+                    r = self._bulk(datos.get(args[0], (None,))[0])
+                elif cmd == "MGET":
+                    r = b"*%d\r\n" % len(args) + b"".join(self._bulk(datos.get(c, (None,))[0]) for c in args)
+                elif cmd == "SET":
+                    opciones = [a.upper() for a in args[2:]]
+                    expira = None
+                    if b"PX" in opciones:
+                        expira = ahora + int(args[2 + opciones.index(b"PX") + 1]) / 1000
+                    elif b"EX" in opciones:
+                        expira = ahora + int(args[2 + opciones.index(b"EX") + 1])
+                    if b"NX" in opciones and args[0] in datos:
+                        r = b"$-1\r\n"
+                    else:
+                        datos[args[0]] = (args[1], expira)
+                        r = b"+OK\r\n"
+                elif cmd == "DEL":
+                    r = b":%d\r\n" % sum(datos.pop(c, None) is not None for c in args)
+                elif cmd == "INCRBY":
+                    valor, expira = datos.get(args[0], (b"0", None))
+                    valor = int(valor) + int(args[1])
+                    datos[args[0]] = (str(valor).encode(), expira)
+                    r = b":%d\r\n" % valor
+                elif cmd == "FLUSHDB":
+                    datos.clear()
+                    r = b"+OK\r\n"
+                elif cmd == "DBSIZE":
+                    r = b":%d\r\n" % len(datos)
+                elif cmd in ("PING", "SELECT", "AUTH"):
+                    r = b"+OK\r\n" if cmd != "PING" else b"+PONG\r\n"
+                else:
+                    r = b"-ERR comando no soportado '%s'\r\n" % cmd.encode()
+            self.wfile.write(r)
+
+
+class RedisFalso(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 64
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ManejadorRedis)
+        self.datos = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+
+# ==============================
+# Pruebas
+# ==============================
+def _verificar(backend) -> list[str]:
+    fallos = []
+
+    def esperar(descripcion, obtenido, esperado):
+        if obtenido != esperado:
+            fallos.append(f"{descripcion}: se esperaba {esperado!r}, llegó {obtenido!r}")
+
+    backend.clear()
+    esperar("get de clave inexistente", backend.get("x"), None)
+    backend.set("x", {"a": [1, 2]}, 60)
+    esperar("set/get", backend.get("x"), {"a": [1, 2]})
+    backend.set("y", "ñandú")
+    esperar("get_many", backend.get_many(["x", "y", "z"]), {"x": {"a": [1, 2]}, "y": "ñandú"})
+    backend.set("corta", 1, 0.05)
+    time.sleep(0.1)
+    esperar("TTL vencido", backend.get("corta"), None)
+    esperar("add sobre clave vigente", backend.add("x", 0, 10), False)
+    esperar("add sobre clave nueva", backend.add("candado", 1, 0.05), True)
+    time.sleep(0.1)
+    esperar("add sobre clave vencida", backend.add("candado", 2, 10), True)
+    esperar("incr nuevo", backend.incr("n"), 1)
+    esperar("incr +5", backend.incr("n", 5), 6)
+    esperar("get de contador", backend.get("n"), 6)
+    esperar("contador en get_many", backend.get_many(["n"]), {"n": 6})
+    backend.delete("x")
+    esperar("delete", backend.get("x"), None)
+    esperar("len", len(backend), 3)
+    backend.clear()
+    esperar("clear", len(backend), 0)
+    return fallos
+
+
+def _verificar_estampida(backend, hilos: int = 8) -> list[str]:
+    """Varios hilos piden la misma clave vacía: solo uno debe calcular."""
+    backend.clear()
+    cache = Cache(backend, ttl=60, espera=2.0)
+    calculos = []
+    inicio = threading.Barrier(hilos)
+
+    def calcular():
+        calculos.append(1)
+        time.sleep(0.2)
+        return "valor"
+
+    def pedir():
+        inicio.wait()
+        cache.obtener("caro", calcular)
+
+    grupo = [threading.Thread(target=pedir) for _ in range(hilos)]
+    for h in grupo:
+        h.start()
+    for h in grupo:
+        h.join()
+    backend.clear()
+    return [] if len(calculos) == 1 else [f"estampida: {len(calculos)} cálculos en vez de 1"]
+
+
+def _latencia(backend, operaciones: int) -> tuple[float, float]:
+    valor = [(i, f"Huerto {i}") for i in range(20)]     # como una lista de choices
+    backend.clear()
+    inicio = time.perf_counter()
+    for i in range(operaciones):
+        backend.set(f"k{i % 500}", valor, 60)
+    set_us = (time.perf_counter() - inicio) / operaciones * 1e6
+    inicio = time.perf_counter()
+    for i in range(operaciones):
+        backend.get(f"k{i % 500}")
+    get_us = (time.perf_counter() - inicio) / operaciones * 1e6
+    backend.clear()
+    return get_us, set_us
+
+
+def main(args):
+    directorio = tempfile.mkdtemp(prefix="verificar_cache_")
+    falso = RedisFalso()
+    backends = [
+        ("lru", CacheLRU(1000)),
+        ("sqlite", CacheSQLite(os.path.join(directorio, "cache.db"))),
+        ("redis (falso)", CacheRedis(falso.url)),
+    ]
+    if args.redis:
+        backends.append((f"redis {args.redis}", CacheRedis(args.redis)))
+
+    print(f"🧪 === CACHÉ DE LA APP: {len(backends)} backends ===\n")
+    errores = 0
+    for nombre, backend in backends:
+        try:
+            fallos = _verificar(backend) + _verificar_estampida(backend)
+        except Exception as e:
+            fallos = [f"{type(e).__name__}: {e}"]
+        if fallos:
+            errores += 1
+            print(f"❌ {nombre}")
+            for fallo in fallos:
+                print(f"   {fallo}")
+            continue
+        get_us, set_us = _latencia(backend, args.operaciones)
+        print(f"✅ {nombre:<16} get {get_us:>7.1f} µs · set {set_us:>7.1f} µs")
+
+    caido = CacheRedis("redis://127.0.0.1:1/0", timeout=0.2)
+    cache = Cache(caido)
+    inicio = time.perf_counter()
+    valor, acierto = cache.obtener("x", lambda: "calculado")
+    ms = (time.perf_counter() - inicio) * 1000
+    segundo_inicio = time.perf_counter()
+    cache.obtener("x", lambda: "calculado")
+    segundo_ms = (time.perf_counter() - segundo_inicio) * 1000
+    if valor == "calculado" and not acierto:
+        print(f"✅ Redis caído: se calcula sin caché ({ms:.1f} ms la primera vez, {segundo_ms:.2f} ms después)")
+    else:
+        errores += 1
+        print(f"❌ Redis caído: obtener() devolvió {valor!r}")
+    falso.shutdown()
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prueba los backends del caché de la app")
+    parser.add_argument("--redis", help="URL de un Redis real para probar también (usa FLUSHDB: base dedicada)")
+    parser.add_argument("--operaciones", type=int, default=5000, help="operaciones para medir latencia")
+    sys.exit(main(parser.parse_args()))
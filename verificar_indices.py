@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Verifica que las consultas principales de las vistas usen índices (EXPLAIN QUERY PLAN)
+#
+# Uso:
+#   python verificar_indices.py                     (dataset "mediano" de benchmarks)
+#   python verificar_indices.py --perfil grande --planes
+#   python verificar_indices.py --solo admin_dashboard docs_list
+#
+# Sale con código 1 si alguna consulta recorre una tabla completa (SCAN) u ordena
+# en un B-tree temporal (USE TEMP B-TREE FOR ORDER BY).
+# Los mismos chequeos corren en pytest (tests/test_indices.py) sobre un dataset chico.
+
+import argparse
+import os
+import sys
+
+from app import benchmark, planes
+from app.extensions import db
+from app.datagen import PARAMETROS_POR_DEFECTO, PERFILES
+
+DIRECTORIO_DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "benchmarks")
+
+
+def main(args):
+    parametros = {**PARAMETROS_POR_DEFECTO, **PERFILES[args.perfil], "semilla": args.semilla}
+    os.makedirs(DIRECTORIO_DATASETS, exist_ok=True)
+    db_path = benchmark.ruta_dataset(DIRECTORIO_DATASETS, parametros)
+    if args.regenerar or not os.path.exists(db_path):
+        print(f"🧪 Generando dataset ({args.perfil}, semilla {args.semilla})...")
+    app = benchmark.crear_app_benchmark(db_path, regenerar=args.regenerar, parametros=parametros)
+
+    print("\n🔎 === PLANES DE CONSULTA ===")
+    resultado = planes.revisar(app, benchmark.elegir_sujetos(app), args.solo)
+    with app.app_context():
+        tablas = set(db.metadata.tables)
+    fallas = 0
+    for grupo, sentencias in resultado.items():
+        con_hallazgos = [s for s in sentencias if s["hallazgos"]]
+        fallas += len(con_hallazgos)
+        print(f"   {'❌' if con_hallazgos else '✅'} {grupo:<22} {len(sentencias):>3} sentencias")
+        for s in sentencias:
+            if not (s["hallazgos"] or args.planes):
+                continue
+            print(f"      {' '.join(s['sql'].split())[:150]}")
+            for linea in s["plan"]:
+                marca = "⚠️ " if planes.hallazgos([linea], tablas) else "   "
+                print(f"         {marca}{linea}")
+
+    print(f"\n{'❌' if fallas else '✅'} {fallas} sentencias con recorridos completos u ordenamientos temporales")
+    return 1 if fallas else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Revisa con EXPLAIN QUERY PLAN que las consultas principales usen índices")
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="mediano", help="tamaño del dataset")
+    parser.add_argument("--semilla", type=int, default=PARAMETROS_POR_DEFECTO["semilla"])
+    parser.add_argument("--regenerar", action="store_true", help="vuelve a generar el dataset")
+    parser.add_argument("--solo", nargs="+", choices=sorted(planes.CONSULTAS_PRINCIPALES), help="solo estos grupos")
+    parser.add_argument("--planes", action="store_true", help="muestra el plan de todas las sentencias")
+    sys.exit(main(parser.parse_args()))